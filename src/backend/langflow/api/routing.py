@@ -0,0 +1,131 @@
+import bisect
+import hashlib
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+# Paths of the requests that need the objects built for a flow, and the
+# position of the flow id (or the chat client id, which is the flow id)
+SESSION_PATH_PATTERN = re.compile(
+    r"^/api/v1/(?:build/init|build/stream|build|chat|process|predict)/([^/]+)"
+)
+
+# Websockets can't be redirected, so they are closed with this code and the
+# base URL of the instance the client should connect to as the reason. The
+# reason of a close frame can't be longer than this many bytes
+WS_REDIRECT_CODE = 4307
+MAX_CLOSE_REASON_BYTES = 123
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.sha1(value.encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """
+    Assigns keys to nodes so that adding or removing a node only moves the
+    keys of that node. Each node is placed replicas times on the ring to
+    spread the keys evenly.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node")
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get_node(self, key: str) -> str:
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+@lru_cache(maxsize=8)
+def get_hash_ring(nodes: Tuple[str, ...]) -> ConsistentHashRing:
+    return ConsistentHashRing(list(nodes))
+
+
+def get_session_node(path: str) -> Optional[str]:
+    """
+    Returns the base URL of the instance that owns the flow of the request
+    path, or None if this instance does.
+    """
+    from langflow.services.getters import get_settings_manager
+
+    settings = get_settings_manager().settings
+    nodes = settings.SESSION_ROUTING_NODES
+    if not nodes or not settings.SESSION_ROUTING_NODE:
+        return None
+    match = SESSION_PATH_PATTERN.match(path)
+    if match is None:
+        return None
+    node = get_hash_ring(tuple(nodes)).get_node(match.group(1))
+    if node.rstrip("/") == settings.SESSION_ROUTING_NODE.rstrip("/"):
+        return None
+    return node.rstrip("/")
+
+
+class SessionRoutingMiddleware:
+    """
+    Sends the requests of a flow to the instance its flow id is assigned to
+    by a consistent hash ring, so the objects built for the flow that can't
+    be shared between instances are always found where they were built.
+
+    HTTP requests are redirected with a 307, which keeps the method and the
+    body. Websockets are accepted and closed with WS_REDIRECT_CODE and the
+    base URL of the owning instance as the reason, so the client reconnects
+    there with the same path. The query string, which can hold the token
+    of the client, is never sent back in the close frame.
+
+    It does nothing unless the SESSION_ROUTING_NODES and
+    SESSION_ROUTING_NODE settings are set.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+        try:
+            node = get_session_node(scope["path"])
+        except ValueError as exc:
+            # The settings manager isn't ready yet
+            logger.debug(f"Session routing skipped: {exc}")
+            node = None
+        if node is None:
+            return await self.app(scope, receive, send)
+
+        if scope["type"] == "http":
+            url = f"{node}{scope.get('root_path', '')}{scope['path']}"
+            if scope.get("query_string"):
+                url = f"{url}?{scope['query_string'].decode('latin-1')}"
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 307,
+                    "headers": [(b"location", url.encode("latin-1"))],
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+        reason = node
+        if len(reason.encode("utf-8")) > MAX_CLOSE_REASON_BYTES:
+            logger.warning(
+                f"Session routing node URL too long for a close frame: {node}"
+            )
+            reason = ""
+        await send({"type": "websocket.accept"})
+        await send(
+            {"type": "websocket.close", "code": WS_REDIRECT_CODE, "reason": reason}
+        )
@@ -3,9 +3,10 @@ import asyncio
 from langchain.callbacks.base import AsyncCallbackHandler, BaseCallbackHandler
 
 from langflow.api.v1.schemas import ChatResponse
+from langflow.api.v1.serialization import STREAM_ENVELOPE, dumps
 
 
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from fastapi import WebSocket
 
 
@@ -13,15 +14,128 @@ from langchain.schema import AgentAction, LLMResult, AgentFinish
 from loguru import logger
 
 
+def chunk_text(text: str, chunk_size: int) -> Iterator[str]:
+    """
+    Splits text in chunks of at most chunk_size characters, cutting after
+    the last whitespace of each chunk when there is one. Joining the chunks
+    gives back the text.
+    """
+    if chunk_size <= 0:
+        yield text
+        return
+    start = 0
+    while len(text) - start > chunk_size:
+        end = start + chunk_size
+        cut = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+        if cut > start:
+            end = cut + 1
+        yield text[start:end]
+        start = end
+    yield text[start:]
+
+
+def get_tool_output_chunk_size() -> int:
+    """Returns the configured size of the chunks of the tool outputs."""
+    from langflow.services.getters import get_settings_manager
+
+    return get_settings_manager().settings.TOOL_OUTPUT_CHUNK_SIZE or 0
+
+
+def get_stream_flush_limits():
+    """Returns the configured flush interval in seconds and flush size in bytes."""
+    from langflow.services.getters import get_settings_manager
+
+    settings = get_settings_manager().settings
+    return (
+        (settings.STREAM_FLUSH_INTERVAL_MS or 0) / 1000,
+        settings.STREAM_FLUSH_BYTES or 0,
+    )
+
+
 # https://github.com/hwchase17/chat-langchain/blob/master/callback.py
 class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
-    """Callback handler for streaming LLM responses."""
+    """
+    Callback handler for streaming LLM responses.
+
+    Tokens are coalesced: they are buffered and sent as one message once
+    flush_interval seconds passed since the first buffered token or
+    flush_bytes bytes are buffered, whichever comes first. Buffered tokens
+    are always sent before any other message, and when the LLM ends or
+    errors. Setting both limits to 0 sends every token as its own message.
 
-    def __init__(self, websocket: WebSocket):
+    Args:
+        websocket: Where the messages are sent, anything with a send_json coroutine.
+        flush_interval (float, optional): Defaults to the STREAM_FLUSH_INTERVAL_MS setting.
+        flush_bytes (int, optional): Defaults to the STREAM_FLUSH_BYTES setting.
+        chunk_size (int, optional): Maximum size of the chunks of the tool outputs.
+            Defaults to the TOOL_OUTPUT_CHUNK_SIZE setting.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        flush_interval: Optional[float] = None,
+        flush_bytes: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ):
         self.websocket = websocket
+        if chunk_size is None:
+            chunk_size = get_tool_output_chunk_size()
+        self.chunk_size = chunk_size
+        if flush_interval is None or flush_bytes is None:
+            default_interval, default_bytes = get_stream_flush_limits()
+            if flush_interval is None:
+                flush_interval = default_interval
+            if flush_bytes is None:
+                flush_bytes = default_bytes
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._tokens: List[str] = []
+        self._buffered_bytes = 0
+        self._flush_timer: Optional[asyncio.Task] = None
+        # Keeps the flushes in order when the timer and a token flush at once
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def coalescing(self) -> bool:
+        return bool(self.flush_interval or self.flush_bytes)
 
     async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        resp = ChatResponse(message=token, type="stream", intermediate_steps="")
+        if not self.coalescing:
+            resp = ChatResponse(message=token, type="stream", intermediate_steps="")
+            await self.websocket.send_json(resp.dict())
+            return
+        self._tokens.append(token)
+        self._buffered_bytes += len(token.encode("utf-8"))
+        if self.flush_bytes and self._buffered_bytes >= self.flush_bytes:
+            await self.flush()
+        elif self.flush_interval and self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._flush_timer = None
+        try:
+            await self.flush()
+        except Exception as exc:
+            logger.error(f"Error sending buffered tokens: {exc}")
+
+    async def flush(self) -> None:
+        """Send the buffered tokens, if any, as one message."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        async with self._send_lock:
+            if not self._tokens:
+                return
+            message = "".join(self._tokens)
+            self._tokens.clear()
+            self._buffered_bytes = 0
+            await self.websocket.send_json({**STREAM_ENVELOPE, "message": message})
+
+    async def _send(self, resp: ChatResponse) -> None:
+        # Tokens generated before the message are sent first
+        await self.flush()
         await self.websocket.send_json(resp.dict())
 
     async def on_llm_start(
@@ -31,11 +145,13 @@ class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
 
     async def on_llm_end(self, response: LLMResult, **kwargs: Any) -> Any:
         """Run when LLM ends running."""
+        await self.flush()
 
     async def on_llm_error(
         self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any
     ) -> Any:
         """Run when LLM errors."""
+        await self.flush()
 
     async def on_chain_start(
         self, serialized: Dict[str, Any], inputs: Dict[str, Any], **kwargs: Any
@@ -44,11 +160,13 @@ class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
 
     async def on_chain_end(self, outputs: Dict[str, Any], **kwargs: Any) -> Any:
         """Run when chain ends running."""
+        await self.flush()
 
     async def on_chain_error(
         self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any
     ) -> Any:
         """Run when chain errors."""
+        await self.flush()
 
     async def on_tool_start(
         self, serialized: Dict[str, Any], input_str: str, **kwargs: Any
@@ -59,41 +177,51 @@ class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
             type="stream",
             intermediate_steps=f"Tool input: {input_str}",
         )
-        await self.websocket.send_json(resp.dict())
+        await self._send(resp)
 
     async def on_tool_end(self, output: str, **kwargs: Any) -> Any:
-        """Run when tool ends running."""
-        observation_prefix = kwargs.get("observation_prefix", "Tool output: ")
-        split_output = output.split()
-        first_word = split_output[0]
-        rest_of_output = split_output[1:]
-        # Create a formatted message.
-        intermediate_steps = f"{observation_prefix}{first_word}"
-
-        # Create a ChatResponse instance.
-        resp = ChatResponse(
-            message="",
-            type="stream",
-            intermediate_steps=intermediate_steps,
-        )
-        rest_of_resps = [
-            ChatResponse(
-                message="",
-                type="stream",
-                intermediate_steps=f"{word}",
-            )
-            for word in rest_of_output
-        ]
-        resps = [resp] + rest_of_resps
-        # Try to send the response, handle potential errors.
+        """
+        Run when tool ends running.
 
+        The output is streamed as intermediate steps in chunks of at most
+        chunk_size characters, cut on whitespace when possible. Joining the
+        chunks in order gives back the observation prefix and the output.
+        Each chunk is sent as one envelope numbered by its "chunk" index,
+        with "last_chunk" set on the last one.
+        """
+        observation_prefix = kwargs.get("observation_prefix", "Tool output: ")
+        text = f"{observation_prefix}{output}"
+        envelope = {**STREAM_ENVELOPE, "message": ""}
         try:
-            # This is to emulate the stream of tokens
-            for resp in resps:
-                await self.websocket.send_json(resp.dict())
+            await self.flush()
+            chunks = chunk_text(text, self.chunk_size)
+            chunk = next(chunks, "")
+            index = 0
+            for next_chunk in chunks:
+                await self._send_payload(
+                    {**envelope, "intermediate_steps": chunk, "chunk": index}
+                )
+                chunk = next_chunk
+                index += 1
+            await self._send_payload(
+                {
+                    **envelope,
+                    "intermediate_steps": chunk,
+                    "chunk": index,
+                    "last_chunk": True,
+                }
+            )
         except Exception as exc:
             logger.error(f"Error sending response: {exc}")
 
+    async def _send_payload(self, payload: Dict[str, Any]) -> None:
+        # Serialized with orjson once, when the transport accepts text
+        send_text = getattr(self.websocket, "send_text", None)
+        if send_text is None:
+            await self.websocket.send_json(payload)
+        else:
+            await send_text(dumps(payload))
+
     async def on_tool_error(
         self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any
     ) -> Any:
@@ -113,10 +241,10 @@ class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
             logs = log.split("\n")
             for log in logs:
                 resp = ChatResponse(message="", type="stream", intermediate_steps=log)
-                await self.websocket.send_json(resp.dict())
+                await self._send(resp)
         else:
             resp = ChatResponse(message="", type="stream", intermediate_steps=log)
-            await self.websocket.send_json(resp.dict())
+            await self._send(resp)
 
     async def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> Any:
         """Run on agent end."""
@@ -125,18 +253,68 @@ class AsyncStreamingLLMCallbackHandler(AsyncCallbackHandler):
             type="stream",
             intermediate_steps=finish.log,
         )
-        await self.websocket.send_json(resp.dict())
+        await self._send(resp)
 
 
 class StreamingLLMCallbackHandler(BaseCallbackHandler):
-    """Callback handler for streaming LLM responses."""
+    """
+    Callback handler for streaming LLM responses from sync calls.
+
+    Sync chains may run on a worker thread, so the messages are sent through
+    the AsyncStreamingLLMCallbackHandler on the event loop of the websocket,
+    or the one that was running when the handler was created.
+    """
 
     def __init__(self, websocket):
         self.websocket = websocket
+        self._async_handler = AsyncStreamingLLMCallbackHandler(websocket)
+        # The loop of the connection's writer, if the websocket is a
+        # ConnectionSender, or the loop creating the handler
+        self.loop = getattr(websocket, "loop", None)
+        if self.loop is None:
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.loop = None
+
+    def _send(self, coroutine) -> None:
+        loop = self.loop or asyncio.get_event_loop()
+        asyncio.run_coroutine_threadsafe(coroutine, loop)
 
     def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        resp = ChatResponse(message=token, type="stream", intermediate_steps="")
+        self._send(self._async_handler.on_llm_new_token(token, **kwargs))
 
-        loop = asyncio.get_event_loop()
-        coroutine = self.websocket.send_json(resp.dict())
-        asyncio.run_coroutine_threadsafe(coroutine, loop)
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> Any:
+        self._send(self._async_handler.on_llm_end(response, **kwargs))
+
+    def on_llm_error(
+        self, error: Union[Exception, KeyboardInterrupt], **kwargs: Any
+    ) -> Any:
+        self._send(self._async_handler.on_llm_error(error, **kwargs))
+
+    def on_tool_start(
+        self, serialized: Dict[str, Any], input_str: str, **kwargs: Any
+    ) -> Any:
+        self._send(self._async_handler.on_tool_start(serialized, input_str, **kwargs))
+
+    def on_tool_end(self, output: str, **kwargs: Any) -> Any:
+        self._send(self._async_handler.on_tool_end(output, **kwargs))
+
+    def on_agent_action(self, action: AgentAction, **kwargs: Any) -> Any:
+        self._send(self._async_handler.on_agent_action(action, **kwargs))
+
+    def on_agent_finish(self, finish: AgentFinish, **kwargs: Any) -> Any:
+        self._send(self._async_handler.on_agent_finish(finish, **kwargs))
+
+
+class QueueSender:
+    """
+    Stands in for the websocket of the streaming callback handlers and
+    queues what they send, so it can be streamed over other transports.
+    """
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        await self.queue.put(data)
@@ -1,3 +1,6 @@
+from typing import Optional
+from uuid import UUID
+
 from fastapi import (
     APIRouter,
     Depends,
@@ -9,20 +12,53 @@ from fastapi import (
 )
 from fastapi.responses import StreamingResponse
 from langflow.api.utils import build_input_keys_response
-from langflow.api.v1.schemas import BuildStatus, BuiltResponse, InitResponse, StreamData
+from langflow.api.v1.schemas import (
+    BuildStatus,
+    BuiltResponse,
+    ChatHistoryResponse,
+    InitResponse,
+)
+from langflow.api.v1.serialization import sse_event
 
-from langflow.graph.graph.base import Graph
+from langflow.graph.graph.plan import build_graph_with_plan
+from langflow.graph.graph.scheduler import abuild_vertices_by_level
 from langflow.services.auth.utils import get_current_active_user, get_current_user
 from loguru import logger
 from langflow.services.getters import get_chat_manager, get_session
-from cachetools import LRUCache
 from sqlmodel import Session
+from langflow.services.cache.base import BaseCache
+from langflow.services.database.models.flow import Flow
 from langflow.services.chat.manager import ChatManager
 
 
 router = APIRouter(tags=["Chat"])
 
-flow_data_store: LRUCache = LRUCache(maxsize=10)
+
+def set_build_status(
+    flow_data_store: BaseCache, flow_id: str, build_status: BuildStatus
+) -> None:
+    # The record is stored again because the store can be shared
+    flow_data = flow_data_store.get(flow_id)
+    if flow_data is not None:
+        flow_data["status"] = build_status
+        flow_data_store.set(flow_id, flow_data)
+
+
+async def restore_langchain_object(flow_id: str, chat_manager: "ChatManager") -> None:
+    """
+    Builds the flow again if it was built by another worker, which stored
+    its graph data in the shared flow data store.
+    """
+    flow_data = chat_manager.flow_data_store.get(flow_id)
+    if flow_data is None or flow_data.get("status") != BuildStatus.SUCCESS:
+        return
+    try:
+        graph = build_graph_with_plan(flow_data["graph_data"])
+        langchain_object = await graph.abuild(user_id=flow_data["user_id"])
+    except Exception as exc:
+        logger.error(f"Error rebuilding flow {flow_id}: {exc}")
+        return
+    chat_manager.set_cache(flow_id, langchain_object)
 
 
 @router.websocket("/chat/{client_id}")
@@ -46,6 +82,8 @@ async def chat(
                 code=status.WS_1008_POLICY_VIOLATION, reason="Unauthorized"
             )
 
+        if client_id not in chat_manager.in_memory_cache:
+            await restore_langchain_object(client_id, chat_manager)
         if client_id in chat_manager.in_memory_cache:
             await chat_manager.handle_websocket(client_id, websocket)
         else:
@@ -67,6 +105,39 @@ async def chat(
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason=messsage)
 
 
+@router.get("/chat/{client_id}/history", response_model=ChatHistoryResponse)
+def get_chat_history(
+    *,
+    client_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[int] = Query(None, ge=0),
+    include_stream: bool = False,
+    session: Session = Depends(get_session),
+    current_user=Depends(get_current_active_user),
+    chat_manager: "ChatManager" = Depends(get_chat_manager),
+):
+    """
+    Get the chat history of a flow of the current user, one page at a time,
+    starting from the last messages. Pass the next_before of a page to get
+    the previous one.
+    """
+    try:
+        flow_id = UUID(client_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Flow not found")
+    if not (
+        session.query(Flow)
+        .filter(Flow.id == flow_id)
+        .filter(Flow.user_id == current_user.id)
+        .first()
+    ):
+        raise HTTPException(status_code=404, detail="Flow not found")
+    messages, next_before = chat_manager.chat_history.get_page(
+        client_id, limit=limit, before=before, filter_messages=not include_stream
+    )
+    return ChatHistoryResponse(messages=messages, next_before=next_before)
+
+
 @router.post("/build/init/{flow_id}", response_model=InitResponse, status_code=201)
 async def init_build(
     graph_data: dict,
@@ -79,23 +150,24 @@ async def init_build(
     try:
         if flow_id is None:
             raise ValueError("No ID provided")
+        flow_data_store = chat_manager.flow_data_store
         # Check if already building
-        if (
-            flow_id in flow_data_store
-            and flow_data_store[flow_id]["status"] == BuildStatus.IN_PROGRESS
-        ):
+        flow_data = flow_data_store.get(flow_id)
+        if flow_data is not None and flow_data["status"] == BuildStatus.IN_PROGRESS:
             return InitResponse(flowId=flow_id)
 
         # Delete from cache if already exists
         if flow_id in chat_manager.in_memory_cache:
-            with chat_manager.in_memory_cache._lock:
-                chat_manager.in_memory_cache.delete(flow_id)
-                logger.debug(f"Deleted flow {flow_id} from cache")
-        flow_data_store[flow_id] = {
-            "graph_data": graph_data,
-            "status": BuildStatus.STARTED,
-            "user_id": current_user.id,
-        }
+            chat_manager.in_memory_cache.delete(flow_id)
+            logger.debug(f"Deleted flow {flow_id} from cache")
+        flow_data_store.set(
+            flow_id,
+            {
+                "graph_data": graph_data,
+                "status": BuildStatus.STARTED,
+                "user_id": current_user.id,
+            },
+        )
 
         return InitResponse(flowId=flow_id)
     except Exception as exc:
@@ -104,13 +176,14 @@ async def init_build(
 
 
 @router.get("/build/{flow_id}/status", response_model=BuiltResponse)
-async def build_status(flow_id: str):
+async def build_status(
+    flow_id: str,
+    chat_manager: "ChatManager" = Depends(get_chat_manager),
+):
     """Check the flow_id is in the flow_data_store."""
     try:
-        built = (
-            flow_id in flow_data_store
-            and flow_data_store[flow_id]["status"] == BuildStatus.SUCCESS
-        )
+        flow_data = chat_manager.flow_data_store.get(flow_id)
+        built = flow_data is not None and flow_data["status"] == BuildStatus.SUCCESS
 
         return BuiltResponse(
             built=built,
@@ -123,47 +196,71 @@ async def build_status(flow_id: str):
 
 @router.get("/build/stream/{flow_id}", response_class=StreamingResponse)
 async def stream_build(
-    flow_id: str, chat_manager: "ChatManager" = Depends(get_chat_manager)
+    flow_id: str,
+    vertex_id: Optional[str] = None,
+    chat_manager: "ChatManager" = Depends(get_chat_manager),
 ):
-    """Stream the build process based on stored flow data."""
+    """
+    Stream the build process based on stored flow data.
+
+    If a vertex_id is given, only that vertex and the vertices it depends on
+    are built, e.g. to test a single component. The built flow is left as it
+    was.
+    """
 
     async def event_stream(flow_id):
         final_response = {"end_of_stream": True}
         artifacts = {}
+        flow_data_store = chat_manager.flow_data_store
         try:
-            if flow_id not in flow_data_store:
+            flow_data = flow_data_store.get(flow_id)
+            if flow_data is None:
                 error_message = "Invalid session ID"
-                yield str(StreamData(event="error", data={"error": error_message}))
+                yield sse_event("error", {"error": error_message})
                 return
 
-            if flow_data_store[flow_id].get("status") == BuildStatus.IN_PROGRESS:
+            if flow_data.get("status") == BuildStatus.IN_PROGRESS:
                 error_message = "Already building"
-                yield str(StreamData(event="error", data={"error": error_message}))
+                yield sse_event("error", {"error": error_message})
                 return
 
-            graph_data = flow_data_store[flow_id].get("graph_data")
-            user_id = flow_data_store[flow_id]["user_id"]
+            graph_data = flow_data.get("graph_data")
+            user_id = flow_data["user_id"]
 
             if not graph_data:
                 error_message = "No data provided"
-                yield str(StreamData(event="error", data={"error": error_message}))
+                yield sse_event("error", {"error": error_message})
                 return
 
             logger.debug("Building langchain object")
 
             # Some error could happen when building the graph
-            graph = Graph.from_payload(graph_data)
+            graph = build_graph_with_plan(graph_data)
 
-            number_of_nodes = len(graph.nodes)
-            flow_data_store[flow_id]["status"] = BuildStatus.IN_PROGRESS
+            levels = graph.sort_vertices_by_level(vertex_id)
+            number_of_nodes = sum(len(level) for level in levels)
+            previous_status = flow_data["status"]
+            set_build_status(flow_data_store, flow_id, BuildStatus.IN_PROGRESS)
 
-            for i, vertex in enumerate(graph.generator_build(), 1):
+            i = 0
+            # Vertices identical to one built before by the same user, in
+            # this flow or any other, are taken from the cache instead of
+            # rebuilt
+            async for vertex, error in abuild_vertices_by_level(
+                graph,
+                user_id=user_id,
+                cache=chat_manager.vertex_cache,
+                cache_namespace=str(user_id),
+                target_id=vertex_id,
+            ):
+                i += 1
                 try:
                     log_dict = {
                         "log": f"Building node {vertex.vertex_type}",
                     }
-                    yield str(StreamData(event="log", data=log_dict))
-                    vertex.build(user_id)
+                    yield sse_event("log", log_dict)
+                    if error is not None:
+                        raise error
                     params = vertex._built_object_repr()
                     valid = True
                     logger.debug(f"Building node {str(vertex.vertex_type)}")
@@ -179,18 +276,23 @@ async def stream_build(
                     logger.exception(exc)
                     params = str(exc)
                     valid = False
-                    flow_data_store[flow_id]["status"] = BuildStatus.FAILURE
+                    set_build_status(flow_data_store, flow_id, BuildStatus.FAILURE)
 
                 response = {
                     "valid": valid,
                     "params": params,
                     "id": vertex.id,
+                    "reused": vertex.reused,
                     "progress": round(i / number_of_nodes, 2),
                 }
 
-                yield str(StreamData(event="message", data=response))
+                yield sse_event("message", response)
+
+            if vertex_id is not None:
+                set_build_status(flow_data_store, flow_id, previous_status)
+                return
 
-            langchain_object = graph.build()
+            langchain_object = await graph.abuild(user_id=user_id)
             # Now we  need to check the input_keys to send them to the client
             if hasattr(langchain_object, "input_keys"):
                 input_keys_response = build_input_keys_response(
@@ -202,18 +304,18 @@ async def stream_build(
                     "memory_keys": [],
                     "handle_keys": [],
                 }
-            yield str(StreamData(event="message", data=input_keys_response))
+            yield sse_event("message", input_keys_response)
             chat_manager.set_cache(flow_id, langchain_object)
             # We need to reset the chat history
             chat_manager.chat_history.empty_history(flow_id)
-            flow_data_store[flow_id]["status"] = BuildStatus.SUCCESS
+            set_build_status(flow_data_store, flow_id, BuildStatus.SUCCESS)
         except Exception as exc:
             logger.exception(exc)
             logger.error("Error while building the flow: %s", exc)
-            flow_data_store[flow_id]["status"] = BuildStatus.FAILURE
-            yield str(StreamData(event="error", data={"error": str(exc)}))
+            set_build_status(flow_data_store, flow_id, BuildStatus.FAILURE)
+            yield sse_event("error", {"error": str(exc)})
         finally:
-            yield str(StreamData(event="message", data=final_response))
+            yield sse_event("message", final_response)
 
     try:
         return StreamingResponse(event_stream(flow_id), media_type="text/event-stream")
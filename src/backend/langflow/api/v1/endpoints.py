@@ -1,19 +1,28 @@
+import asyncio
 from http import HTTPStatus
 from typing import Annotated, Any, Optional, Union
 from langflow.services.auth.utils import api_key_security, get_current_active_user
 
 from langflow.services.cache.utils import save_uploaded_file
 from langflow.services.database.models.flow import Flow
-from langflow.processing.process import process_graph_cached, process_tweaks
+from langflow.processing.base import process_graph_stream
+from langflow.processing.process import (
+    process_graph_batch,
+    process_graph_cached,
+    process_tweaks,
+)
 from langflow.services.database.models.user.user import User
 from langflow.services.getters import get_settings_manager
 from loguru import logger
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, Body, status
+from fastapi.responses import StreamingResponse
 import sqlalchemy as sa
 from langflow.interface.custom.custom_component import CustomComponent
 
 
 from langflow.api.v1.schemas import (
+    BatchProcessRequest,
+    BatchProcessResponse,
     ProcessResponse,
     UploadFileResponse,
     CustomComponentCode,
@@ -94,61 +103,126 @@ async def process_flow(
     tweaks: Optional[dict] = None,
     clear_cache: Annotated[bool, Body(embed=True)] = False,  # noqa: F821
     session_id: Annotated[Union[None, str], Body(embed=True)] = None,  # noqa: F821
+    stream: Annotated[bool, Body(embed=True)] = False,  # noqa: F821
     api_key_user: User = Depends(api_key_security),
 ):
     """
     Endpoint to process an input with a given flow_id.
+
+    If stream is true, the response is a stream of server-sent events with
+    the tokens and intermediate steps as they are generated, followed by
+    the result.
     """
 
     try:
-        if api_key_user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid API Key",
+        graph_data = get_graph_data(session, flow_id, tweaks, api_key_user)
+        if stream:
+            events = process_graph_stream(
+                graph_data,
+                inputs,
+                clear_cache,
+                session_id,
+                user_id=api_key_user.id,
             )
+            return StreamingResponse(
+                (str(event) async for event in events),
+                media_type="text/event-stream",
+            )
+        response, session_id = await process_graph_cached(
+            graph_data, inputs, clear_cache, session_id, user_id=api_key_user.id
+        )
+        return ProcessResponse(result=response, session_id=session_id)
+    except Exception as exc:
+        raise process_error_to_http_exception(exc, flow_id) from exc
+
+
+@router.post(
+    "/process/{flow_id}/batch",
+    response_model=BatchProcessResponse,
+)
+async def process_flow_batch(
+    session: Annotated[Session, Depends(get_session)],
+    flow_id: str,
+    batch: BatchProcessRequest,
+    api_key_user: User = Depends(api_key_security),
+):
+    """
+    Endpoint to process a list of inputs with a given flow_id.
 
-        # Get the flow that matches the flow_id and belongs to the user
-        flow = (
-            session.query(Flow)
-            .filter(Flow.id == flow_id)
-            .filter(Flow.user_id == api_key_user.id)
-            .first()
+    The flow is loaded once and the inputs run concurrently through it.
+    Results and errors are returned per input, in the same order.
+    """
+
+    try:
+        graph_data = get_graph_data(session, flow_id, batch.tweaks, api_key_user)
+        results, session_id = await process_graph_batch(
+            graph_data,
+            batch.inputs,
+            batch.clear_cache,
+            batch.session_id,
+            user_id=api_key_user.id,
         )
-        if flow is None:
-            raise ValueError(f"Flow {flow_id} not found")
-
-        if flow.data is None:
-            raise ValueError(f"Flow {flow_id} has no data")
-        graph_data = flow.data
-        if tweaks:
-            try:
-                graph_data = process_tweaks(graph_data, tweaks)
-            except Exception as exc:
-                logger.error(f"Error processing tweaks: {exc}")
-        response, session_id = process_graph_cached(
-            graph_data, inputs, clear_cache, session_id
+        return BatchProcessResponse(results=results, session_id=session_id)
+    except Exception as exc:
+        raise process_error_to_http_exception(exc, flow_id) from exc
+
+
+def get_graph_data(
+    session: Session,
+    flow_id: str,
+    tweaks: Optional[dict],
+    api_key_user: Optional[User],
+) -> dict:
+    """Returns the data of the user's flow with the tweaks applied."""
+    if api_key_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API Key",
         )
-        return ProcessResponse(result=response, session_id=session_id)
-    except sa.exc.StatementError as exc:
+
+    # Get the flow that matches the flow_id and belongs to the user
+    flow = (
+        session.query(Flow)
+        .filter(Flow.id == flow_id)
+        .filter(Flow.user_id == api_key_user.id)
+        .first()
+    )
+    if flow is None:
+        raise ValueError(f"Flow {flow_id} not found")
+
+    if flow.data is None:
+        raise ValueError(f"Flow {flow_id} has no data")
+    graph_data = flow.data
+    if tweaks:
+        try:
+            graph_data = process_tweaks(graph_data, tweaks)
+        except Exception as exc:
+            logger.error(f"Error processing tweaks: {exc}")
+    return graph_data
+
+
+def process_error_to_http_exception(exc: Exception, flow_id: str) -> HTTPException:
+    if isinstance(exc, HTTPException):
+        return exc
+    if isinstance(exc, asyncio.TimeoutError):
+        return HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Processing flow {flow_id} timed out",
+        )
+    if isinstance(exc, sa.exc.StatementError):
         # StatementError('(builtins.ValueError) badly formed hexadecimal UUID string')
         if "badly formed hexadecimal UUID string" in str(exc):
             # This means the Flow ID is not a valid UUID which means it can't find the flow
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)
-            ) from exc
-    except ValueError as exc:
+            return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+    if isinstance(exc, ValueError):
         if f"Flow {flow_id} not found" in str(exc):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)
-            ) from exc
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)
-            ) from exc
-    except Exception as e:
-        # Log stack trace
-        logger.exception(e)
-        raise HTTPException(status_code=500, detail=str(e)) from e
+            return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+        return HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc)
+        )
+    # Log stack trace
+    logger.exception(exc)
+    return HTTPException(status_code=500, detail=str(exc))
 
 
 @router.post(
@@ -5,7 +5,7 @@ from uuid import UUID
 from langflow.services.database.models.api_key.api_key import ApiKeyRead
 from langflow.services.database.models.flow import FlowCreate, FlowRead
 from langflow.services.database.models.user import UserRead
-from langflow.services.database.models.base import orjson_dumps
+from langflow.api.v1.serialization import sse_event
 
 from pydantic import BaseModel, Field, validator
 
@@ -54,6 +54,29 @@ class ProcessResponse(BaseModel):
     session_id: Optional[str] = None
 
 
+class BatchProcessRequest(BaseModel):
+    """Batch process request schema."""
+
+    inputs: List[dict]
+    tweaks: Optional[dict] = None
+    clear_cache: bool = False
+    session_id: Optional[str] = None
+
+
+class BatchItemResult(BaseModel):
+    """Result of a single input of a batch."""
+
+    result: Any = None
+    error: Optional[str] = None
+
+
+class BatchProcessResponse(BaseModel):
+    """Batch process response schema."""
+
+    results: List[BatchItemResult]
+    session_id: Optional[str] = None
+
+
 class ChatMessage(BaseModel):
     """Chat message schema."""
 
@@ -92,6 +115,14 @@ class FileResponse(ChatMessage):
         return v
 
 
+class ChatHistoryResponse(BaseModel):
+    """A page of the chat history, oldest message first."""
+
+    messages: List[Dict[str, Any]]
+    # Position to pass as before to get the previous page
+    next_before: Optional[int] = None
+
+
 class FlowListCreate(BaseModel):
     flows: List[FlowCreate]
 
@@ -120,9 +151,7 @@ class StreamData(BaseModel):
     data: dict
 
     def __str__(self) -> str:
-        return (
-            f"event: {self.event}\ndata: {orjson_dumps(self.data, indent_2=False)}\n\n"
-        )
+        return sse_event(self.event, self.data)
 
 
 class CustomComponentCode(BaseModel):
@@ -0,0 +1,73 @@
+"""
+Serialization of the chat websocket frames and of the server-sent events.
+
+Payloads are encoded with orjson straight to the text that is sent, instead
+of going through pydantic's dict() and the standard json module of
+Starlette's send_json. Fixed envelopes are serialized once.
+"""
+from typing import Any, Dict, List, Optional
+
+import orjson
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    return str(obj)
+
+
+def dumps(data: Any) -> str:
+    """Encodes data to JSON text. Pydantic models are encoded as dicts."""
+    return orjson.dumps(data, default=_default).decode("utf-8")
+
+
+def loads(text: str) -> Any:
+    """
+    Decodes a JSON frame. Frames holding a JSON string, sent by clients that
+    encode their payloads twice, are decoded once more.
+    """
+    data = orjson.loads(text)
+    if isinstance(data, str):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return data
+    return data
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formats a server-sent event."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+# Same shape as ChatResponse.dict()
+def _chat_response_envelope(type: str) -> Dict[str, Any]:
+    return {
+        "is_bot": True,
+        "message": None,
+        "type": type,
+        "intermediate_steps": "",
+        "files": [],
+    }
+
+
+START_ENVELOPE = _chat_response_envelope("start")
+STREAM_ENVELOPE = _chat_response_envelope("stream")
+END_ENVELOPE = _chat_response_envelope("end")
+# The start message never changes
+START_FRAME = dumps(START_ENVELOPE)
+
+
+def end_frame(
+    message: Any, intermediate_steps: str = "", files: Optional[List[Any]] = None
+) -> str:
+    """Encodes the end message of an answer."""
+    return dumps(
+        {
+            **END_ENVELOPE,
+            "message": message,
+            "intermediate_steps": intermediate_steps,
+            "files": files or [],
+        }
+    )
@@ -1,12 +1,44 @@
+from functools import lru_cache
 from loguru import logger
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Tuple
 
 if TYPE_CHECKING:
     from langflow.graph.vertex.base import Vertex
 
 
+@lru_cache(maxsize=4096)
+def match_types(
+    source_types: Tuple[str, ...], target_reqs: Tuple[str, ...]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Returns whether an edge between these output and input types is valid and
+    the output type the target expects.
+
+    Flows reuse the same few components over and over, so the result is
+    cached for each pair of type lists instead of being matched for every edge.
+    """
+    # Both lists contain strings and sometimes a string contains the value we are
+    # looking for e.g. comgin_out=["Chain"] and target_reqs=["LLMChain"]
+    # so we need to check if any of the strings in source_types is in target_reqs
+    valid = any(
+        output in target_req for output in source_types for target_req in target_reqs
+    )
+    # Get what type of input the target node is expecting
+    target_set = set(target_reqs)
+    matched_type = next(
+        (output for output in source_types if output in target_set), None
+    )
+    return valid, matched_type
+
+
 class Edge:
-    def __init__(self, source: "Vertex", target: "Vertex", edge: dict):
+    def __init__(
+        self,
+        source: "Vertex",
+        target: "Vertex",
+        edge: dict,
+        matched_type: Optional[str] = None,
+    ):
         self.source: "Vertex" = source
         self.target: "Vertex" = target
         self.source_handle = edge.get("sourceHandle", "")
@@ -15,26 +47,30 @@ class Edge:
         # target_param is documents
         self.target_param = self.target_handle.split("|")[1]
 
-        self.validate_edge()
+        if matched_type is None:
+            self.validate_edge()
+        else:
+            # The edge was already validated when the execution plan was compiled
+            self.source_types = self.source.output
+            self.target_reqs = self.target.required_inputs + self.target.optional_inputs
+            self.valid = True
+            self.matched_type = matched_type
+        # Identity used for hashing and equality. Computed once so that
+        # set lookups don't have to rebuild the repr string every time
+        self._key = (
+            self.source.id,
+            self.target.id,
+            self.target_param,
+            self.matched_type,
+        )
 
     def validate_edge(self) -> None:
         # Validate that the outputs of the source node are valid inputs
         # for the target node
         self.source_types = self.source.output
         self.target_reqs = self.target.required_inputs + self.target.optional_inputs
-        # Both lists contain strings and sometimes a string contains the value we are
-        # looking for e.g. comgin_out=["Chain"] and target_reqs=["LLMChain"]
-        # so we need to check if any of the strings in source_types is in target_reqs
-        self.valid = any(
-            output in target_req
-            for output in self.source_types
-            for target_req in self.target_reqs
-        )
-        # Get what type of input the target node is expecting
-
-        self.matched_type = next(
-            (output for output in self.source_types if output in self.target_reqs),
-            None,
+        self.valid, self.matched_type = match_types(
+            tuple(self.source_types), tuple(self.target_reqs)
         )
         no_matched_type = self.matched_type is None
         if no_matched_type:
@@ -52,11 +88,7 @@ class Edge:
         )
 
     def __hash__(self) -> int:
-        return hash(self.__repr__())
+        return hash(self._key)
 
     def __eq__(self, __value: object) -> bool:
-        return (
-            self.__repr__() == __value.__repr__()
-            if isinstance(__value, Edge)
-            else False
-        )
+        return self._key == __value._key if isinstance(__value, Edge) else False
@@ -1,7 +1,14 @@
-from typing import Dict, Generator, List, Type, Union
+import copy
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Generator, List, Optional, Set, Type, Union
 
 from langflow.graph.edge.base import Edge
 from langflow.graph.graph.constants import lazy_load_vertex_dict
+from langflow.graph.graph.scheduler import abuild_vertices_by_level
+from langflow.graph.graph.plan import (
+    get_vertex_class_by_name,
+    resolve_params,
+)
 from langflow.graph.vertex.base import Vertex
 from langflow.graph.vertex.types import (
     FileToolVertex,
@@ -13,6 +20,9 @@ from langflow.utils import payload
 from loguru import logger
 from langchain.chains.base import Chain
 
+if TYPE_CHECKING:
+    from langflow.graph.graph.plan import ExecutionPlan
+
 
 class Graph:
     """A class representing a graph of nodes and edges."""
@@ -24,8 +34,17 @@ class Graph:
     ) -> None:
         self._nodes = nodes
         self._edges = edges
+        self._init_indexes()
         self._build_graph()
 
+    def _init_indexes(self) -> None:
+        # Indexes kept alongside the node and edge lists so lookups
+        # don't need to scan the whole graph
+        self._vertex_map: Dict[str, Vertex] = {}
+        self._in_edges: Dict[str, List[Edge]] = defaultdict(list)
+        self._out_edges: Dict[str, List[Edge]] = defaultdict(list)
+        self._sorted_levels: Optional[List[List[Vertex]]] = None
+
     @classmethod
     def from_payload(cls, payload: Dict) -> "Graph":
         """
@@ -48,13 +67,49 @@ class Graph:
                 f"Invalid payload. Expected keys 'nodes' and 'edges'. Found {list(payload.keys())}"
             ) from exc
 
+    @classmethod
+    def from_plan(cls, plan: "ExecutionPlan") -> "Graph":
+        """
+        Creates a graph from a compiled execution plan.
+
+        Vertex classes, parsed vertex data, edge types, params and the build
+        order come from the plan, so none of them are computed again. The
+        node and edge data are copied, as building the vertices modifies
+        them and the plan is shared by every graph created from it.
+        """
+        graph = cls.__new__(cls)
+        graph._edges = [copy.deepcopy(edge_plan.edge) for edge_plan in plan.edges]
+        graph.nodes = [
+            get_vertex_class_by_name(vertex_plan.vertex_class).from_plan(vertex_plan)
+            for vertex_plan in plan.vertices
+        ]
+        graph._nodes = [vertex._data for vertex in graph.nodes]
+        graph._init_indexes()
+        graph._vertex_map = {node.id: node for node in graph.nodes}
+        graph.edges = [
+            Edge(
+                graph._vertex_map[edge["source"]],
+                graph._vertex_map[edge["target"]],
+                edge,
+                matched_type=edge_plan.matched_type,
+            )
+            for edge, edge_plan in zip(graph._edges, plan.edges)
+        ]
+        graph._index_edges()
+        for vertex, vertex_plan in zip(graph.nodes, plan.vertices):
+            vertex.params = resolve_params(vertex_plan.params, graph._vertex_map)
+        graph._sorted_levels = [
+            [graph._vertex_map[vertex_id] for vertex_id in level]
+            for level in plan.levels
+        ]
+        return graph
+
     def _build_graph(self) -> None:
         """Builds the graph from the nodes and edges."""
         self.nodes = self._build_vertices()
+        self._vertex_map = {node.id: node for node in self.nodes}
         self.edges = self._build_edges()
-        for edge in self.edges:
-            edge.source.add_edge(edge)
-            edge.target.add_edge(edge)
+        self._index_edges()
 
         # This is a hack to make sure that the LLM node is sent to
         # the toolkit node
@@ -62,6 +117,14 @@ class Graph:
         # remove invalid nodes
         self._validate_nodes()
 
+    def _index_edges(self) -> None:
+        """Registers the edges on their vertices and in the adjacency indexes."""
+        for edge in self.edges:
+            edge.source.add_edge(edge)
+            edge.target.add_edge(edge)
+            self._out_edges[edge.source.id].append(edge)
+            self._in_edges[edge.target.id].append(edge)
+
     def _build_node_params(self) -> None:
         """Identifies and handles the LLM node within the graph."""
         llm_node = None
@@ -92,22 +155,65 @@ class Graph:
 
     def get_node(self, node_id: str) -> Union[None, Vertex]:
         """Returns a node by id."""
-        return next((node for node in self.nodes if node.id == node_id), None)
+        return self._vertex_map.get(node_id)
 
     def get_nodes_with_target(self, node: Vertex) -> List[Vertex]:
         """Returns the nodes connected to a node."""
         connected_nodes: List[Vertex] = [
-            edge.source for edge in self.edges if edge.target == node
+            edge.source for edge in self._in_edges.get(node.id, [])
         ]
         return connected_nodes
 
-    def build(self) -> Chain:
-        """Builds the graph."""
-        # Get root node
-        root_node = payload.get_root_node(self)
-        if root_node is None:
-            raise ValueError("No root node found")
-        return root_node.build()
+    def get_successors(self, node: Vertex) -> List[Vertex]:
+        """Returns the nodes that the given node points to."""
+        return [edge.target for edge in self._out_edges.get(node.id, [])]
+
+    def get_target_node(self, target_id: Optional[str] = None) -> Vertex:
+        """Returns the vertex with the given id, or the root node if no id is given."""
+        if target_id is None:
+            root_node = payload.get_root_node(self)
+            if root_node is None:
+                raise ValueError("No root node found")
+            return root_node
+        target_node = self.get_node(target_id)
+        if target_node is None:
+            raise ValueError(f"Vertex {target_id} not found")
+        return target_node
+
+    def get_ancestors(self, vertex_id: str) -> Set[str]:
+        """Returns the ids of every vertex the given vertex depends on."""
+        ancestors: Set[str] = set()
+        stack = [vertex_id]
+        while stack:
+            for edge in self._in_edges.get(stack.pop(), []):
+                if edge.source.id not in ancestors:
+                    ancestors.add(edge.source.id)
+                    stack.append(edge.source.id)
+        ancestors.discard(vertex_id)
+        return ancestors
+
+    def build(self, target_id: Optional[str] = None) -> Chain:
+        """
+        Builds the graph and returns the object of the root node or, if a
+        target id is given, of that vertex. Only the vertices the returned
+        object depends on are built.
+        """
+        return self.get_target_node(target_id).build()
+
+    async def abuild(
+        self,
+        user_id=None,
+        max_workers: Optional[int] = None,
+        target_id: Optional[str] = None,
+    ) -> Chain:
+        """Builds the graph without blocking the event loop."""
+        target_node = self.get_target_node(target_id)
+        async for _, error in abuild_vertices_by_level(
+            self, user_id, max_workers, target_id=target_node.id
+        ):
+            if error is not None:
+                raise error
+        return await target_node.abuild(user_id=user_id)
 
     def topological_sort(self) -> List[Vertex]:
         """
@@ -119,30 +225,116 @@ class Graph:
         Raises:
             ValueError: If the graph contains a cycle.
         """
-        # States: 0 = unvisited, 1 = visiting, 2 = visited
-        state = {node: 0 for node in self.nodes}
-        sorted_vertices = []
+        return [vertex for level in self.sort_vertices_by_level() for vertex in level]
 
-        def dfs(node):
-            if state[node] == 1:
-                # We have a cycle
-                raise ValueError(
-                    "Graph contains a cycle, cannot perform topological sort"
-                )
-            if state[node] == 0:
-                state[node] = 1
-                for edge in node.edges:
-                    if edge.source == node:
-                        dfs(edge.target)
-                state[node] = 2
-                sorted_vertices.append(node)
-
-        # Visit each node
-        for node in self.nodes:
-            if state[node] == 0:
-                dfs(node)
+    def sort_vertices_by_level(
+        self, target_id: Optional[str] = None
+    ) -> List[List[Vertex]]:
+        """
+        Groups the vertices into dependency levels using Kahn's algorithm.
+
+        Every vertex is placed one level after the deepest vertex it depends on,
+        so the vertices inside a level don't depend on each other and can be
+        built at the same time. The sort is iterative and runs in O(V + E),
+        so it works for arbitrarily deep flows.
+
+        Args:
+            target_id: If given, only the vertex with this id and the vertices
+                it depends on are returned, so branches that don't lead to it
+                are skipped.
+
+        Returns:
+            List[List[Vertex]]: The levels, each sorted in the order the
+            vertices were declared in the flow.
+
+        Raises:
+            ValueError: If the graph contains a cycle. The message lists the
+            ids of the vertices on the cycle.
+        """
+        # The graph doesn't change once built, so the levels are computed once
+        if self._sorted_levels is None:
+            self._sorted_levels = self._compute_levels()
+        if target_id is None:
+            return [list(level) for level in self._sorted_levels]
+
+        needed = self.get_ancestors(self.get_target_node(target_id).id)
+        needed.add(target_id)
+        levels = [
+            [vertex for vertex in level if vertex.id in needed]
+            for level in self._sorted_levels
+        ]
+        return [level for level in levels if level]
+
+    def _compute_levels(self) -> List[List[Vertex]]:
+        node_positions = {node.id: position for position, node in enumerate(self.nodes)}
+        in_degree = {
+            node.id: len(self._in_edges.get(node.id, [])) for node in self.nodes
+        }
+        levels: List[List[Vertex]] = []
+        current_level = [node for node in self.nodes if in_degree[node.id] == 0]
+        number_of_sorted = 0
+        while current_level:
+            levels.append(current_level)
+            number_of_sorted += len(current_level)
+            next_level = []
+            for vertex in current_level:
+                for edge in self._out_edges.get(vertex.id, []):
+                    in_degree[edge.target.id] -= 1
+                    if in_degree[edge.target.id] == 0:
+                        next_level.append(edge.target)
+            next_level.sort(key=lambda vertex: node_positions[vertex.id])
+            current_level = next_level
+
+        if number_of_sorted != len(self.nodes):
+            cycle = self._find_cycle(
+                [node for node in self.nodes if in_degree[node.id] > 0]
+            )
+            raise ValueError(
+                "Graph contains a cycle, cannot perform topological sort: "
+                + " -> ".join(cycle)
+            )
+        return levels
+
+    def _find_cycle(self, remaining: List[Vertex]) -> List[str]:
+        """
+        Finds a cycle among the vertices Kahn's algorithm could not sort.
 
-        return list(reversed(sorted_vertices))
+        Each of them still has an incoming edge from another one of them,
+        so walking those edges backwards must eventually revisit a vertex.
+        """
+        remaining_ids = {vertex.id for vertex in remaining}
+        path: List[str] = []
+        path_positions: Dict[str, int] = {}
+        vertex_id = remaining[0].id
+        while vertex_id not in path_positions:
+            path_positions[vertex_id] = len(path)
+            path.append(vertex_id)
+            vertex_id = next(
+                edge.source.id
+                for edge in self._in_edges[vertex_id]
+                if edge.source.id in remaining_ids
+            )
+        # The walk went against the edges, reverse it to follow them
+        cycle = path[path_positions[vertex_id] :][::-1]
+        return cycle + [cycle[0]]
+
+    def compute_content_hashes(self) -> Dict[str, Optional[str]]:
+        """
+        Computes the content hash of every vertex.
+
+        A vertex hash covers its own params and the hashes of the vertices
+        it depends on, so changing a vertex changes the hash of everything
+        built on top of it, while identical subgraphs get identical hashes
+        whatever flow they belong to.
+
+        Returns:
+            Dict[str, Optional[str]]: The content hash of each vertex by id,
+            None for the vertices that can't be hashed.
+        """
+        hashes: Dict[str, Optional[str]] = {}
+        for vertex in self.topological_sort():
+            hashes[vertex.id] = vertex.compute_content_hash(hashes)
+        return hashes
 
     def generator_build(self) -> Generator[Vertex, None, None]:
         """Builds each vertex in the graph and yields it."""
@@ -153,17 +345,19 @@ class Graph:
     def get_node_neighbors(self, node: Vertex) -> Dict[Vertex, int]:
         """Returns the neighbors of a node."""
         neighbors: Dict[Vertex, int] = {}
-        for edge in self.edges:
+        for edge in self._out_edges.get(node.id, []):
+            neighbor = edge.target
+            if neighbor not in neighbors:
+                neighbors[neighbor] = 0
+            neighbors[neighbor] += 1
+        for edge in self._in_edges.get(node.id, []):
+            # Self loops were already counted as outgoing edges
             if edge.source == node:
-                neighbor = edge.target
-                if neighbor not in neighbors:
-                    neighbors[neighbor] = 0
-                neighbors[neighbor] += 1
-            elif edge.target == node:
-                neighbor = edge.source
-                if neighbor not in neighbors:
-                    neighbors[neighbor] = 0
-                neighbors[neighbor] += 1
+                continue
+            neighbor = edge.source
+            if neighbor not in neighbors:
+                neighbors[neighbor] = 0
+            neighbors[neighbor] += 1
         return neighbors
 
     def _build_edges(self) -> List[Edge]:
@@ -0,0 +1,247 @@
+import copy
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
+
+import orjson
+from loguru import logger
+
+# Imported so every vertex class is registered as a subclass of Vertex
+from langflow.graph.vertex import types  # noqa: F401
+from langflow.graph.vertex.base import Vertex
+from langflow.services.cache.flow import InMemoryCache
+from langflow.services.cache.utils import CACHE_DIR, compute_dict_hash
+
+if TYPE_CHECKING:
+    from langflow.graph.graph.base import Graph
+
+# Bump whenever the layout of the plan changes so stale plans stored on disk
+# are compiled again instead of being loaded
+PLAN_VERSION = 1
+
+VERTEX_REF_KEY = "__vertex_ref__"
+
+plan_cache = InMemoryCache(max_size=100)
+
+
+@dataclass(frozen=True)
+class VertexPlan:
+    id: str
+    vertex_class: str
+    node: Dict[str, Any]
+    vertex_type: str
+    base_type: Optional[str]
+    output: Tuple[str, ...]
+    required_inputs: Tuple[str, ...]
+    optional_inputs: Tuple[str, ...]
+    params: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class EdgePlan:
+    edge: Dict[str, Any]
+    matched_type: str
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """
+    Everything computed from a flow before its vertices are built: the vertex
+    classes, the parsed vertex data, the validated edges, the params of each
+    vertex and the dependency levels.
+
+    Plans only hold plain data, so they can be shared by every build of the
+    same flow and stored as JSON.
+    """
+
+    vertices: Tuple[VertexPlan, ...]
+    edges: Tuple[EdgePlan, ...]
+    levels: Tuple[Tuple[str, ...], ...]
+    version: int = PLAN_VERSION
+
+    @classmethod
+    def from_graph(cls, graph: "Graph") -> "ExecutionPlan":
+        """Compiles the plan of a graph. It must be called before any build."""
+        vertices = tuple(
+            VertexPlan(
+                id=vertex.id,
+                vertex_class=type(vertex).__name__,
+                node=copy.deepcopy(vertex._data),
+                vertex_type=vertex.vertex_type,
+                base_type=vertex.base_type,
+                output=tuple(vertex.output),
+                required_inputs=tuple(vertex.required_inputs),
+                optional_inputs=tuple(vertex.optional_inputs),
+                params=dump_params(vertex.params),
+            )
+            for vertex in graph.nodes
+        )
+        edges = tuple(
+            EdgePlan(
+                edge={
+                    "source": edge.source.id,
+                    "target": edge.target.id,
+                    "sourceHandle": edge.source_handle,
+                    "targetHandle": edge.target_handle,
+                },
+                matched_type=edge.matched_type,
+            )
+            for edge in graph.edges
+        )
+        levels = tuple(
+            tuple(vertex.id for vertex in level)
+            for level in graph.sort_vertices_by_level()
+        )
+        return cls(vertices=vertices, edges=edges, levels=levels)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "vertices": [vertex.__dict__ for vertex in self.vertices],
+            "edges": [edge.__dict__ for edge in self.edges],
+            "levels": self.levels,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExecutionPlan":
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(
+                f"Unsupported execution plan version: {data.get('version')}"
+            )
+        vertices = tuple(
+            VertexPlan(
+                **{
+                    **vertex,
+                    "output": tuple(vertex["output"]),
+                    "required_inputs": tuple(vertex["required_inputs"]),
+                    "optional_inputs": tuple(vertex["optional_inputs"]),
+                }
+            )
+            for vertex in data["vertices"]
+        )
+        edges = tuple(EdgePlan(**edge) for edge in data["edges"])
+        levels = tuple(tuple(level) for level in data["levels"])
+        return cls(vertices=vertices, edges=edges, levels=levels)
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, data: bytes) -> "ExecutionPlan":
+        return cls.from_dict(orjson.loads(data))
+
+
+def dump_params(value: Any) -> Any:
+    """Replaces the vertices in the params with references to their ids."""
+    if isinstance(value, Vertex):
+        return {VERTEX_REF_KEY: value.id}
+    if isinstance(value, dict):
+        return {key: dump_params(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [dump_params(item) for item in value]
+    return value
+
+
+def resolve_params(value: Any, vertex_map: Dict[str, Vertex]) -> Any:
+    """
+    Inverse of dump_params. Containers are always copied because the params
+    are modified in place while the vertices are built.
+    """
+    if isinstance(value, dict):
+        if VERTEX_REF_KEY in value and len(value) == 1:
+            return vertex_map[value[VERTEX_REF_KEY]]
+        return {key: resolve_params(item, vertex_map) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_params(item, vertex_map) for item in value]
+    return value
+
+
+def _collect_vertex_classes() -> Dict[str, Type[Vertex]]:
+    classes: Dict[str, Type[Vertex]] = {"Vertex": Vertex}
+    pending: List[Type[Vertex]] = [Vertex]
+    while pending:
+        for subclass in pending.pop().__subclasses__():
+            if subclass.__name__ not in classes:
+                classes[subclass.__name__] = subclass
+                pending.append(subclass)
+    return classes
+
+
+VERTEX_CLASSES = _collect_vertex_classes()
+
+
+def get_vertex_class_by_name(name: str) -> Type[Vertex]:
+    try:
+        return VERTEX_CLASSES[name]
+    except KeyError:
+        # Classes defined after this module was imported
+        VERTEX_CLASSES.update(_collect_vertex_classes())
+        return VERTEX_CLASSES[name]
+
+
+def get_plan_dir() -> Optional[Path]:
+    from langflow.services.getters import get_settings_manager
+
+    if not get_settings_manager().settings.PLAN_CACHE_ON_DISK:
+        return None
+    return Path(CACHE_DIR) / "plans"
+
+
+def load_plan_from_disk(key: str) -> Optional[ExecutionPlan]:
+    plan_dir = get_plan_dir()
+    if plan_dir is None:
+        return None
+    plan_path = plan_dir / f"{key}.json"
+    if not plan_path.exists():
+        return None
+    try:
+        return ExecutionPlan.from_json(plan_path.read_bytes())
+    except Exception as exc:
+        logger.debug(f"Discarding execution plan {key}: {exc}")
+        return None
+
+
+def save_plan_to_disk(key: str, plan: ExecutionPlan) -> None:
+    plan_dir = get_plan_dir()
+    if plan_dir is None:
+        return
+    try:
+        content = plan.to_json()
+    except TypeError as exc:
+        # Params that aren't plain data (e.g. set by custom code)
+        # can only be kept in memory
+        logger.debug(f"Execution plan {key} can't be stored on disk: {exc}")
+        return
+    plan_dir.mkdir(parents=True, exist_ok=True)
+    plan_path = plan_dir / f"{key}.json"
+    tmp_path = plan_path.with_suffix(".tmp")
+    tmp_path.write_bytes(content)
+    tmp_path.replace(plan_path)
+
+
+def build_graph_with_plan(data_graph: Dict) -> "Graph":
+    """
+    Creates the graph of a flow, compiling its execution plan the first time
+    the flow is seen and reusing it afterwards.
+
+    The plan is kept in memory and, if the PLAN_CACHE_ON_DISK setting is
+    enabled, in the cache directory so it survives restarts.
+    """
+    from langflow.graph.graph.base import Graph
+
+    payload = data_graph.get("data", data_graph)
+    key = f"{PLAN_VERSION}-{compute_dict_hash(payload)}"
+    plan = plan_cache.get(key)
+    if plan is None:
+        plan = load_plan_from_disk(key)
+        if plan is not None:
+            plan_cache.set(key, plan)
+    if plan is not None:
+        logger.debug(f"Using execution plan {key}")
+        return Graph.from_plan(plan)
+
+    graph = Graph.from_payload(payload)
+    plan = ExecutionPlan.from_graph(graph)
+    plan_cache.set(key, plan)
+    save_plan_to_disk(key, plan)
+    return graph
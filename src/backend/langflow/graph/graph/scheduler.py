@@ -0,0 +1,193 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Dict,
+    Generator,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from langflow.services.cache.base import BaseCache
+    from langflow.graph.graph.base import Graph
+    from langflow.graph.vertex.base import Vertex
+
+
+def get_max_build_workers() -> int:
+    """Returns the configured limit of vertices built concurrently."""
+    from langflow.services.getters import get_settings_manager
+
+    return get_settings_manager().settings.MAX_BUILD_WORKERS
+
+
+def build_vertices_by_level(
+    graph: "Graph",
+    user_id=None,
+    max_workers: Optional[int] = None,
+    target_id: Optional[str] = None,
+) -> Generator[Tuple["Vertex", Optional[Exception]], None, None]:
+    """
+    Builds the vertices of the graph one dependency level at a time.
+
+    The vertices of a level don't depend on each other, so they are built
+    concurrently on a bounded thread pool. Most of the build time is spent
+    waiting on I/O (loaders, embeddings, remote clients), so independent
+    branches of the flow no longer wait on each other.
+
+    Results are yielded once the whole level is done, level by level and in
+    the order the vertices were declared, so errors are reported in the same
+    order regardless of which thread finished first.
+
+    Args:
+        graph: The graph whose vertices will be built.
+        user_id: The id of the user building the flow.
+        max_workers: Maximum number of vertices built at the same time.
+            Defaults to the MAX_BUILD_WORKERS setting.
+        target_id: If given, only this vertex and the vertices it depends on
+            are built.
+
+    Yields:
+        Tuple[Vertex, Optional[Exception]]: Each vertex and the exception
+        raised while building it, if any.
+    """
+    if max_workers is None:
+        max_workers = get_max_build_workers()
+    max_workers = max(1, max_workers)
+
+    levels = graph.sort_vertices_by_level(target_id)
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="langflow-build"
+    ) as executor:
+        for level in levels:
+            logger.debug(f"Building level with {len(level)} vertices")
+            if len(level) == 1 or max_workers == 1:
+                for vertex in level:
+                    yield vertex, _build_vertex(vertex, user_id)
+                continue
+
+            futures = [
+                executor.submit(_build_vertex, vertex, user_id) for vertex in level
+            ]
+            results = [future.result() for future in futures]
+            yield from zip(level, results)
+
+
+async def abuild_vertices_by_level(
+    graph: "Graph",
+    user_id=None,
+    max_workers: Optional[int] = None,
+    cache: Optional["BaseCache"] = None,
+    cache_namespace: str = "",
+    target_id: Optional[str] = None,
+) -> AsyncGenerator[Tuple["Vertex", Optional[Exception]], None]:
+    """
+    Async counterpart of build_vertices_by_level.
+
+    Each vertex is built with Vertex.abuild, so the event loop stays free
+    to serve other requests while the blocking instantiation runs on the
+    executor. At most max_workers vertices of a level are built at once.
+
+    If a cache is given, built objects are stored in it under their content
+    hash, and a vertex is taken from the cache instead of being rebuilt when
+    its hash is unchanged and every vertex it depends on was reused too.
+    Vertices that can't be hashed are always built and never cached.
+    Hashes don't depend on the flow, so a cache shared between flows lets
+    them reuse the objects of identical subgraphs. Reused vertices have
+    their reused attribute set.
+
+    Args:
+        graph: The graph whose vertices will be built.
+        user_id: The id of the user building the flow.
+        max_workers: Maximum number of vertices built at the same time.
+        cache: Cache holding the objects of previous builds.
+        cache_namespace: Prefix for the cache keys, e.g. the user id.
+        target_id: If given, only this vertex and the vertices it depends on
+            are built.
+    """
+    if max_workers is None:
+        max_workers = get_max_build_workers()
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    if cache is not None:
+        graph.compute_content_hashes()
+    reused_ids: Set[str] = set()
+
+    def cache_key(vertex: "Vertex") -> str:
+        return f"{cache_namespace}:{vertex.content_hash}"
+
+    def try_reuse(vertex: "Vertex") -> bool:
+        if cache is None or not vertex.can_be_cached or vertex.content_hash is None:
+            return False
+        predecessors = graph.get_nodes_with_target(vertex)
+        if any(predecessor.id not in reused_ids for predecessor in predecessors):
+            return False
+        cached = cache.get(cache_key(vertex))
+        if cached is None:
+            return False
+        vertex.set_built_object(cached["built_object"], cached["artifacts"])
+        return True
+
+    async def abuild_vertex(vertex: "Vertex") -> Optional[Exception]:
+        async with semaphore:
+            try:
+                await vertex.abuild(user_id=user_id)
+            except Exception as exc:
+                return exc
+        if (
+            cache is not None
+            and vertex.can_be_cached
+            and vertex.content_hash is not None
+        ):
+            cache.set(
+                cache_key(vertex),
+                {"built_object": vertex._built_object, "artifacts": vertex.artifacts},
+            )
+        return None
+
+    for level in graph.sort_vertices_by_level(target_id):
+        for vertex in level:
+            if try_reuse(vertex):
+                logger.debug(f"Reusing {vertex.vertex_type} ({vertex.id})")
+                reused_ids.add(vertex.id)
+        to_build = [vertex for vertex in level if vertex.id not in reused_ids]
+        logger.debug(f"Building level with {len(to_build)} vertices")
+        errors = await asyncio.gather(*(abuild_vertex(vertex) for vertex in to_build))
+        results = dict(zip((vertex.id for vertex in to_build), errors))
+        for vertex in level:
+            yield vertex, results.get(vertex.id)
+
+
+def build_graph_vertices(
+    graph: "Graph",
+    user_id=None,
+    max_workers: Optional[int] = None,
+    target_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Builds every vertex of the graph and returns the merged artifacts.
+
+    Raises the first error reported by build_vertices_by_level, after the
+    level it happened in is done.
+    """
+    artifacts: Dict[str, Any] = {}
+    for vertex, error in build_vertices_by_level(
+        graph, user_id, max_workers, target_id
+    ):
+        if error is not None:
+            raise error
+        if vertex.artifacts:
+            artifacts.update(vertex.artifacts)
+    return artifacts
+
+
+def _build_vertex(vertex: "Vertex", user_id=None) -> Optional[Exception]:
+    try:
+        vertex.build(user_id=user_id)
+    except Exception as exc:
+        return exc
+    return None
@@ -1,31 +1,82 @@
 import ast
+import asyncio
+import contextvars
+import copy
+import hashlib
 from langflow.graph.utils import UnbuiltObject
+from langflow.graph.vertex.pool import copy_pooled_instance, instance_pool
 from langflow.interface.initialize import loading
 from langflow.interface.listing import lazy_load_dict
 from langflow.utils.constants import DIRECT_TYPES
 from loguru import logger
 from langflow.utils.util import sync_to_async
+import orjson
 
 
 import inspect
+import os
+import threading
 import types
-from typing import Any, Dict, List, Optional
+import weakref
+from typing import Any, Dict, List, Optional, Set
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from langflow.graph.edge.base import Edge
+    from langflow.graph.graph.plan import VertexPlan
 
 
 class Vertex:
+    # Whether the built object can be reused by a later build of an
+    # identical vertex. Stateful objects (e.g. memories) must not be shared.
+    can_be_cached: bool = True
+    # Whether the built object can be shared with every other vertex of the
+    # same type built with the same params, through the instance pool
+    poolable: bool = False
+
     def __init__(self, data: Dict, base_type: Optional[str] = None) -> None:
+        self._init_attributes(data, base_type)
+        self._parse_data()
+
+    def _init_attributes(self, data: Dict, base_type: Optional[str]) -> None:
         self.id: str = data["id"]
         self._data = data
         self.edges: List["Edge"] = []
+        self._edge_set: Set["Edge"] = set()
         self.base_type: Optional[str] = base_type
-        self._parse_data()
         self._built_object = UnbuiltObject()
         self._built = False
         self.artifacts: Dict[str, Any] = {}
+        self.content_hash: Optional[str] = None
+        # Whether the built object was taken from a previous build
+        self.reused = False
+        self._pool_finalizer: Optional[weakref.finalize] = None
+        # Held while building, so vertices sharing a dependency that run at
+        # the same time build it only once. Reentrant so a build reaching
+        # the same vertex again in the same thread doesn't deadlock
+        self._build_lock = threading.RLock()
+
+    @classmethod
+    def from_plan(cls, vertex_plan: "VertexPlan") -> "Vertex":
+        """
+        Creates the vertex from its compiled plan, reusing the parsed data
+        instead of parsing the node again. Params are set by Graph.from_plan
+        once every vertex exists.
+        """
+        vertex = cls.__new__(cls)
+        # The plan is shared, and building the vertex modifies its data
+        node = copy.deepcopy(vertex_plan.node)
+        vertex._init_attributes(node, vertex_plan.base_type)
+        vertex.data = node["data"]
+        vertex.output = list(vertex_plan.output)
+        vertex.required_inputs = list(vertex_plan.required_inputs)
+        vertex.optional_inputs = list(vertex_plan.optional_inputs)
+        vertex.vertex_type = vertex_plan.vertex_type
+        vertex._init_from_plan()
+        return vertex
+
+    def _init_from_plan(self) -> None:
+        """Sets the attributes subclasses define in __init__."""
 
     def _parse_data(self) -> None:
         self.data = self._data["data"]
@@ -63,10 +114,7 @@ class Vertex:
         )
 
         if self.base_type is None:
-            for base_type, value in lazy_load_dict.ALL_TYPES_DICT.items():
-                if self.vertex_type in value:
-                    self.base_type = base_type
-                    break
+            self.base_type = lazy_load_dict.BASE_TYPE_MAP.get(self.vertex_type)
 
     def _build_params(self):
         # sourcery skip: merge-list-append, remove-redundant-if
@@ -92,13 +140,17 @@ class Vertex:
         params = {}
 
         for edge in self.edges:
+            # Only the incoming edges set params. Outgoing edges can point to
+            # a param with the same name on the target
+            if edge.target.id != self.id:
+                continue
             param_key = edge.target_param
             if param_key in template_dict:
                 if template_dict[param_key]["list"]:
                     if param_key not in params:
                         params[param_key] = []
                     params[param_key].append(edge.source)
-                elif edge.target.id == self.id:
+                else:
                     params[param_key] = edge.source
 
         for key, value in template_dict.items():
@@ -237,18 +289,51 @@ class Vertex:
         if self.base_type is None:
             raise ValueError(f"Base type for node {self.vertex_type} not found")
         try:
-            result = loading.instantiate_class(
-                node_type=self.vertex_type,
-                base_type=self.base_type,
-                params=self.params,
-                user_id=user_id,
-            )
+            if self.poolable:
+                result = self._instantiate_from_pool(user_id)
+            else:
+                result = self._instantiate(user_id)
             self._update_built_object_and_artifacts(result)
         except Exception as exc:
             raise ValueError(
                 f"Error building node {self.vertex_type}: {str(exc)}"
             ) from exc
 
+    def _instantiate(self, user_id=None):
+        return loading.instantiate_class(
+            node_type=self.vertex_type,
+            base_type=self.base_type,
+            params=self.params,
+            user_id=user_id,
+        )
+
+    def _instantiate_from_pool(self, user_id=None):
+        """
+        Takes the built object from the instance pool, building it only if
+        no vertex of the user built the same type with the same params
+        before. The reference is released when the vertex is garbage
+        collected or rebuilt.
+
+        Each vertex gets a shallow copy of the pooled object: the expensive
+        parts, like the client or the loaded model, are shared, but the
+        settings changed on a built flow, like streaming, are not. Objects
+        that can't be copied are not pooled.
+        """
+        key = instance_pool.make_key(self.vertex_type, self.params, user_id)
+        if key is None:
+            return self._instantiate(user_id)
+        pooled = instance_pool.acquire(key, lambda: self._instantiate(user_id))
+        try:
+            result = copy_pooled_instance(pooled)
+        except Exception as exc:
+            logger.debug(f"Not pooling {self.vertex_type}: {exc}")
+            instance_pool.release(key)
+            return self._instantiate(user_id)
+        if self._pool_finalizer is not None:
+            self._pool_finalizer()
+        self._pool_finalizer = weakref.finalize(self, instance_pool.release, key)
+        return result
+
     def _update_built_object_and_artifacts(self, result):
         """
         Updates the built object and its artifacts.
@@ -272,13 +357,104 @@ class Vertex:
             raise ValueError(message)
 
     def build(self, force: bool = False, user_id=None, *args, **kwargs) -> Any:
-        if not self._built or force:
-            self._build(user_id, *args, **kwargs)
+        with self._build_lock:
+            if not self._built or force:
+                self._build(user_id, *args, **kwargs)
 
-        return self._built_object
+            return self._built_object
+
+    async def abuild(self, force: bool = False, user_id=None, *args, **kwargs) -> Any:
+        """
+        Builds the vertex without blocking the event loop.
+
+        Instantiating most components blocks on I/O, so the build runs on the
+        loop's default executor. If the component returns an awaitable (e.g. a
+        custom component with an async build method) it is awaited on the loop.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        built_object = await loop.run_in_executor(
+            None, lambda: context.run(self.build, force, user_id, *args, **kwargs)
+        )
+        if inspect.isawaitable(built_object):
+            built_object = await built_object
+            self._built_object = built_object
+        return built_object
+
+    def compute_content_hash(self, hashes: Dict[str, Optional[str]]) -> Optional[str]:
+        """
+        Computes a Merkle hash of the vertex: its type and params, with every
+        vertex in the params replaced by that vertex's hash, and every file
+        param by its path, modification time and size.
+
+        Vertex ids aren't part of the hash, so identical subgraphs of
+        different flows have the same hashes.
+
+        Args:
+            hashes: The content hash of each vertex this one depends on, by id.
+
+        Returns:
+            The hex digest, which is also stored in self.content_hash, or None
+            if the params can't be canonicalized (e.g. they hold objects built
+            by other vertices) or a vertex they depend on has no hash, in
+            which case the vertex must not be taken from a cache.
+        """
+        self.content_hash = None
+        file_params = {
+            key
+            for key, value in self.data["node"]["template"].items()
+            if isinstance(value, dict) and value.get("type") == "file"
+        }
+        try:
+            params = {
+                key: self._hash_file(value)
+                if key in file_params
+                else self._hash_params(value, hashes)
+                for key, value in self.params.items()
+            }
+            content = {
+                "type": self.vertex_type,
+                "base_type": self.base_type,
+                "params": params,
+            }
+            serialized = orjson.dumps(content, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return None
+        self.content_hash = hashlib.sha256(serialized).hexdigest()
+        return self.content_hash
+
+    def _hash_params(self, value: Any, hashes: Dict[str, Optional[str]]) -> Any:
+        if isinstance(value, Vertex):
+            if hashes.get(value.id) is None:
+                raise TypeError(f"Vertex {value.id} has no content hash")
+            return {"vertex": hashes[value.id]}
+        if isinstance(value, dict):
+            return {key: self._hash_params(item, hashes) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self._hash_params(item, hashes) for item in value]
+        return value
+
+    @staticmethod
+    def _hash_file(file_path: Any) -> Any:
+        # A file replaced under the same path must change the hash
+        if not isinstance(file_path, str):
+            return file_path
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return {"file": file_path}
+        return {"file": file_path, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+
+    def set_built_object(self, built_object: Any, artifacts: Dict[str, Any]) -> None:
+        """Marks the vertex as built with an object built elsewhere."""
+        self._built_object = built_object
+        self.artifacts = artifacts
+        self._built = True
+        self.reused = True
 
     def add_edge(self, edge: "Edge") -> None:
-        if edge not in self.edges:
+        if edge not in self._edge_set:
+            self._edge_set.add(edge)
             self.edges.append(edge)
 
     def __repr__(self) -> str:
@@ -0,0 +1,139 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+from loguru import logger
+from pydantic import BaseModel
+
+PoolKey = Tuple[str, str, str]
+
+
+class _PoolEntry:
+    __slots__ = ("value", "refs", "last_used")
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+        self.refs = 0
+        self.last_used = time.time()
+
+
+def copy_pooled_instance(instance: Any) -> Any:
+    """
+    Returns a shallow copy of a pooled instance. The fields of pydantic
+    models, like LLMs and embeddings, are copied by reference, so the
+    objects they hold (e.g. the client) are shared with the pooled one.
+    """
+    if isinstance(instance, BaseModel):
+        return instance.copy()
+    return copy.copy(instance)
+
+
+class InstancePool:
+    """
+    A process-wide pool of built objects that are expensive to create and
+    safe to share, such as LLM clients and embedding models.
+
+    Instances are keyed by the user, the node type and a hash of the params
+    they were built with, so two vertices only share an instance when they
+    belong to the same user and would have built identical ones. Each vertex holding an instance counts as a
+    reference. Unreferenced instances are evicted once they are older than
+    expiration_time or, least recently used first, when the pool holds more
+    than max_size instances. Referenced instances are never evicted.
+
+    Attributes:
+        max_size (int): Number of instances above which unreferenced ones are evicted.
+        expiration_time (int): Time in seconds an unreferenced instance is kept.
+    """
+
+    def __init__(self, max_size: int = 64, expiration_time: int = 60 * 60) -> None:
+        self.max_size = max_size
+        self.expiration_time = expiration_time
+        self._entries: "OrderedDict[PoolKey, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(
+        node_type: str, params: Dict[str, Any], user_id=None
+    ) -> Optional[PoolKey]:
+        """
+        Returns the pool key for the params, or None if they can't be
+        canonicalized (e.g. they hold objects built by other vertices).
+        """
+        try:
+            canonical = orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return None
+        return str(user_id), node_type, hashlib.sha256(canonical).hexdigest()
+
+    def acquire(self, key: PoolKey, factory: Callable[[], Any]) -> Any:
+        """
+        Returns the instance for the key, creating it with factory if the pool
+        doesn't hold one, and adds a reference to it.
+
+        The factory runs outside the lock so slow instantiations don't block
+        the rest of the pool. If two threads create the same instance at once,
+        the first one stored wins.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                entry.refs += 1
+                entry.last_used = time.time()
+                return entry.value
+
+        value = factory()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _PoolEntry(value)
+                logger.debug(f"Added {key[1]} to the instance pool")
+            self._entries.move_to_end(key)
+            entry.refs += 1
+            entry.last_used = time.time()
+            self._evict()
+            return entry.value
+
+    def release(self, key: PoolKey) -> None:
+        """Removes a reference to the instance for the key."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.time()
+            self._evict()
+
+    def refs(self, key: PoolKey) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.refs if entry is not None else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self) -> None:
+        # Must be called with the lock held
+        now = time.time()
+        unreferenced = [key for key, entry in self._entries.items() if not entry.refs]
+        excess = len(self._entries) - self.max_size
+        for key in unreferenced:
+            if excess > 0 or now - self._entries[key].last_used >= self.expiration_time:
+                del self._entries[key]
+                excess -= 1
+
+    def __contains__(self, key: PoolKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+instance_pool = InstancePool()
@@ -10,6 +10,9 @@ class AgentVertex(Vertex):
     def __init__(self, data: Dict):
         super().__init__(data, base_type="agents")
 
+        self._init_from_plan()
+
+    def _init_from_plan(self) -> None:
         self.tools: List[Union[ToolkitVertex, ToolVertex]] = []
         self.chains: List[ChainVertex] = []
 
@@ -22,19 +25,20 @@ class AgentVertex(Vertex):
                 self.chains.append(source_node)
 
     def build(self, force: bool = False, user_id=None, *args, **kwargs) -> Any:
-        if not self._built or force:
-            self._set_tools_and_chains()
-            # First, build the tools
-            for tool_node in self.tools:
-                tool_node.build(user_id=user_id)
+        with self._build_lock:
+            if not self._built or force:
+                self._set_tools_and_chains()
+                # First, build the tools
+                for tool_node in self.tools:
+                    tool_node.build(user_id=user_id)
 
-            # Next, build the chains and the rest
-            for chain_node in self.chains:
-                chain_node.build(tools=self.tools, user_id=user_id)
+                # Next, build the chains and the rest
+                for chain_node in self.chains:
+                    chain_node.build(tools=self.tools, user_id=user_id)
 
-            self._build(user_id=user_id)
+                self._build(user_id=user_id)
 
-        return self._built_object
+            return self._built_object
 
 
 class ToolVertex(Vertex):
@@ -43,25 +47,13 @@ class ToolVertex(Vertex):
 
 
 class LLMVertex(Vertex):
-    built_node_type = None
-    class_built_object = None
+    # LLMs can take up too much memory or time to load, so the flows of a
+    # user using the same model with the same settings share it
+    poolable = True
 
     def __init__(self, data: Dict):
         super().__init__(data, base_type="llms")
 
-    def build(self, force: bool = False, user_id=None, *args, **kwargs) -> Any:
-        # LLM is different because some models might take up too much memory
-        # or time to load. So we only load them when we need them.ß
-        if self.vertex_type == self.built_node_type:
-            return self.class_built_object
-        if not self._built or force:
-            self._build(user_id=user_id)
-            self.built_node_type = self.vertex_type
-            self.class_built_object = self._built_object
-        # Avoid deepcopying the LLM
-        # that are loaded from a file
-        return self._built_object
-
 
 class ToolkitVertex(Vertex):
     def __init__(self, data: Dict):
@@ -78,11 +70,12 @@ class WrapperVertex(Vertex):
         super().__init__(data, base_type="wrappers")
 
     def build(self, force: bool = False, user_id=None, *args, **kwargs) -> Any:
-        if not self._built or force:
-            if "headers" in self.params:
-                self.params["headers"] = ast.literal_eval(self.params["headers"])
-            self._build(user_id=user_id)
-        return self._built_object
+        with self._build_lock:
+            if not self._built or force:
+                if "headers" in self.params:
+                    self.params["headers"] = ast.literal_eval(self.params["headers"])
+                self._build(user_id=user_id)
+            return self._built_object
 
 
 class DocumentLoaderVertex(Vertex):
@@ -104,6 +97,8 @@ class DocumentLoaderVertex(Vertex):
 
 
 class EmbeddingVertex(Vertex):
+    poolable = True
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="embeddings")
 
@@ -118,6 +113,9 @@ class GraphStoreVertex(Vertex):
 
 
 class MemoryVertex(Vertex):
+    # Memories hold the conversation, so a rebuild must get a fresh one
+    can_be_cached = False
+
     def __init__(self, data: Dict):
         super().__init__(data, base_type="memory")
 
@@ -156,17 +154,18 @@ class ChainVertex(Vertex):
         *args,
         **kwargs,
     ) -> Any:
-        if not self._built or force:
-            # Check if the chain requires a PromptVertex
-            for key, value in self.params.items():
-                if isinstance(value, PromptVertex):
-                    # Build the PromptVertex, passing the tools if available
-                    tools = kwargs.get("tools", None)
-                    self.params[key] = value.build(tools=tools, force=force)
+        with self._build_lock:
+            if not self._built or force:
+                # Check if the chain requires a PromptVertex
+                for key, value in self.params.items():
+                    if isinstance(value, PromptVertex):
+                        # Build the PromptVertex, passing the tools if available
+                        tools = kwargs.get("tools", None)
+                        self.params[key] = value.build(tools=tools, force=force)
 
-            self._build(user_id=user_id)
+                self._build(user_id=user_id)
 
-        return self._built_object
+            return self._built_object
 
 
 class PromptVertex(Vertex):
@@ -181,45 +180,46 @@ class PromptVertex(Vertex):
         *args,
         **kwargs,
     ) -> Any:
-        if not self._built or force:
-            if (
-                "input_variables" not in self.params
-                or self.params["input_variables"] is None
-            ):
-                self.params["input_variables"] = []
-            # Check if it is a ZeroShotPrompt and needs a tool
-            if "ShotPrompt" in self.vertex_type:
-                tools = (
-                    [tool_node.build(user_id=user_id) for tool_node in tools]
-                    if tools is not None
-                    else []
-                )
-                # flatten the list of tools if it is a list of lists
-                # first check if it is a list
-                if tools and isinstance(tools, list) and isinstance(tools[0], list):
-                    tools = flatten_list(tools)
-                self.params["tools"] = tools
-                prompt_params = [
-                    key
-                    for key, value in self.params.items()
-                    if isinstance(value, str) and key != "format_instructions"
-                ]
-            else:
-                prompt_params = ["template"]
-
-            if "prompt" not in self.params and "messages" not in self.params:
-                for param in prompt_params:
-                    prompt_text = self.params[param]
-                    variables = extract_input_variables_from_prompt(prompt_text)
-                    self.params["input_variables"].extend(variables)
-                self.params["input_variables"] = list(
-                    set(self.params["input_variables"])
-                )
-            else:
-                self.params.pop("input_variables", None)
-
-            self._build(user_id=user_id)
-        return self._built_object
+        with self._build_lock:
+            if not self._built or force:
+                if (
+                    "input_variables" not in self.params
+                    or self.params["input_variables"] is None
+                ):
+                    self.params["input_variables"] = []
+                # Check if it is a ZeroShotPrompt and needs a tool
+                if "ShotPrompt" in self.vertex_type:
+                    tools = (
+                        [tool_node.build(user_id=user_id) for tool_node in tools]
+                        if tools is not None
+                        else []
+                    )
+                    # flatten the list of tools if it is a list of lists
+                    # first check if it is a list
+                    if tools and isinstance(tools, list) and isinstance(tools[0], list):
+                        tools = flatten_list(tools)
+                    self.params["tools"] = tools
+                    prompt_params = [
+                        key
+                        for key, value in self.params.items()
+                        if isinstance(value, str) and key != "format_instructions"
+                    ]
+                else:
+                    prompt_params = ["template"]
+
+                if "prompt" not in self.params and "messages" not in self.params:
+                    for param in prompt_params:
+                        prompt_text = self.params[param]
+                        variables = extract_input_variables_from_prompt(prompt_text)
+                        self.params["input_variables"].extend(variables)
+                    self.params["input_variables"] = list(
+                        set(self.params["input_variables"])
+                    )
+                else:
+                    self.params.pop("input_variables", None)
+
+                self._build(user_id=user_id)
+            return self._built_object
 
     def _built_object_repr(self):
         if (
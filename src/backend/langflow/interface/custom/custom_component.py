@@ -176,8 +176,8 @@ class CustomComponent(Component, extra=Extra.allow):
         return validate.create_function(self.code, self.function_entrypoint_name)
 
     def load_flow(self, flow_id: str, tweaks: Optional[dict] = None) -> Any:
-        from langflow.processing.process import build_sorted_vertices_with_caching
         from langflow.processing.process import process_tweaks
+        from langflow.services.getters import get_session_manager
 
         db_manager = get_db_manager()
         with session_getter(db_manager) as session:
@@ -186,7 +186,10 @@ class CustomComponent(Component, extra=Extra.allow):
             raise ValueError(f"Flow {flow_id} not found")
         if tweaks:
             graph_data = process_tweaks(graph_data=graph_data, tweaks=tweaks)
-        return build_sorted_vertices_with_caching(graph_data)
+        langchain_object, artifacts, _ = get_session_manager().load_session(
+            graph_data, user_id=self.user_id
+        )
+        return langchain_object, artifacts
 
     def list_flows(self, *, get_session: Optional[Callable] = None) -> List[Flow]:
         if not self.user_id:
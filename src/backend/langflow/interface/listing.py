@@ -1,3 +1,5 @@
+from typing import Dict
+
 from langflow.interface.agents.base import agent_creator
 from langflow.interface.chains.base import chain_creator
 from langflow.interface.document_loaders.base import documentloader_creator
@@ -20,11 +22,27 @@ from langflow.utils.lazy_load import LazyLoadDictBase
 class AllTypesDict(LazyLoadDictBase):
     def __init__(self):
         self._all_types_dict = None
+        self._base_type_map = None
 
     @property
     def ALL_TYPES_DICT(self):
         return self.all_types_dict
 
+    @property
+    def BASE_TYPE_MAP(self) -> Dict[str, str]:
+        """
+        Maps each node type to its base type, so finding the base type of a
+        node doesn't scan every list of ALL_TYPES_DICT. If a type is listed
+        under more than one base type, the first one wins.
+        """
+        if self._base_type_map is None:
+            base_type_map: Dict[str, str] = {}
+            for base_type, node_types in self.all_types_dict.items():
+                for node_type in node_types:
+                    base_type_map.setdefault(node_type, base_type)
+            self._base_type_map = base_type_map
+        return self._base_type_map
+
     def _build_dict(self):
         langchain_types_dict = self.get_type_dict()
         return {
@@ -1,6 +1,10 @@
+import warnings
 from typing import Any, Dict, Tuple
+
 from langflow.services.cache.utils import memoize_dict
 from langflow.graph import Graph
+from langflow.graph.graph.plan import build_graph_with_plan
+from langflow.graph.graph.scheduler import build_graph_vertices
 from loguru import logger
 
 
@@ -8,28 +12,34 @@ from loguru import logger
 def build_langchain_object_with_caching(data_graph):
     """
     Build langchain object from data_graph.
+
+    Deprecated: use SessionManager.load_session, which bounds the cached
+    objects and partitions them by user.
     """
 
+    warnings.warn(
+        "build_langchain_object_with_caching is deprecated, "
+        "use SessionManager.load_session instead",
+        DeprecationWarning,
+    )
     logger.debug("Building langchain object")
-    graph = Graph.from_payload(data_graph)
+    graph = build_graph_with_plan(data_graph)
     return graph.build()
 
 
-@memoize_dict(maxsize=10)
-def build_sorted_vertices_with_caching(data_graph) -> Tuple[Any, Dict]:
+def build_sorted_vertices(data_graph) -> Tuple[Any, Dict]:
     """
     Build langchain object from data_graph.
+
+    Use SessionManager.load_session to reuse the objects built for a flow.
     """
 
     logger.debug("Building langchain object")
-    graph = Graph.from_payload(data_graph)
-    sorted_vertices = graph.topological_sort()
-    artifacts = {}
-    for vertex in sorted_vertices:
-        vertex.build()
-        if vertex.artifacts:
-            artifacts.update(vertex.artifacts)
-    return graph.build(), artifacts
+    graph = build_graph_with_plan(data_graph)
+    # Branches the root node doesn't depend on are never built
+    root_node = graph.get_target_node()
+    artifacts = build_graph_vertices(graph, target_id=root_node.id)
+    return root_node.build(), artifacts
 
 
 def build_langchain_object(data_graph):
@@ -6,6 +6,7 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from langflow.api import router
+from langflow.api.routing import SessionRoutingMiddleware
 
 
 from langflow.interface.utils import setup_llm_caching
@@ -33,6 +34,7 @@ def create_app():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(SessionRoutingMiddleware)
 
     @app.get("/health")
     def health():
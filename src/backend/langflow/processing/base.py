@@ -1,9 +1,26 @@
-from typing import List, Union, TYPE_CHECKING
+import asyncio
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union, TYPE_CHECKING
 from langflow.api.v1.callback import (
     AsyncStreamingLLMCallbackHandler,
+    QueueSender,
     StreamingLLMCallbackHandler,
 )
-from langflow.processing.process import fix_memory_inputs, format_actions
+from langflow.api.v1.schemas import StreamData
+from langflow.interface.utils import try_setting_streaming_options
+from langflow.processing.process import (
+    agenerate_result,
+    aload_langchain_object,
+    aget_result_and_thought,
+    fix_memory_inputs,
+    format_actions,
+    get_process_timeout,
+    get_result_and_thought,
+    process_inputs,
+    clear_caches_if_needed,
+    run_in_process_executor,
+    supports_acall,
+)
+from langchain.chains.base import Chain
 from loguru import logger
 from langchain.agents.agent import AgentExecutor
 from langchain.callbacks.base import BaseCallbackHandler
@@ -104,3 +121,93 @@ async def get_result_and_steps(langchain_object, inputs: Union[dict, str], **kwa
         logger.exception(exc)
         raise ValueError(f"Error: {str(exc)}") from exc
     return result, thought
+
+
+async def astream_result(langchain_object: Any, inputs: dict, sender: QueueSender):
+    """
+    Generates the result like agenerate_result, sending the tokens and the
+    intermediate steps of chains to the sender as they are produced.
+    """
+    if not isinstance(langchain_object, Chain):
+        return await agenerate_result(langchain_object, inputs)
+
+    try_setting_streaming_options(langchain_object, None)
+    if supports_acall(langchain_object):
+        try:
+            callbacks = [AsyncStreamingLLMCallbackHandler(sender)]
+            return await aget_result_and_thought(langchain_object, inputs, callbacks)
+        except ValueError as exc:
+            # Some component of the chain has no async support
+            if not isinstance(exc.__cause__, NotImplementedError):
+                raise
+            logger.debug(f"Falling back to a sync call: {exc}")
+    callbacks = [StreamingLLMCallbackHandler(sender)]
+    return await run_in_process_executor(
+        get_result_and_thought, langchain_object, inputs, callbacks
+    )
+
+
+def stream_message_to_event(message: Dict[str, Any]) -> StreamData:
+    if message.get("message"):
+        return StreamData(event="token", data={"token": message["message"]})
+    return StreamData(event="step", data={"step": message["intermediate_steps"]})
+
+
+async def process_graph_stream(
+    data_graph: Dict[str, Any],
+    inputs: Optional[dict] = None,
+    clear_cache=False,
+    session_id=None,
+    timeout: Optional[float] = None,
+    user_id=None,
+) -> AsyncGenerator[StreamData, None]:
+    """
+    Streaming counterpart of process_graph_cached.
+
+    Yields a "token" event for each token generated by the LLM, a "step"
+    event for each tool or agent step, and ends with a "result" event
+    holding the result and the session id, or an "error" event.
+    """
+    if timeout is None:
+        timeout = get_process_timeout()
+    sender = QueueSender()
+
+    async def process():
+        clear_caches_if_needed(clear_cache, user_id)
+        langchain_object, artifacts, _session_id = await aload_langchain_object(
+            data_graph, session_id, user_id
+        )
+        processed_inputs = process_inputs(inputs, artifacts)
+        result = await astream_result(langchain_object, processed_inputs, sender)
+        return result, _session_id
+
+    task = asyncio.create_task(asyncio.wait_for(process(), timeout=timeout or None))
+    try:
+        while not task.done():
+            next_message = asyncio.create_task(sender.queue.get())
+            await asyncio.wait(
+                {next_message, task}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not next_message.done():
+                next_message.cancel()
+                break
+            yield stream_message_to_event(next_message.result())
+        while not sender.queue.empty():
+            yield stream_message_to_event(sender.queue.get_nowait())
+
+        try:
+            result, session_id = await task
+        except asyncio.TimeoutError:
+            yield StreamData(
+                event="error", data={"error": f"Timed out after {timeout}s"}
+            )
+        except Exception as exc:
+            logger.exception(exc)
+            yield StreamData(event="error", data={"error": str(exc)})
+        else:
+            yield StreamData(
+                event="result", data={"result": result, "session_id": session_id}
+            )
+    finally:
+        # The client went away before the end of the stream
+        task.cancel()
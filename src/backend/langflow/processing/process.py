@@ -1,19 +1,23 @@
+import asyncio
+import contextvars
+import functools
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from langchain.schema import AgentAction
-from langflow.interface.run import (
-    build_sorted_vertices_with_caching,
-    get_memory_key,
-    update_memory_keys,
-)
+from langflow.interface.run import get_memory_key, update_memory_keys
 from loguru import logger
 from langflow.graph import Graph
 from langchain.chains.base import Chain
 from langchain.vectorstores.base import VectorStore
 from langchain.graphs.base import GraphStore
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from langchain.schema import Document
 
+_process_executor: Optional[ThreadPoolExecutor] = None
+_process_executor_lock = threading.Lock()
+
 
 def fix_memory_inputs(langchain_object):
     """
@@ -59,7 +63,9 @@ def format_actions(actions: List[Tuple[AgentAction, str]]) -> str:
     return "\n".join(output)
 
 
-def get_result_and_thought(langchain_object: Any, inputs: dict):
+def get_result_and_thought(
+    langchain_object: Any, inputs: dict, callbacks: Optional[list] = None
+):
     """Get result and thought from extracted json"""
     try:
         if hasattr(langchain_object, "verbose"):
@@ -71,49 +77,78 @@ def get_result_and_thought(langchain_object: Any, inputs: dict):
         fix_memory_inputs(langchain_object)
 
         try:
-            output = langchain_object(inputs, return_only_outputs=True)
+            output = langchain_object(
+                inputs, return_only_outputs=True, callbacks=callbacks
+            )
         except ValueError as exc:
             # make the error message more informative
             logger.debug(f"Error: {str(exc)}")
-            output = langchain_object.run(inputs)
+            output = langchain_object.run(inputs, callbacks=callbacks)
 
     except Exception as exc:
         raise ValueError(f"Error: {str(exc)}") from exc
     return output
 
 
+def supports_acall(langchain_object: Any) -> bool:
+    """Whether the object is a chain that implements its own async call."""
+    return (
+        isinstance(langchain_object, Chain)
+        and type(langchain_object)._acall is not Chain._acall
+    )
+
+
+async def aget_result_and_thought(
+    langchain_object: Chain, inputs: dict, callbacks: Optional[list] = None
+):
+    """Async counterpart of get_result_and_thought using the chain's acall."""
+    try:
+        if hasattr(langchain_object, "verbose"):
+            langchain_object.verbose = True
+
+        if hasattr(langchain_object, "return_intermediate_steps"):
+            langchain_object.return_intermediate_steps = True
+
+        fix_memory_inputs(langchain_object)
+
+        output = await langchain_object.acall(
+            inputs, return_only_outputs=True, callbacks=callbacks
+        )
+    except Exception as exc:
+        raise ValueError(f"Error: {str(exc)}") from exc
+    return output
+
+
 def get_input_str_if_only_one_input(inputs: dict) -> Optional[str]:
     """Get input string if only one input is provided"""
     return list(inputs.values())[0] if len(inputs) == 1 else None
 
 
-def get_build_result(data_graph, session_id):
-    # If session_id is provided, load the langchain_object from the session
-    # using build_sorted_vertices_with_caching.get_result_by_session_id
-    # if it returns something different than None, return it
-    # otherwise, build the graph and return the result
-    if session_id:
-        logger.debug(f"Loading LangChain object from session {session_id}")
-        result = build_sorted_vertices_with_caching.get_result_by_session_id(session_id)
-        if result is not None:
-            logger.debug("Loaded LangChain object")
-            return result
-
-    logger.debug("Building langchain object")
-    return build_sorted_vertices_with_caching(data_graph)
+def has_memory(langchain_object: Any) -> bool:
+    """Whether the object keeps a conversation between calls in a memory."""
+    return getattr(langchain_object, "memory", None) is not None
 
 
-def clear_caches_if_needed(clear_cache: bool):
+def clear_caches_if_needed(clear_cache: bool, user_id=None):
     if clear_cache:
-        build_sorted_vertices_with_caching.clear_cache()
+        from langflow.services.getters import get_session_manager
+
+        get_session_manager().clear(user_id)
         logger.debug("Cleared cache")
 
 
 def load_langchain_object(
-    data_graph: Dict[str, Any], session_id: str
+    data_graph: Dict[str, Any], session_id: Optional[str], user_id=None
 ) -> Tuple[Union[Chain, VectorStore, GraphStore], Dict[str, Any], str]:
-    langchain_object, artifacts = get_build_result(data_graph, session_id)
-    session_id = build_sorted_vertices_with_caching.hash
+    """
+    Loads the langchain object of the flow from the user's session, building
+    it if needed. Returns it with the artifacts and the session id.
+    """
+    from langflow.services.getters import get_session_manager
+
+    langchain_object, artifacts, session_id = get_session_manager().load_session(
+        data_graph, session_id, user_id
+    )
     logger.debug("Loaded LangChain object")
 
     if langchain_object is None:
@@ -135,7 +170,9 @@ def process_inputs(inputs: Optional[dict], artifacts: Dict[str, Any]) -> dict:
     return inputs
 
 
-def generate_result(langchain_object: Union[Chain, VectorStore, GraphStore], inputs: dict):
+def generate_result(
+    langchain_object: Union[Chain, VectorStore, GraphStore], inputs: dict
+):
     if isinstance(langchain_object, Chain):
         if inputs is None:
             raise ValueError("Inputs must be provided for a Chain")
@@ -155,22 +192,154 @@ def generate_result(langchain_object: Union[Chain, VectorStore, GraphStore], inp
     return result
 
 
-def process_graph_cached(
+def get_process_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread pool that runs the blocking parts of processing a
+    flow, so they don't block the event loop. Its size is the
+    PROCESS_MAX_WORKERS setting.
+    """
+    global _process_executor
+    if _process_executor is None:
+        with _process_executor_lock:
+            if _process_executor is None:
+                from langflow.services.getters import get_settings_manager
+
+                max_workers = get_settings_manager().settings.PROCESS_MAX_WORKERS
+                _process_executor = ThreadPoolExecutor(
+                    max_workers=max(1, max_workers),
+                    thread_name_prefix="langflow-process",
+                )
+    return _process_executor
+
+
+async def run_in_process_executor(func: Callable, *args) -> Any:
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the context so context variables, e.g. the chat client
+    # id of the cache manager, are seen by func
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_process_executor(), functools.partial(context.run, func, *args)
+    )
+
+
+async def aload_langchain_object(
+    data_graph: Dict[str, Any], session_id: Optional[str], user_id=None
+) -> Tuple[Union[Chain, VectorStore, GraphStore], Dict[str, Any], str]:
+    """Runs load_langchain_object on the process thread pool."""
+    return await run_in_process_executor(
+        load_langchain_object, data_graph, session_id, user_id
+    )
+
+
+def get_process_timeout() -> Optional[float]:
+    from langflow.services.getters import get_settings_manager
+
+    return get_settings_manager().settings.PROCESS_TIMEOUT
+
+
+async def agenerate_result(
+    langchain_object: Union[Chain, VectorStore, GraphStore], inputs: dict
+):
+    """
+    Async counterpart of generate_result. Chains that implement acall run on
+    the event loop, anything else runs on the process thread pool.
+    """
+    if supports_acall(langchain_object):
+        try:
+            return await aget_result_and_thought(langchain_object, inputs)
+        except ValueError as exc:
+            # Some component of the chain has no async support
+            if not isinstance(exc.__cause__, NotImplementedError):
+                raise
+            logger.debug(f"Falling back to a sync call: {exc}")
+    return await run_in_process_executor(generate_result, langchain_object, inputs)
+
+
+async def process_graph_cached(
     data_graph: Dict[str, Any],
     inputs: Optional[dict] = None,
     clear_cache=False,
     session_id=None,
+    timeout: Optional[float] = None,
+    user_id=None,
 ) -> Tuple[Any, str]:
-    clear_caches_if_needed(clear_cache)
-    # If session_id is provided, load the langchain_object from the session
-    # else build the graph and return the result and the new session_id
-    langchain_object, artifacts, session_id = load_langchain_object(
-        data_graph, session_id
-    )
-    processed_inputs = process_inputs(inputs, artifacts)
-    result = generate_result(langchain_object, processed_inputs)
+    """
+    Processes the inputs with the flow without blocking the event loop.
+
+    Raises asyncio.TimeoutError if it takes longer than timeout seconds,
+    which defaults to the PROCESS_TIMEOUT setting. Work already running on
+    the thread pool can't be interrupted and finishes in the background.
+    """
+    if timeout is None:
+        timeout = get_process_timeout()
+
+    async def process() -> Tuple[Any, str]:
+        clear_caches_if_needed(clear_cache, user_id)
+        # If session_id is provided, load the langchain_object from the session
+        # else build the graph and return the result and the new session_id
+        langchain_object, artifacts, _session_id = await aload_langchain_object(
+            data_graph, session_id, user_id
+        )
+        processed_inputs = process_inputs(inputs, artifacts)
+        result = await agenerate_result(langchain_object, processed_inputs)
+        return result, _session_id
+
+    return await asyncio.wait_for(process(), timeout=timeout or None)
+
+
+async def process_graph_batch(
+    data_graph: Dict[str, Any],
+    inputs_list: List[dict],
+    clear_cache=False,
+    session_id=None,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    user_id=None,
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Runs every input through the same built flow and returns one
+    {"result", "error"} dict per input, in the same order.
+
+    The flow is loaded once and the inputs are processed as in
+    process_graph_cached, at most max_concurrency at the same time.
+    The timeout applies to each input.
 
-    return result, session_id
+    Every input uses the same object, so if it has a memory the inputs are
+    processed one after the other, in order, instead of interleaving their
+    turns in the conversation.
+    """
+    from langflow.services.getters import get_settings_manager
+
+    if max_concurrency is None:
+        max_concurrency = get_settings_manager().settings.BATCH_MAX_CONCURRENCY
+    if timeout is None:
+        timeout = get_process_timeout()
+
+    clear_caches_if_needed(clear_cache, user_id)
+    langchain_object, artifacts, session_id = await aload_langchain_object(
+        data_graph, session_id, user_id
+    )
+    if has_memory(langchain_object):
+        max_concurrency = 1
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def process_one(inputs: Optional[dict]) -> Dict[str, Any]:
+        processed_inputs = process_inputs(inputs, artifacts)
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(
+                    agenerate_result(langchain_object, processed_inputs),
+                    timeout=timeout or None,
+                )
+            except asyncio.TimeoutError:
+                return {"result": None, "error": f"Timed out after {timeout}s"}
+            except Exception as exc:
+                logger.debug(f"Error processing batch item: {exc}")
+                return {"result": None, "error": str(exc)}
+        return {"result": result, "error": None}
+
+    results = await asyncio.gather(*(process_one(inputs) for inputs in inputs_list))
+    return list(results), session_id
 
 
 def load_flow_from_json(
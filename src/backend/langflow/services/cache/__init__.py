@@ -1,5 +1,6 @@
 from . import factory, manager
 from langflow.services.cache.manager import cache_manager
+from langflow.services.cache.disk import DiskCache
 from langflow.services.cache.flow import InMemoryCache
 
 
@@ -7,5 +8,6 @@ __all__ = [
     "cache_manager",
     "factory",
     "manager",
+    "DiskCache",
     "InMemoryCache",
 ]
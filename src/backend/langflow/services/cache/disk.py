@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Union
+from urllib.parse import quote, unquote
+
+from loguru import logger
+
+from langflow.services.cache.base import BaseCache
+from langflow.services.cache.utils import dumps_signed, loads_signed
+
+SUFFIX = ".dill"
+
+
+class DiskCache(BaseCache):
+    """
+    A cache storing each item as a dill file in a directory, so items survive
+    restarts and can be read by every worker of the same machine.
+
+    Items that can't be serialized are skipped, so the caller builds them
+    again instead of failing. Once the files take more than max_size_bytes,
+    the least recently used ones are removed. Reading an item marks it as
+    used. Items older than expiration_time are ignored and removed.
+
+    Files are signed with secret_key, and files whose signature doesn't
+    match are discarded without being unpickled. They are not encrypted:
+    built flows hold the params of their components, including API keys,
+    so the directory must only be readable by the server.
+
+    Attributes:
+        cache_dir (Path): Directory holding the files.
+        secret_key (str): Key of the signatures of the files.
+        max_size_bytes (int, optional): Total size of the files above which the least recently used are removed.
+        expiration_time (int, optional): Time in seconds after which an item expires.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path],
+        max_size_bytes: Optional[int] = None,
+        expiration_time: Optional[int] = None,
+        *,
+        secret_key: Union[str, bytes],
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.secret_key = secret_key
+        self.max_size_bytes = max_size_bytes
+        self.expiration_time = expiration_time
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key) -> Path:
+        # Quoting keeps the file names reversible, see keys()
+        return self.cache_dir / f"{quote(str(key), safe='')}{SUFFIX}"
+
+    def get(self, key):
+        """
+        Retrieve an item from the cache.
+
+        Args:
+            key: The key of the item to retrieve.
+
+        Returns:
+            The value associated with the key, or None if the key is not found, the item has expired or it
+            can't be read.
+        """
+        path = self._path(key)
+        try:
+            stat = path.stat()
+            if (
+                self.expiration_time is not None
+                and time.time() - stat.st_mtime >= self.expiration_time
+            ):
+                self.delete(key)
+                return None
+            value = loads_signed(path.read_bytes(), self.secret_key)
+        except FileNotFoundError:
+            return None
+        except Exception as exc:
+            # Written by another version of the code or with another key, or
+            # a partial write
+            logger.debug(f"Discarding cached item {key}: {exc}")
+            self.delete(key)
+            return None
+        # Touch the file to make it recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """
+        Add an item to the cache, unless it can't be serialized.
+
+        Args:
+            key: The key of the item.
+            value: The value to cache.
+
+        Returns:
+            Whether the item was stored.
+        """
+        try:
+            content = dumps_signed(value, self.secret_key)
+        except Exception as exc:
+            logger.debug(f"Item {key} can't be stored on disk: {exc}")
+            return False
+        path = self._path(key)
+        tmp_path = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with self._lock:
+            try:
+                tmp_path.write_bytes(content)
+                tmp_path.replace(path)
+            except OSError as exc:
+                logger.warning(f"Could not store item {key} on disk: {exc}")
+                tmp_path.unlink(missing_ok=True)
+                return False
+            self._evict()
+        return True
+
+    def _evict(self):
+        # Must be called with the lock held
+        if self.max_size_bytes is None:
+            return
+        files = []
+        total_size = 0
+        for path in self.cache_dir.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+        for _, size, path in sorted(files, key=lambda item: item[0]):
+            if total_size <= self.max_size_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+    def delete(self, key):
+        """
+        Remove an item from the cache.
+
+        Args:
+            key: The key of the item to remove.
+        """
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self):
+        """
+        Clear all items from the cache.
+        """
+        with self._lock:
+            for path in self.cache_dir.glob(f"*{SUFFIX}"):
+                path.unlink(missing_ok=True)
+
+    def keys(self) -> List[str]:
+        """Return the keys of the items in the cache."""
+        return [
+            unquote(path.name[: -len(SUFFIX)])
+            for path in self.cache_dir.glob(f"*{SUFFIX}")
+        ]
+
+    def __contains__(self, key):
+        """Check if the key is in the cache."""
+        return self._path(key).exists()
+
+    def __getitem__(self, key):
+        """Retrieve an item from the cache using the square bracket notation."""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Add an item to the cache using the square bracket notation."""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Remove an item from the cache using the square bracket notation."""
+        self.delete(key)
+
+    def __len__(self):
+        """Return the number of items in the cache."""
+        return len(self.keys())
+
+    def __repr__(self):
+        """Return a string representation of the DiskCache instance."""
+        return f"DiskCache(cache_dir={str(self.cache_dir)!r}, max_size_bytes={self.max_size_bytes})"
@@ -1,11 +1,21 @@
+from typing import TYPE_CHECKING
+
 from langflow.services.cache.manager import CacheManager
 from langflow.services.factory import ServiceFactory
 
+if TYPE_CHECKING:
+    from langflow.services.settings.manager import SettingsManager
+
 
 class CacheManagerFactory(ServiceFactory):
     def __init__(self):
         super().__init__(CacheManager)
 
-    def create(self):
-        # Here you would have logic to create and configure a CacheManager
-        return CacheManager()
+    def create(self, settings_manager: "SettingsManager"):
+        settings = settings_manager.settings
+        return CacheManager(
+            max_items=settings.ARTIFACT_CACHE_MAX_ITEMS or None,
+            max_bytes=settings.ARTIFACT_CACHE_MAX_BYTES or None,
+            max_clients=settings.ARTIFACT_CACHE_MAX_CLIENTS or None,
+            client_ttl=settings.ARTIFACT_CACHE_CLIENT_TTL or 0,
+        )
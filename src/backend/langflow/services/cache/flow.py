@@ -1,8 +1,12 @@
 import threading
 import time
+import weakref
 from collections import OrderedDict
 
+from loguru import logger
+
 from langflow.services.cache.base import BaseCache
+from langflow.services.cache.utils import approximate_size
 
 
 class InMemoryCache(BaseCache):
@@ -13,9 +17,16 @@ class InMemoryCache(BaseCache):
     When the cache is full, it uses a Least Recently Used (LRU) eviction policy.
     Thread-safe using a threading Lock.
 
+    The approximate size in bytes of every item is tracked, so the cache can
+    also be bounded by max_bytes: one built flow holding a vector store can
+    take gigabytes while another takes a few kilobytes. Expired items are
+    removed when they are read, and every sweep_interval seconds by a
+    background thread if it is set.
+
     Attributes:
         max_size (int, optional): Maximum number of items to store in the cache.
         expiration_time (int, optional): Time in seconds after which a cached item expires. Default is 1 hour.
+        max_bytes (int, optional): Maximum approximate size in bytes of the items in the cache.
 
     Example:
 
@@ -29,20 +40,44 @@ class InMemoryCache(BaseCache):
         # getting cache values
         a = cache.get("a")
         b = cache["b"]
+        c = cache.get_or_set("c", lambda: 3)
     """
 
-    def __init__(self, max_size=None, expiration_time=60 * 60):
+    def __init__(
+        self,
+        max_size=None,
+        expiration_time=60 * 60,
+        on_evict=None,
+        max_bytes=None,
+        sweep_interval=None,
+    ):
         """
         Initialize a new InMemoryCache instance.
 
         Args:
             max_size (int, optional): Maximum number of items to store in the cache.
             expiration_time (int, optional): Time in seconds after which a cached item expires. Default is 1 hour.
+            on_evict (callable, optional): Called with the key and the value of every item
+                evicted because the cache is full or the item expired. It runs with the
+                lock held, so it must not use the cache.
+            max_bytes (int, optional): Maximum approximate size in bytes of the items in the cache.
+            sweep_interval (int, optional): Time in seconds between the removals of the
+                expired items by a background thread. No thread is started if not set.
         """
         self._cache = OrderedDict()
         self._lock = threading.Lock()
         self.max_size = max_size
         self.expiration_time = expiration_time
+        self.on_evict = on_evict
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bytes = 0
+        self._stop_sweeper = threading.Event()
+        if sweep_interval and expiration_time is not None:
+            self._start_sweeper(sweep_interval)
 
     def get(self, key):
         """
@@ -55,54 +90,104 @@ class InMemoryCache(BaseCache):
             The value associated with the key, or None if the key is not found or the item has expired.
         """
         with self._lock:
-            if key in self._cache:
-                item = self._cache.pop(key)
-                if (
-                    self.expiration_time is None
-                    or time.time() - item["time"] < self.expiration_time
-                ):
-                    # Move the key to the end to make it recently used
-                    self._cache[key] = item
-                    return item["value"]
-                else:
-                    self.delete(key)
+            return self._get(key)
+
+    def _get(self, key):
+        # Must be called with the lock held
+        item = self._cache.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        if self._is_expired(item, time.time()):
+            self._expire(key)
+            self.misses += 1
             return None
+        # Move the key to the end to make it recently used
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return item["value"]
 
     def set(self, key, value):
         """
         Add an item to the cache.
 
-        If the cache is full, the least recently used item is evicted.
+        If the cache is full, the least recently used items are evicted. Items
+        larger than max_bytes on their own are not stored.
 
         Args:
             key: The key of the item.
             value: The value to cache.
         """
+        # Measured before taking the lock, as it walks the whole value
+        size = approximate_size(value)
         with self._lock:
-            if key in self._cache:
-                # Remove existing key before re-inserting to update order
-                self.delete(key)
-            elif self.max_size and len(self._cache) >= self.max_size:
-                # Remove least recently used item
-                self._cache.popitem(last=False)
-            self._cache[key] = {"value": value, "time": time.time()}
-
-    def get_or_set(self, key, value):
+            self._set(key, value, size)
+
+    def _set(self, key, value, size):
+        # Must be called with the lock held
+        self._delete(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.debug(f"Item {key} takes {size} bytes, not caching it")
+            self.evictions += 1
+            self._notify_evicted(key, value)
+            return
+        while self._cache and (
+            (self.max_size and len(self._cache) >= self.max_size)
+            or (self.max_bytes is not None and self.bytes + size > self.max_bytes)
+        ):
+            # Remove least recently used item
+            evicted_key, evicted_item = self._cache.popitem(last=False)
+            self.bytes -= evicted_item["size"]
+            self.evictions += 1
+            self._notify_evicted(evicted_key, evicted_item["value"])
+        self._cache[key] = {"value": value, "time": time.time(), "size": size}
+        self.bytes += size
+
+    def _is_expired(self, item, now):
+        return (
+            self.expiration_time is not None
+            and now - item["time"] >= self.expiration_time
+        )
+
+    def _expire(self, key):
+        # Must be called with the lock held
+        item = self._cache.pop(key)
+        self.bytes -= item["size"]
+        self.expirations += 1
+        self._notify_evicted(key, item["value"])
+
+    def _notify_evicted(self, key, value):
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def get_or_set(self, key, factory):
         """
-        Retrieve an item from the cache. If the item does not exist, set it with the provided value.
+        Retrieve an item from the cache. If the item does not exist, set it with the value returned by factory.
+
+        The factory is called without holding the lock, so it can use the
+        cache. If another thread sets the item meanwhile, its value is kept
+        and returned.
 
         Args:
             key: The key of the item.
-            value: The value to cache if the item doesn't exist.
+            factory (callable): Called without arguments to create the value if the item doesn't exist.
 
         Returns:
             The cached value associated with the key.
         """
         with self._lock:
-            if key in self._cache:
-                return self.get(key)
-            self.set(key, value)
-            return value
+            value = self._get(key)
+            if value is not None:
+                return value
+        value = factory()
+        size = approximate_size(value)
+        with self._lock:
+            item = self._cache.get(key)
+            if item is not None and not self._is_expired(item, time.time()):
+                self._cache.move_to_end(key)
+                return item["value"]
+            self._set(key, value, size)
+        return value
 
     def delete(self, key):
         """
@@ -111,8 +196,14 @@ class InMemoryCache(BaseCache):
         Args:
             key: The key of the item to remove.
         """
-        # with self._lock:
-        self._cache.pop(key, None)
+        with self._lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        # Must be called with the lock held
+        item = self._cache.pop(key, None)
+        if item is not None:
+            self.bytes -= item["size"]
 
     def clear(self):
         """
@@ -120,10 +211,77 @@ class InMemoryCache(BaseCache):
         """
         with self._lock:
             self._cache.clear()
+            self.bytes = 0
+
+    def sweep(self):
+        """
+        Remove the expired items.
+
+        Returns:
+            The number of items removed.
+        """
+        if self.expiration_time is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            # Items are ordered by last use, not by insertion time, so every
+            # item has to be checked
+            expired = [
+                key for key, item in self._cache.items() if self._is_expired(item, now)
+            ]
+            for key in expired:
+                self._expire(key)
+        return len(expired)
+
+    def _start_sweeper(self, interval):
+        # The thread only holds a weak reference, so the cache can still be
+        # garbage collected, which stops the thread
+        cache_ref = weakref.ref(self)
+        stop = self._stop_sweeper
+
+        def sweep_periodically():
+            while not stop.wait(interval):
+                cache = cache_ref()
+                if cache is None:
+                    return
+                try:
+                    if removed := cache.sweep():
+                        logger.debug(f"Removed {removed} expired items from {cache}")
+                except Exception as exc:
+                    logger.error(f"Error sweeping {cache}: {exc}")
+                del cache
+
+        weakref.finalize(self, stop.set)
+        threading.Thread(
+            target=sweep_periodically, name="langflow-cache-sweeper", daemon=True
+        ).start()
+
+    def close(self):
+        """Stop the background removal of the expired items."""
+        self._stop_sweeper.set()
+
+    def stats(self):
+        """Return the counters and the size of the cache."""
+        with self._lock:
+            return {
+                "items": len(self._cache),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
 
     def __contains__(self, key):
-        """Check if the key is in the cache."""
-        return key in self._cache
+        """Check if the key is in the cache and has not expired."""
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return False
+            if self._is_expired(item, time.time()):
+                self._expire(key)
+                return False
+            return True
 
     def __getitem__(self, key):
         """Retrieve an item from the cache using the square bracket notation."""
@@ -139,8 +297,9 @@ class InMemoryCache(BaseCache):
 
     def __len__(self):
         """Return the number of items in the cache."""
-        return len(self._cache)
+        with self._lock:
+            return len(self._cache)
 
     def __repr__(self):
         """Return a string representation of the InMemoryCache instance."""
-        return f"InMemoryCache(max_size={self.max_size}, expiration_time={self.expiration_time})"
+        return f"InMemoryCache(max_size={self.max_size}, expiration_time={self.expiration_time}, max_bytes={self.max_bytes})"
@@ -1,9 +1,26 @@
+import threading
+import time
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import Any, Awaitable, Callable, List, Optional
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from langflow.services.base import Service
+from langflow.services.cache.utils import approximate_size
 
 import pandas as pd
 from PIL import Image
+from loguru import logger
+
+# Client whose cache is used by the code running in the current context. It
+# is a context variable so concurrent sessions on the same event loop, or in
+# threads started with a copy of the context, each see their own client
+_current_client_id: ContextVar[Optional[str]] = ContextVar(
+    "langflow_cache_client_id", default=None
+)
+
+# Type of the data sent to the client for each type of object
+ENCODED_DATA_TYPES = {"image": "image", "pandas": "csv"}
 
 
 class Subject:
@@ -50,16 +67,112 @@ class AsyncSubject:
             await observer()
 
 
+@dataclass
+class CachedObject:
+    """An object of a client's cache and its encoding, computed once."""
+
+    obj: Any
+    type: str
+    extension: str
+    size: int = 0
+    _encoded: Any = field(default=None, init=False, repr=False)
+
+    @property
+    def data_type(self) -> str:
+        return ENCODED_DATA_TYPES.get(self.type, self.type)
+
+    def encode(self) -> Any:
+        """
+        Return the object as sent to the client: a CSV string for pandas
+        objects, a base64 PNG for images and the object itself otherwise.
+        """
+        if self._encoded is None:
+            if self.type == "pandas":
+                self._encoded = self.obj.to_csv()
+            elif self.type == "image":
+                from langflow.interface.utils import pil_to_base64
+
+                self._encoded = pil_to_base64(self.obj)
+            else:
+                self._encoded = self.obj
+        return self._encoded
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the object as returned by CacheManager.get: pandas objects
+        are given as their CSV string, anything else as is.
+        """
+        obj = self.encode() if self.type == "pandas" else self.obj
+        return {"obj": obj, "type": self.type, "extension": self.extension}
+
+
 class CacheManager(Subject, Service):
-    """Manages cache for different clients and notifies observers on changes."""
+    """
+    Manages cache for different clients and notifies observers on changes.
+
+    Each client keeps at most max_items objects taking at most max_bytes
+    approximate bytes, evicting its least recently added ones, and at most
+    max_clients clients are kept. The cache of a client is removed
+    client_ttl seconds after it is released, e.g. when its websocket
+    disconnects, unless it is used again before that.
+
+    Objects are stored as they are added and only encoded for the client
+    when first requested, see CachedObject.encode.
+    """
 
     name = "cache_manager"
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_items: Optional[int] = 50,
+        max_bytes: Optional[int] = 100 * 1024 * 1024,
+        max_clients: Optional[int] = 1000,
+        client_ttl: Optional[float] = 10 * 60,
+    ):
         super().__init__()
-        self._cache = {}
-        self.current_client_id = None
-        self.current_cache = {}
+        self._cache: "OrderedDict[Optional[str], OrderedDict[str, CachedObject]]" = (
+            OrderedDict()
+        )
+        self._released: Dict[Optional[str], float] = {}
+        self._lock = threading.Lock()
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_clients = max_clients
+        self.client_ttl = client_ttl
+
+    @property
+    def current_client_id(self) -> Optional[str]:
+        return _current_client_id.get()
+
+    @property
+    def current_cache(self) -> "OrderedDict[str, CachedObject]":
+        """A copy of the current client's cache, oldest object first."""
+        with self._lock:
+            return OrderedDict(self._client_cache(self.current_client_id))
+
+    def _client_cache(self, client_id: Optional[str]):
+        # Must be called with the lock held
+        self._remove_expired_clients()
+        self._released.pop(client_id, None)
+        if client_id in self._cache:
+            self._cache.move_to_end(client_id)
+            return self._cache[client_id]
+        if self.max_clients and len(self._cache) >= self.max_clients:
+            evicted_client_id, _ = self._cache.popitem(last=False)
+            self._released.pop(evicted_client_id, None)
+            logger.debug(f"Removed the cache of client {evicted_client_id}")
+        client_cache = self._cache[client_id] = OrderedDict()
+        return client_cache
+
+    def _remove_expired_clients(self):
+        # Must be called with the lock held
+        if not self._released or self.client_ttl is None:
+            return
+        now = time.monotonic()
+        for client_id, released_at in list(self._released.items()):
+            if now - released_at >= self.client_ttl:
+                del self._released[client_id]
+                self._cache.pop(client_id, None)
 
     @contextmanager
     def set_client_id(self, client_id: str):
@@ -69,14 +182,29 @@ class CacheManager(Subject, Service):
         Args:
             client_id (str): The client identifier.
         """
-        previous_client_id = self.current_client_id
-        self.current_client_id = client_id
-        self.current_cache = self._cache.setdefault(client_id, {})
+        token = _current_client_id.set(client_id)
+        with self._lock:
+            self._client_cache(client_id)
         try:
             yield
         finally:
-            self.current_client_id = previous_client_id
-            self.current_cache = self._cache.get(self.current_client_id, {})
+            _current_client_id.reset(token)
+
+    def release_client(self, client_id: str):
+        """
+        Mark the cache of a client as unused, so it is removed after
+        client_ttl seconds.
+
+        Args:
+            client_id (str): The client identifier.
+        """
+        with self._lock:
+            if client_id not in self._cache:
+                return
+            if self.client_ttl == 0:
+                del self._cache[client_id]
+                return
+            self._released[client_id] = time.monotonic()
 
     def add(self, name: str, obj: Any, obj_type: str, extension: Optional[str] = None):
         """
@@ -95,13 +223,30 @@ class CacheManager(Subject, Service):
             _extension = object_extensions[obj_type]
         else:
             _extension = type(obj).__name__.lower()
-        self.current_cache[name] = {
-            "obj": obj,
-            "type": obj_type,
-            "extension": extension or _extension,
-        }
+        cached = CachedObject(
+            obj=obj,
+            type=obj_type,
+            extension=extension or _extension,
+            size=approximate_size(obj),
+        )
+        with self._lock:
+            client_cache = self._client_cache(self.current_client_id)
+            client_cache.pop(name, None)
+            client_cache[name] = cached
+            self._evict(client_cache)
         self.notify()
 
+    def _evict(self, client_cache: "OrderedDict[str, CachedObject]"):
+        # Must be called with the lock held. The last object is always kept
+        # so observers can read it
+        total_size = sum(cached.size for cached in client_cache.values())
+        while len(client_cache) > 1 and (
+            (self.max_items and len(client_cache) > self.max_items)
+            or (self.max_bytes and total_size > self.max_bytes)
+        ):
+            _, evicted = client_cache.popitem(last=False)
+            total_size -= evicted.size
+
     def add_pandas(self, name: str, obj: Any):
         """
         Add a pandas DataFrame or Series to the current client's cache.
@@ -111,7 +256,7 @@ class CacheManager(Subject, Service):
             obj (Any): The pandas DataFrame or Series object.
         """
         if isinstance(obj, (pd.DataFrame, pd.Series)):
-            self.add(name, obj.to_csv(), "pandas", extension="csv")
+            self.add(name, obj, "pandas", extension="csv")
         else:
             raise ValueError("Object is not a pandas DataFrame or Series")
 
@@ -128,6 +273,23 @@ class CacheManager(Subject, Service):
         else:
             raise ValueError("Object is not a PIL Image")
 
+    def get_object(self, name: Optional[str] = None) -> CachedObject:
+        """
+        Get an object from the current client's cache, or the last added one
+        if no name is given.
+
+        Args:
+            name (str, optional): The cache key.
+
+        Returns:
+            The CachedObject associated with the given cache key.
+        """
+        with self._lock:
+            client_cache = self._client_cache(self.current_client_id)
+            if name is None:
+                return next(reversed(client_cache.values()))
+            return client_cache[name]
+
     def get(self, name: str):
         """
         Get an object from the current client's cache.
@@ -138,7 +300,7 @@ class CacheManager(Subject, Service):
         Returns:
             The cached object associated with the given cache key.
         """
-        return self.current_cache[name]
+        return self.get_object(name).to_dict()
 
     def get_last(self):
         """
@@ -147,7 +309,12 @@ class CacheManager(Subject, Service):
         Returns:
             The last added item in the cache.
         """
-        return list(self.current_cache.values())[-1]
+        return self.get_object().to_dict()
+
+    def teardown(self):
+        with self._lock:
+            self._cache.clear()
+            self._released.clear()
 
 
 cache_manager = CacheManager()
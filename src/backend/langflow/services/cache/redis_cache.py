@@ -0,0 +1,177 @@
+from typing import TYPE_CHECKING, Any, List, Optional, Union
+
+from loguru import logger
+
+from langflow.services.cache.base import BaseCache
+from langflow.services.cache.utils import dumps_signed, loads_signed
+
+if TYPE_CHECKING:
+    from langflow.services.settings.manager import SettingsManager
+
+
+class RedisCache(BaseCache):
+    """
+    A cache stored in Redis, so every worker and every instance of the
+    server sees the same items.
+
+    Values are serialized with dill. Items that can't be serialized are
+    skipped, so callers must be ready to rebuild them. Keys are prefixed so
+    several caches can share a database, and items expire after
+    expiration_time seconds.
+
+    Values are signed with secret_key, which must be the same on every
+    server, and values whose signature doesn't match are discarded without
+    being unpickled. They are not encrypted: built flows hold the params of
+    their components, including API keys, so the database must only be
+    reachable by the servers.
+
+    The client only needs the get, set, delete, exists and scan_iter methods
+    of redis.Redis, so any compatible client can be used.
+
+    Attributes:
+        client: The Redis client.
+        prefix (str): Prefix of the keys of this cache.
+        expiration_time (int, optional): Time in seconds after which an item expires.
+        secret_key (str): Key of the signatures of the values.
+
+    Example:
+
+        cache = RedisCache.from_url(
+            "redis://localhost:6379/0", prefix="langflow:flows:", secret_key="..."
+        )
+        cache.set("a", {"status": "started"})
+        a = cache.get("a")
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "langflow:",
+        expiration_time=60 * 60,
+        *,
+        secret_key: Union[str, bytes],
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.expiration_time = expiration_time
+        self.secret_key = secret_key
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisCache":
+        try:
+            import redis  # type: ignore
+        except ImportError as exc:
+            raise ImportError(
+                "redis package not found, please install it with `pip install redis`"
+            ) from exc
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}{key}"
+
+    def get(self, key):
+        """
+        Retrieve an item from the cache.
+
+        Args:
+            key: The key of the item to retrieve.
+
+        Returns:
+            The value associated with the key, or None if the key is not found, the item has expired or it
+            can't be read.
+        """
+        content = self.client.get(self._key(key))
+        if content is None:
+            return None
+        try:
+            return loads_signed(content, self.secret_key)
+        except Exception as exc:
+            logger.debug(f"Discarding cached item {key}: {exc}")
+            self.delete(key)
+            return None
+
+    def set(self, key, value):
+        """
+        Add an item to the cache, unless it can't be serialized.
+
+        Args:
+            key: The key of the item.
+            value: The value to cache.
+
+        Returns:
+            Whether the item was stored.
+        """
+        try:
+            content = dumps_signed(value, self.secret_key)
+        except Exception as exc:
+            logger.debug(f"Item {key} can't be stored in Redis: {exc}")
+            return False
+        self.client.set(self._key(key), content, ex=self.expiration_time)
+        return True
+
+    def delete(self, key):
+        """
+        Remove an item from the cache.
+
+        Args:
+            key: The key of the item to remove.
+        """
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        """
+        Clear all items from the cache.
+        """
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def keys(self) -> List[str]:
+        """Return the keys of the items in the cache."""
+        keys = []
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            if isinstance(key, bytes):
+                key = key.decode("utf-8")
+            keys.append(key[len(self.prefix) :])
+        return keys
+
+    def __contains__(self, key):
+        """Check if the key is in the cache."""
+        return bool(self.client.exists(self._key(key)))
+
+    def __getitem__(self, key):
+        """Retrieve an item from the cache using the square bracket notation."""
+        return self.get(key)
+
+    def __setitem__(self, key, value):
+        """Add an item to the cache using the square bracket notation."""
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        """Remove an item from the cache using the square bracket notation."""
+        self.delete(key)
+
+    def __repr__(self):
+        """Return a string representation of the RedisCache instance."""
+        return f"RedisCache(prefix={self.prefix!r}, expiration_time={self.expiration_time})"
+
+
+def create_shared_cache(
+    settings_manager: "SettingsManager",
+    namespace: str,
+    fallback: Optional[BaseCache] = None,
+) -> Optional[BaseCache]:
+    """
+    Returns a RedisCache for the namespace if the REDIS_URL setting is set,
+    so the items are shared by every worker, or the fallback otherwise.
+    Values are signed with the SECRET_KEY setting.
+    """
+    settings = settings_manager.settings
+    if not settings.REDIS_URL:
+        return fallback
+    return RedisCache.from_url(
+        settings.REDIS_URL,
+        prefix=f"langflow:{namespace}:",
+        expiration_time=settings.SESSION_CACHE_EXPIRATION,
+        secret_key=settings_manager.auth_settings.SECRET_KEY,
+    )
@@ -2,13 +2,20 @@ import base64
 import contextlib
 import functools
 import hashlib
+import hmac
 import os
+import sys
 import tempfile
+import threading
 from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Any, Dict
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Callable, Dict, Tuple, Union
+
+import dill  # type: ignore
+import orjson
 from appdirs import user_cache_dir
-from langflow.services.database.models.base import orjson_dumps
 
 CACHE: Dict[str, Any] = {}
 
@@ -28,41 +35,94 @@ def create_cache_folder(func):
     return wrapper
 
 
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first one runs and the
+    others wait for it and share its result or its error, instead of doing
+    the same work in parallel.
+    """
+
+    def __init__(self):
+        # Held while checking the cache and registering a call, so each key
+        # is only computed once at a time
+        self.lock = threading.Lock()
+        self._in_flight: Dict[Any, Future] = {}
+
+    def run(
+        self,
+        key: Any,
+        func: Callable[[], Any],
+        lookup: Callable[[Any], Any],
+        store: Callable[[Any, Any], None],
+    ) -> Tuple[Any, bool]:
+        """
+        Returns the value of key and whether this call computed it.
+
+        lookup returns the cached value of a key, or None if it is missing.
+        Otherwise func computes it, and store saves it with the lock held,
+        so the value is cached before the key stops being in flight.
+        """
+        with self.lock:
+            result = lookup(key)
+            if result is not None:
+                return result, False
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[key] = Future()
+
+        if not is_leader:
+            return future.result(), False
+
+        # The key always stops being in flight and the followers always get
+        # the result or the error, even if func or store raise
+        try:
+            result = func()
+            with self.lock:
+                try:
+                    store(key, result)
+                finally:
+                    del self._in_flight[key]
+        except BaseException as exc:
+            with self.lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(exc)
+            raise
+        future.set_result(result)
+        return result, True
+
+
 def memoize_dict(maxsize=128):
+    """
+    Caches the results of a function taking a flow as first argument, keyed
+    by the hash of the flow.
+
+    Concurrent calls for the same flow are coalesced by a SingleFlight,
+    instead of building the same flow in parallel.
+    """
     cache = OrderedDict()
-    hash_to_key = {}  # Mapping from hash to cache key
+    single_flight = SingleFlight()
+
+    def store(key, result):
+        cache[key] = result
+        if len(cache) > maxsize:
+            del cache[next(iter(cache))]
 
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
             hashed = compute_dict_hash(args[0])
             key = (func.__name__, hashed, frozenset(kwargs.items()))
-            if key not in cache:
-                result = func(*args, **kwargs)
-                cache[key] = result
-                hash_to_key[hashed] = key  # Store the mapping
-                if len(cache) > maxsize:
-                    oldest_key = next(iter(cache))
-                    oldest_hash = oldest_key[1]
-                    del cache[oldest_key]
-                    del hash_to_key[oldest_hash]
-            else:
-                result = cache[key]
-
-            wrapper.session_id = hashed  # Store hash in the wrapper
+            result, _ = single_flight.run(
+                key, lambda: func(*args, **kwargs), cache.get, store
+            )
             return result
 
         def clear_cache():
-            cache.clear()
-            hash_to_key.clear()
-
-        def get_result_by_session_id(session_id):
-            key = hash_to_key.get(session_id)
-            return cache.get(key) if key is not None else None
+            with single_flight.lock:
+                cache.clear()
 
         wrapper.clear_cache = clear_cache  # type: ignore
-        wrapper.get_result_by_session_id = get_result_by_session_id  # type: ignore
-        wrapper.hash = None
         wrapper.cache = cache  # type: ignore
         return wrapper
 
@@ -72,6 +132,93 @@ def memoize_dict(maxsize=128):
 PREFIX = "langflow_cache"
 
 
+# Objects that are shared by the whole process, so they aren't counted as
+# part of the cached values referencing them
+_SHARED_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+
+def approximate_size(obj: Any, max_objects: int = 10_000) -> int:
+    """
+    Returns an approximation of the memory in bytes taken by obj and the
+    objects it references.
+
+    Containers and the attributes of objects are followed up to max_objects
+    objects, so the cost stays bounded for large graphs of objects. Buffers
+    exposing nbytes (e.g. numpy arrays) and FAISS indexes, whose vectors live
+    outside of Python objects, are counted by the size of their data.
+    """
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack and len(seen) < max_objects:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SHARED_TYPES):
+            continue
+        seen.add(id(item))
+        try:
+            size += sys.getsizeof(item)
+        except TypeError:
+            pass
+        if isinstance(item, _ATOMIC_TYPES):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+            continue
+        if isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+            continue
+        try:
+            nbytes = getattr(item, "nbytes", None)
+            if isinstance(nbytes, int):
+                size += nbytes
+                continue
+            # faiss.Index stores ntotal vectors of d float32
+            ntotal, dimension = getattr(item, "ntotal", None), getattr(item, "d", None)
+            if isinstance(ntotal, int) and isinstance(dimension, int):
+                size += ntotal * dimension * 4
+                continue
+            attributes = getattr(item, "__dict__", None)
+        except Exception:
+            continue
+        if isinstance(attributes, dict):
+            stack.append(attributes)
+    return size
+
+
+# Length of the HMAC-SHA256 prefixed to the signed values
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+
+def _signature(content: bytes, secret_key: Union[str, bytes]) -> bytes:
+    if isinstance(secret_key, str):
+        secret_key = secret_key.encode("utf-8")
+    return hmac.new(secret_key, content, hashlib.sha256).digest()
+
+
+def dumps_signed(value: Any, secret_key: Union[str, bytes]) -> bytes:
+    """
+    Serializes value with dill, prefixed with an HMAC-SHA256 of the
+    serialized content keyed by secret_key.
+    """
+    content = dill.dumps(value)
+    return _signature(content, secret_key) + content
+
+
+def loads_signed(data: bytes, secret_key: Union[str, bytes]) -> Any:
+    """
+    Deserializes a value written by dumps_signed with the same secret_key.
+
+    Unpickling runs arbitrary code, so the signature is checked first and a
+    ValueError is raised for data that wasn't written with the key.
+    """
+    signature, content = data[:SIGNATURE_SIZE], data[SIGNATURE_SIZE:]
+    if not hmac.compare_digest(signature, _signature(content, secret_key)):
+        raise ValueError("Invalid signature")
+    return dill.loads(content)
+
+
 @create_cache_folder
 def clear_old_cache_files(max_cache_size: int = 3):
     cache_dir = Path(tempfile.gettempdir()) / PREFIX
@@ -87,34 +234,39 @@ def clear_old_cache_files(max_cache_size: int = 3):
                 os.remove(cache_file)
 
 
-def compute_dict_hash(graph_data):
-    graph_data = filter_json(graph_data)
+# Keys that only change when the flow is moved around in the UI
+VOLATILE_GRAPH_KEYS = frozenset(["viewport", "chatHistory"])
+VOLATILE_NODE_KEYS = frozenset(["position", "positionAbsolute", "selected", "dragging"])
 
-    cleaned_graph_json = orjson_dumps(graph_data, sort_keys=True)
 
-    return hashlib.sha256(cleaned_graph_json.encode("utf-8")).hexdigest()
+def compute_dict_hash(graph_data):
+    """
+    Returns the fingerprint of a flow: the SHA-256 of its canonical JSON, that
+    is compact, with sorted keys and without the VOLATILE_GRAPH_KEYS and
+    VOLATILE_NODE_KEYS.
 
+    filter_json only copies the top level dicts, so the flow isn't modified
+    and the JSON is serialized in a single orjson call.
+    """
+    if isinstance(graph_data, dict):
+        graph_data = filter_json(graph_data)
+    return hashlib.sha256(
+        orjson.dumps(graph_data, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
 
-def filter_json(json_data):
-    filtered_data = json_data.copy()
 
-    # Remove 'viewport' and 'chatHistory' keys
-    if "viewport" in filtered_data:
-        del filtered_data["viewport"]
-    if "chatHistory" in filtered_data:
-        del filtered_data["chatHistory"]
+def filter_json(json_data):
+    """Returns a copy of the flow without the keys that only change in the UI."""
+    filtered_data = {
+        key: value for key, value in json_data.items() if key not in VOLATILE_GRAPH_KEYS
+    }
 
-    # Filter nodes
+    # Filter nodes. They are copied so the caller's data isn't modified
     if "nodes" in filtered_data:
-        for node in filtered_data["nodes"]:
-            if "position" in node:
-                del node["position"]
-            if "positionAbsolute" in node:
-                del node["positionAbsolute"]
-            if "selected" in node:
-                del node["selected"]
-            if "dragging" in node:
-                del node["dragging"]
+        filtered_data["nodes"] = [
+            {key: value for key, value in node.items() if key not in VOLATILE_NODE_KEYS}
+            for node in filtered_data["nodes"]
+        ]
 
     return filtered_data
 
@@ -0,0 +1,349 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+from loguru import logger
+from sqlmodel import Session, col, delete, select
+
+from langflow.api.v1.schemas import ChatMessage
+from langflow.api.v1.serialization import dumps
+from langflow.services.cache.manager import Subject
+from langflow.services.database.models.chat_message import ChatMessageRecord
+
+# Messages only useful while an answer is being streamed
+TRANSIENT_MESSAGE_TYPES = ("start", "stream")
+
+# Kind of the pending writes
+ADD = "add"
+CLEAR = "clear"
+
+
+class ChatHistoryStore:
+    """
+    Write-behind persistence of the chat history in the database.
+
+    Messages are queued and written in batches by a background thread every
+    flush_interval seconds, or as soon as batch_size writes are pending, so
+    the chat never waits on the database. Reads flush the pending writes
+    first. If the database can't be written, the writes are kept and retried,
+    up to max_pending writes.
+    """
+
+    def __init__(
+        self,
+        get_engine: Callable[[], Any],
+        flush_interval: float = 1.0,
+        batch_size: int = 100,
+        max_pending: int = 10_000,
+    ):
+        self.get_engine = get_engine
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self._pending: List[Tuple[str, Any]] = []
+        self._lock = threading.Lock()
+        # Held while writing, so the writes are applied in order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def add(self, client_id: str, position: int, message: ChatMessage) -> None:
+        record = ChatMessageRecord(
+            client_id=client_id,
+            position=position,
+            type=message.type,
+            is_bot=message.is_bot,
+            payload=dumps(message),
+        )
+        self._queue((ADD, record))
+
+    def clear(self, client_id: str) -> None:
+        self._queue((CLEAR, client_id))
+
+    def _queue(self, write: Tuple[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(write)
+            pending = len(self._pending)
+        if self._writer is None:
+            self._start_writer()
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Write the pending messages. Returns the number of writes done."""
+        with self._flush_lock:
+            with self._lock:
+                writes, self._pending = self._pending, []
+            if not writes:
+                return 0
+            try:
+                with Session(self.get_engine()) as session:
+                    for kind, value in writes:
+                        if kind == ADD:
+                            session.add(value)
+                        else:
+                            # The messages added before are flushed first
+                            session.flush()
+                            session.execute(
+                                delete(ChatMessageRecord).where(
+                                    ChatMessageRecord.client_id == value
+                                )
+                            )
+                    session.commit()
+            except Exception as exc:
+                logger.error(f"Error writing the chat history: {exc}")
+                with self._lock:
+                    self._pending[:0] = writes
+                    if (overflow := len(self._pending) - self.max_pending) > 0:
+                        del self._pending[:overflow]
+                        self.dropped += overflow
+                        logger.warning(f"Dropped {overflow} chat history writes")
+                return 0
+            self.written += len(writes)
+            return len(writes)
+
+    def get_messages(
+        self,
+        client_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        filter_messages: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """The last limit messages of a client before a position, newest first."""
+        self.flush()
+        statement = select(ChatMessageRecord).where(
+            ChatMessageRecord.client_id == client_id
+        )
+        if before is not None:
+            statement = statement.where(ChatMessageRecord.position < before)
+        if filter_messages:
+            statement = statement.where(
+                col(ChatMessageRecord.type).notin_(TRANSIENT_MESSAGE_TYPES)
+            )
+        statement = statement.order_by(col(ChatMessageRecord.position).desc()).limit(
+            limit
+        )
+        with Session(self.get_engine()) as session:
+            records = session.exec(statement).all()
+        return [
+            {**orjson.loads(record.payload), "position": record.position}
+            for record in records
+        ]
+
+    def _start_writer(self) -> None:
+        # The thread only holds a weak reference, so the store can still be
+        # garbage collected, which stops the thread
+        with self._lock:
+            if self._writer is not None:
+                return
+            store_ref = weakref.ref(self)
+            wake, stop, interval = self._wake, self._stop, self.flush_interval
+
+            def write_periodically():
+                while not stop.is_set():
+                    wake.wait(interval)
+                    wake.clear()
+                    store = store_ref()
+                    if store is None:
+                        return
+                    store.flush()
+                    del store
+
+            weakref.finalize(self, stop.set)
+            self._writer = threading.Thread(
+                target=write_periodically,
+                name="langflow-chat-history-writer",
+                daemon=True,
+            )
+            self._writer.start()
+
+    def close(self) -> None:
+        """Stop the background writes and write the pending messages."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+
+class _ClientHistory:
+    def __init__(self, max_messages: Optional[int]):
+        # (position, message) of the last messages
+        self.messages: Deque[Tuple[int, ChatMessage]] = deque(maxlen=max_messages)
+        # Same, without the transient messages, so filtered reads don't have
+        # to go through the stream fragments
+        self.visible: Deque[Tuple[int, ChatMessage]] = deque(maxlen=max_messages)
+        self.files: Deque[Tuple[int, ChatMessage]] = deque(maxlen=max_messages)
+        self.next_position = 0
+        # Position of the first message since the history was emptied. Older
+        # messages of a client may be stored from a previous run
+        self.first_position = 0
+        self.last_used = time.monotonic()
+
+
+class ChatHistory(Subject):
+    """
+    The chat history of every client.
+
+    The last max_messages messages of each client are kept in memory, for at
+    most max_clients clients, and the history of a client is removed from
+    memory after client_ttl seconds without being used. If a store is set,
+    every message is also persisted to the database, and the messages that
+    are no longer in memory are read from it.
+
+    Positions are microseconds since the epoch, so they keep growing across
+    restarts without reading the last one from the database. Nothing here
+    waits on the database except get_page, which reads from it.
+    """
+
+    def __init__(
+        self,
+        max_messages: Optional[int] = None,
+        store: Optional[ChatHistoryStore] = None,
+        max_clients: Optional[int] = 1000,
+        client_ttl: Optional[float] = 60 * 60,
+    ):
+        super().__init__()
+        self.max_messages = max_messages
+        self.store = store
+        self.max_clients = max_clients
+        self.client_ttl = client_ttl
+        self._clients: "OrderedDict[str, _ClientHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _use_client(self, client_id: str) -> Optional[_ClientHistory]:
+        # Must be called with the lock held
+        self._remove_idle_clients()
+        client = self._clients.get(client_id)
+        if client is not None:
+            client.last_used = time.monotonic()
+            self._clients.move_to_end(client_id)
+        return client
+
+    def _add_client(self, client_id: str) -> _ClientHistory:
+        # Must be called with the lock held
+        if self.max_clients and len(self._clients) >= self.max_clients:
+            evicted_client_id, _ = self._clients.popitem(last=False)
+            logger.debug(f"Removed the chat history of client {evicted_client_id}")
+        client = self._clients[client_id] = _ClientHistory(self.max_messages)
+        return client
+
+    def _remove_idle_clients(self):
+        # Must be called with the lock held. Clients are ordered by last use
+        if self.client_ttl is None:
+            return
+        now = time.monotonic()
+        while self._clients:
+            client_id, client = next(iter(self._clients.items()))
+            if now - client.last_used < self.client_ttl:
+                break
+            del self._clients[client_id]
+
+    def add_message(self, client_id: str, message: ChatMessage) -> int:
+        """Add a message to the chat history. Returns its position."""
+        with self._lock:
+            client = self._use_client(client_id) or self._add_client(client_id)
+            position = max(time.time_ns() // 1000, client.next_position)
+            client.next_position = position + 1
+            entry = (position, message)
+            client.messages.append(entry)
+            if message.type not in TRANSIENT_MESSAGE_TYPES:
+                client.visible.append(entry)
+            if message.type == "file":
+                client.files.append(entry)
+        if self.store is not None:
+            self.store.add(client_id, position, message)
+
+        if message.type != "file":
+            self.notify()
+        return position
+
+    def get_history(self, client_id: str, filter_messages=True) -> List[ChatMessage]:
+        """Get the chat history of a client kept in memory."""
+        with self._lock:
+            if (client := self._use_client(client_id)) is None:
+                return []
+            entries = client.visible if filter_messages else client.messages
+            return [message for _, message in entries]
+
+    def get_files(self, client_id: str, since: int) -> List[ChatMessage]:
+        """Get the file messages of a client from a position on."""
+        with self._lock:
+            if (client := self._use_client(client_id)) is None:
+                return []
+            files = []
+            for position, message in reversed(client.files):
+                if position < since:
+                    break
+                files.append(message)
+            files.reverse()
+            return files
+
+    def get_page(
+        self,
+        client_id: str,
+        limit: int,
+        before: Optional[int] = None,
+        filter_messages: bool = True,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Get the last limit messages of a client before a position, oldest
+        first, as dicts with their position.
+
+        Returns the messages and the position to get the previous page
+        from, or None if there are no older messages.
+
+        The messages that are no longer in memory are read from the store,
+        so this blocks on the database and must not be called from the
+        event loop if a store is set.
+        """
+        page = []
+        # Messages before this position have to be read from the store
+        boundary = before
+        has_older = True
+        with self._lock:
+            if (client := self._use_client(client_id)) is not None:
+                entries = client.visible if filter_messages else client.messages
+                for position, message in reversed(entries):
+                    if before is not None and position >= before:
+                        continue
+                    if len(page) == limit:
+                        break
+                    page.append({**message.dict(), "position": position})
+                # Messages from this position on are all in memory
+                oldest_in_memory = entries[0][0] if entries else client.next_position
+                has_older = oldest_in_memory > client.first_position
+                if boundary is None or oldest_in_memory < boundary:
+                    boundary = oldest_in_memory
+        if len(page) < limit and has_older and self.store is not None:
+            try:
+                page.extend(
+                    self.store.get_messages(
+                        client_id, limit - len(page), boundary, filter_messages
+                    )
+                )
+            except Exception as exc:
+                logger.error(f"Error reading the chat history: {exc}")
+        page.reverse()
+        next_before = page[0]["position"] if len(page) == limit else None
+        return page, next_before
+
+    def empty_history(self, client_id: str):
+        """Empty the chat history for a client."""
+        with self._lock:
+            if (client := self._use_client(client_id)) is not None:
+                client.messages.clear()
+                client.visible.clear()
+                client.files.clear()
+                client.first_position = client.next_position
+        if self.store is not None:
+            self.store.clear(client_id)
+
+    def close(self):
+        """Write the messages not persisted yet."""
+        if self.store is not None:
+            self.store.close()
@@ -1,48 +1,26 @@
-from collections import defaultdict
 import uuid
 from fastapi import WebSocket, status
+from fastapi.concurrency import run_in_threadpool
 from langflow.api.v1.schemas import ChatMessage, ChatResponse, FileResponse
+from langflow.api.v1.serialization import START_FRAME, end_frame, loads
 from langflow.services.base import Service
 from langflow.services import service_manager
-from langflow.services.cache.manager import Subject
 from langflow.services.chat.utils import process_graph
-from langflow.interface.utils import pil_to_base64
 from langflow.services.schema import ServiceType
 from loguru import logger
 
 
-import asyncio
-from typing import Any, Dict, List
+from typing import Any, Dict
 
+from langflow.services.cache.base import BaseCache
 from langflow.services.cache.flow import InMemoryCache
-import orjson
+from langflow.services.cache.redis_cache import create_shared_cache
+from langflow.services.chat.history import ChatHistory, ChatHistoryStore
+from langflow.services.chat.sender import ConnectionSender
 
 
-class ChatHistory(Subject):
-    def __init__(self):
-        super().__init__()
-        self.history: Dict[str, List[ChatMessage]] = defaultdict(list)
-
-    def add_message(self, client_id: str, message: ChatMessage):
-        """Add a message to the chat history."""
-
-        self.history[client_id].append(message)
-
-        if not isinstance(message, FileResponse):
-            self.notify()
-
-    def get_history(self, client_id: str, filter_messages=True) -> List[ChatMessage]:
-        """Get the chat history for a client."""
-        if history := self.history.get(client_id, []):
-            if filter_messages:
-                return [msg for msg in history if msg.type not in ["start", "stream"]]
-            return history
-        else:
-            return []
-
-    def empty_history(self, client_id: str):
-        """Empty the chat history for a client."""
-        self.history[client_id] = []
+# Seconds to wait for the queued messages to be sent before closing a connection
+CLOSE_DRAIN_TIMEOUT = 1
 
 
 class ChatManager(Service):
@@ -50,11 +28,57 @@ class ChatManager(Service):
 
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
+        # Outbound queue and writer task of each connection
+        self.senders: Dict[str, ConnectionSender] = {}
         self.connection_ids: Dict[str, str] = {}
-        self.chat_history = ChatHistory()
+        settings_manager = service_manager.get(ServiceType.SETTINGS_MANAGER)
+        settings = settings_manager.settings
+        store = None
+        if settings.CHAT_HISTORY_PERSIST:
+            store = ChatHistoryStore(
+                lambda: service_manager.get(ServiceType.DATABASE_MANAGER).engine,
+                flush_interval=settings.CHAT_HISTORY_FLUSH_INTERVAL,
+            )
+        self.chat_history = ChatHistory(
+            max_messages=settings.CHAT_HISTORY_MAX_MESSAGES or None,
+            store=store,
+            max_clients=settings.CHAT_HISTORY_MAX_CLIENTS or None,
+            client_ttl=settings.CHAT_HISTORY_CLIENT_TTL or None,
+        )
+        # Messages sent to a client when it connects
+        self.history_page_size = settings.CHAT_HISTORY_PAGE_SIZE
         self.cache_manager = service_manager.get(ServiceType.CACHE_MANAGER)
         self.cache_manager.attach(self.update)
-        self.in_memory_cache = InMemoryCache()
+        self.send_queue_size = settings.WEBSOCKET_SEND_QUEUE_SIZE
+        self.slow_client_policy = settings.WEBSOCKET_SLOW_CLIENT_POLICY
+        self.in_memory_cache = InMemoryCache(
+            sweep_interval=settings.CACHE_SWEEP_INTERVAL
+        )
+        # Graph data, owner and build status of the flows being built. Shared
+        # by every worker if REDIS_URL is set, so a flow built by one worker
+        # can be used from a websocket handled by another one
+        self.flow_data_store: BaseCache = create_shared_cache(
+            settings_manager,
+            "flow_data",
+            fallback=InMemoryCache(max_size=10, expiration_time=None),
+        )
+        # Built objects of each vertex, keyed by user id and content hash
+        # so that rebuilding a flow only rebuilds what changed
+        self.vertex_cache = InMemoryCache(
+            max_size=settings.VERTEX_CACHE_MAX_SIZE,
+            max_bytes=settings.VERTEX_CACHE_MAX_BYTES or None,
+            sweep_interval=settings.CACHE_SWEEP_INTERVAL,
+        )
+
+    def teardown(self):
+        self.chat_history.close()
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the counters and the size of the caches of built objects."""
+        return {
+            "langchain_objects": self.in_memory_cache.stats(),
+            "vertices": self.vertex_cache.stats(),
+        }
 
     def on_chat_history_update(self):
         """Send the last chat message to the client."""
@@ -63,56 +87,56 @@ class ChatManager(Service):
             chat_response = self.chat_history.get_history(
                 client_id, filter_messages=False
             )[-1]
-            if chat_response.is_bot:
-                # Process FileResponse
-                if isinstance(chat_response, FileResponse):
-                    # If data_type is pandas, convert to csv
-                    if chat_response.data_type == "pandas":
-                        chat_response.data = chat_response.data.to_csv()
-                    elif chat_response.data_type == "image":
-                        # Base64 encode the image
-                        chat_response.data = pil_to_base64(chat_response.data)
-                # get event loop
-                loop = asyncio.get_event_loop()
-
-                coroutine = self.send_json(client_id, chat_response)
-                asyncio.run_coroutine_threadsafe(coroutine, loop)
+            if chat_response.is_bot and (sender := self.senders.get(client_id)):
+                sender.send_nowait(chat_response.dict())
 
     def update(self):
-        if self.cache_manager.current_client_id in self.active_connections:
-            self.last_cached_object_dict = self.cache_manager.get_last()
-            # Add a new ChatResponse with the data
+        client_id = self.cache_manager.current_client_id
+        if client_id in self.active_connections:
+            cached = self.cache_manager.get_object()
+            # Add a new ChatResponse with the data, encoded once per object
             chat_response = FileResponse(
                 message=None,
                 type="file",
-                data=self.last_cached_object_dict["obj"],
-                data_type=self.last_cached_object_dict["type"],
+                data=cached.encode(),
+                data_type=cached.data_type,
             )
 
-            self.chat_history.add_message(
-                self.cache_manager.current_client_id, chat_response
-            )
+            self.chat_history.add_message(client_id, chat_response)
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the queue depth and the counters of the sender of each connection."""
+        return {client_id: sender.stats() for client_id, sender in self.senders.items()}
 
     async def connect(self, client_id: str, websocket: WebSocket):
         self.active_connections[client_id] = websocket
+        if previous_sender := self.senders.get(client_id):
+            previous_sender.close()
+        self.senders[client_id] = ConnectionSender(
+            websocket, max_size=self.send_queue_size, policy=self.slow_client_policy
+        )
         # This is to avoid having multiple clients with the same id
         #! Temporary solution
         self.connection_ids[client_id] = f"{client_id}-{uuid.uuid4()}"
 
     def disconnect(self, client_id: str):
         self.active_connections.pop(client_id, None)
+        if sender := self.senders.pop(client_id, None):
+            sender.close()
         self.connection_ids.pop(client_id, None)
+        self.cache_manager.release_client(client_id)
 
     async def send_message(self, client_id: str, message: str):
-        websocket = self.active_connections[client_id]
-        await websocket.send_text(message)
+        await self.senders[client_id].send_text(message)
 
     async def send_json(self, client_id: str, message: ChatMessage):
-        websocket = self.active_connections[client_id]
-        await websocket.send_json(message.dict())
+        await self.senders[client_id].send_json(message.dict())
 
     async def close_connection(self, client_id: str, code: int, reason: str):
         if websocket := self.active_connections[client_id]:
+            if sender := self.senders.get(client_id):
+                # Give the client a chance to get the last messages
+                await sender.drain(timeout=CLOSE_DRAIN_TIMEOUT)
             try:
                 await websocket.close(code=code, reason=reason)
                 self.disconnect(client_id)
@@ -128,11 +152,10 @@ class ChatManager(Service):
         # Process the graph data and chat message
         chat_inputs = payload.pop("inputs", {})
         chat_inputs = ChatMessage(message=chat_inputs)
-        self.chat_history.add_message(client_id, chat_inputs)
+        inputs_position = self.chat_history.add_message(client_id, chat_inputs)
 
         # graph_data = payload
-        start_resp = ChatResponse(message=None, type="start", intermediate_steps="")
-        await self.send_json(client_id, start_resp)
+        await self.senders[client_id].send_text(START_FRAME)
 
         # is_first_message = len(self.chat_history.get_history(client_id=client_id)) <= 1
         # Generate result and thought
@@ -142,7 +165,7 @@ class ChatManager(Service):
             result, intermediate_steps = await process_graph(
                 langchain_object=langchain_object,
                 chat_inputs=chat_inputs,
-                websocket=self.active_connections[client_id],
+                websocket=self.senders[client_id],
                 session_id=self.connection_ids[client_id],
             )
         except Exception as e:
@@ -152,28 +175,19 @@ class ChatManager(Service):
             raise e
         # Send a response back to the frontend, if needed
         intermediate_steps = intermediate_steps or ""
-        history = self.chat_history.get_history(client_id, filter_messages=False)
-        file_responses = []
-        if history:
-            # Iterate backwards through the history
-            for msg in reversed(history):
-                if isinstance(msg, FileResponse):
-                    if msg.data_type == "image":
-                        # Base64 encode the image
-                        if isinstance(msg.data, str):
-                            continue
-                        msg.data = pil_to_base64(msg.data)
-                    file_responses.append(msg)
-                if msg.type == "start":
-                    break
+        # Files created while answering, already encoded by CachedObject.encode
+        file_responses = self.chat_history.get_files(client_id, since=inputs_position)
 
+        intermediate_steps = intermediate_steps.strip()
+        await self.senders[client_id].send_text(
+            end_frame(result, intermediate_steps, file_responses)
+        )
         response = ChatResponse(
             message=result,
-            intermediate_steps=intermediate_steps.strip(),
+            intermediate_steps=intermediate_steps,
             type="end",
             files=file_responses,
         )
-        await self.send_json(client_id, response)
         self.chat_history.add_message(client_id, response)
 
     def set_cache(self, client_id: str, langchain_object: Any) -> bool:
@@ -188,19 +202,16 @@ class ChatManager(Service):
         await self.connect(client_id, websocket)
 
         try:
-            chat_history = self.chat_history.get_history(client_id)
-            # iterate and make BaseModel into dict
-            chat_history = [chat.dict() for chat in chat_history]
-            await websocket.send_json(chat_history)
+            # Only the last messages, older ones are read from the history API
+            chat_history, _ = await run_in_threadpool(
+                self.chat_history.get_page, client_id, limit=self.history_page_size
+            )
+            await self.senders[client_id].send_json(chat_history)
 
             while True:
-                json_payload = await websocket.receive_json()
-                try:
-                    payload = orjson.loads(json_payload)
-                except Exception:
-                    payload = json_payload
+                payload = loads(await websocket.receive_text())
                 if "clear_history" in payload:
-                    self.chat_history.history[client_id] = []
+                    self.chat_history.empty_history(client_id)
                     continue
 
                 with self.cache_manager.set_client_id(client_id):
@@ -0,0 +1,196 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from fastapi import WebSocket, status
+from loguru import logger
+
+from langflow.api.v1.serialization import dumps
+
+DROP = "drop"
+MERGE = "merge"
+DISCONNECT = "disconnect"
+SLOW_CLIENT_POLICIES = (DROP, MERGE, DISCONNECT)
+
+# Kind of the queued frames
+JSON = "json"
+TEXT = "text"
+
+Frame = Tuple[str, Any]
+
+
+def is_token_frame(frame: Frame) -> bool:
+    """Whether the frame only carries streamed tokens, which can be merged or dropped."""
+    kind, data = frame
+    return (
+        kind == JSON
+        and isinstance(data, dict)
+        and data.get("type") == "stream"
+        and not data.get("intermediate_steps")
+        and isinstance(data.get("message"), str)
+    )
+
+
+def is_stream_frame(frame: Frame) -> bool:
+    """Whether the frame is a "stream" message, which can be dropped."""
+    kind, data = frame
+    if kind == JSON:
+        return isinstance(data, dict) and data.get("type") == "stream"
+    # Text frames are pre-serialized stream chunks of the callbacks
+    return '"type":"stream"' in data
+
+
+class ConnectionSender:
+    """
+    Sends the messages of a chat websocket from a bounded queue drained by a
+    writer task, so producers like the LLM callbacks never wait on the
+    client.
+
+    When the queue holds max_size frames, the policy decides what happens
+    to new "stream" frames:
+
+    - "drop": they are dropped until the client catches up.
+    - "merge": streamed tokens are appended to the last queued frame if it
+      holds tokens too, so the client gets the same text in fewer frames.
+      Other stream frames are dropped.
+    - "disconnect": the connection is closed with code 1013 (try again
+      later) and the queued frames are discarded.
+
+    Other frames (start, end, errors, files) are always queued, so the
+    queue can exceed max_size with them.
+
+    Frames can be queued from other threads with send_nowait.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_size: int = 256,
+        policy: str = MERGE,
+    ):
+        if policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(
+                f"Unknown slow client policy {policy!r}, "
+                f"expected one of {', '.join(SLOW_CLIENT_POLICIES)}"
+            )
+        self.websocket = websocket
+        self.max_size = max(1, max_size)
+        self.policy = policy
+        self.loop = asyncio.get_running_loop()
+        self._queue: Deque[Frame] = deque()
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.merged = 0
+        self.max_depth = 0
+        self._writer = asyncio.create_task(self._write())
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    async def send_json(self, data: Any) -> None:
+        self.put((JSON, data))
+
+    async def send_text(self, data: str) -> None:
+        self.put((TEXT, data))
+
+    def send_nowait(self, data: Any) -> None:
+        """Queue a JSON frame from any thread, without waiting."""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self.loop:
+            self.put((JSON, data))
+        else:
+            self.loop.call_soon_threadsafe(self.put, (JSON, data))
+
+    def put(self, frame: Frame) -> None:
+        """Queue a frame, applying the policy if the queue is full."""
+        if self.closed:
+            self.dropped += 1
+            return
+        if len(self._queue) >= self.max_size and not self._make_room(frame):
+            return
+        self._queue.append(frame)
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._idle.clear()
+        self._ready.set()
+
+    def _make_room(self, frame: Frame) -> bool:
+        """Applies the policy to a full queue. Returns whether to queue the frame."""
+        if not is_stream_frame(frame):
+            return True
+        if self.policy == DISCONNECT:
+            logger.warning(
+                f"Closing slow websocket with {len(self._queue)} unsent frames"
+            )
+            self.dropped += len(self._queue) + 1
+            self._queue.clear()
+            self.closed = True
+            self._ready.set()
+            return False
+        if self.policy == MERGE and is_token_frame(frame):
+            last = self._queue[-1]
+            if is_token_frame(last):
+                message = last[1]["message"] + frame[1]["message"]
+                self._queue[-1] = (JSON, {**last[1], "message": message})
+                self.merged += 1
+                return False
+        self.dropped += 1
+        return False
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._queue:
+                    kind, data = self._queue.popleft()
+                    if kind == JSON:
+                        data = dumps(data)
+                    await self.websocket.send_text(data)
+                    self.sent += 1
+                self._idle.set()
+                if self.closed:
+                    break
+        except Exception as exc:
+            logger.debug(f"Websocket writer stopped: {exc}")
+            self.dropped += len(self._queue)
+            self._queue.clear()
+            self.closed = True
+            self._idle.set()
+            return
+        if self.policy == DISCONNECT:
+            try:
+                await self.websocket.close(
+                    code=status.WS_1013_TRY_AGAIN_LATER, reason="Client too slow"
+                )
+            except Exception as exc:
+                logger.debug(f"Error closing slow websocket: {exc}")
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued frame is sent. Returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def close(self) -> None:
+        """Stop the writer, discarding the frames not sent yet."""
+        self.closed = True
+        self._writer.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": len(self._queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "merged": self.merged,
+        }
@@ -65,6 +65,7 @@ class DatabaseManager(Service):
             "flow": models.Flow,
             "user": models.User,
             "apikey": models.ApiKey,
+            "chatmessage": models.ChatMessageRecord,
             # Add other SQLModel classes here
         }
 
@@ -106,7 +107,12 @@ class DatabaseManager(Service):
         # This method is used for testing purposes only
         # We will check that all models are in the database
         # and that the database is up to date with all columns
-        sql_models = [models.Flow, models.User, models.ApiKey]
+        sql_models = [
+            models.Flow,
+            models.User,
+            models.ApiKey,
+            models.ChatMessageRecord,
+        ]
         results = []
         for sql_model in sql_models:
             results.append(
@@ -149,7 +155,7 @@ class DatabaseManager(Service):
         from sqlalchemy import inspect
 
         inspector = inspect(self.engine)
-        current_tables = ["flow", "user", "apikey"]
+        current_tables = ["flow", "user", "apikey", "chatmessage"]
         table_names = inspector.get_table_names()
         for table in current_tables:
             if table not in table_names:
@@ -1,5 +1,6 @@
 from .flow import Flow
 from .user import User
 from .api_key import ApiKey
+from .chat_message import ChatMessageRecord
 
-__all__ = ["Flow", "User", "ApiKey"]
+__all__ = ["Flow", "User", "ApiKey", "ChatMessageRecord"]
@@ -0,0 +1,3 @@
+from .chat_message import ChatMessageRecord
+
+__all__ = ["ChatMessageRecord"]
@@ -0,0 +1,28 @@
+from datetime import datetime
+from uuid import UUID, uuid4
+
+from sqlalchemy import BigInteger, Column, Index, Text
+from sqlmodel import Field
+
+from langflow.services.database.models.base import SQLModelSerializable
+
+
+class ChatMessageRecord(SQLModelSerializable, table=True):
+    """A message of the chat history of a flow."""
+
+    __tablename__ = "chatmessage"
+    __table_args__ = (
+        Index("ix_chatmessage_client_id_position", "client_id", "position"),
+        Index("ix_chatmessage_client_id_type", "client_id", "type"),
+    )
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True, unique=True)
+    client_id: str = Field()
+    # Order of the message in the history of the client, in microseconds
+    # since the epoch
+    position: int = Field(sa_column=Column(BigInteger, nullable=False))
+    type: str = Field(index=True)
+    is_bot: bool = Field(default=False)
+    # The message as JSON
+    payload: str = Field(sa_column=Column(Text, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
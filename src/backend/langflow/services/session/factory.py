@@ -0,0 +1,15 @@
+from typing import TYPE_CHECKING
+
+from langflow.services.factory import ServiceFactory
+from langflow.services.session.manager import SessionManager
+
+if TYPE_CHECKING:
+    from langflow.services.settings.manager import SettingsManager
+
+
+class SessionManagerFactory(ServiceFactory):
+    def __init__(self):
+        super().__init__(SessionManager)
+
+    def create(self, settings_manager: "SettingsManager"):
+        return SessionManager(settings_manager)
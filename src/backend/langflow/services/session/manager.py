@@ -0,0 +1,210 @@
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple, Union
+
+from loguru import logger
+
+from langflow.services.base import Service
+from langflow.services.cache.disk import DiskCache
+from langflow.services.cache.flow import InMemoryCache
+from langflow.services.cache.redis_cache import RedisCache, create_shared_cache
+from langflow.services.cache.utils import (
+    CACHE_DIR,
+    SingleFlight,
+    compute_dict_hash,
+)
+
+if TYPE_CHECKING:
+    from langflow.services.settings.manager import SettingsManager
+
+# Partition of the sessions created without a user, e.g. by load_flow_from_json
+ANONYMOUS_USER = "anonymous"
+
+BuildResult = Tuple[Any, Dict[str, Any]]
+
+
+class SessionManager(Service):
+    """
+    Keeps the built langchain objects of the flows being processed, so the
+    same flow isn't rebuilt on every call.
+
+    Sessions are identified by the hash of the flow data and stored in an
+    InMemoryCache under a key that includes the user id, so every user has their
+    own partition and can only load and clear their own sessions. The store
+    is bounded by SESSION_CACHE_MAX_SIZE sessions, evicting the least
+    recently used one, and by SESSION_CACHE_MAX_BYTES bytes of approximate
+    memory. Sessions expire after SESSION_CACHE_EXPIRATION seconds.
+
+    Concurrent loads of the same session are coalesced: the first one builds
+    the flow and the others wait for it and share its result or its error.
+
+    Built flows that can be serialized are also stored in a shared cache:
+    Redis if the REDIS_URL setting is set, so every worker sees them, or a
+    DiskCache bounded by SESSION_CACHE_DISK_MAX_SIZE bytes if
+    SESSION_CACHE_ON_DISK is enabled. Sessions missing from memory are
+    loaded from it before building the flow again, e.g. after a restart or
+    when the session was created by another worker.
+    """
+
+    name = "session_manager"
+
+    def __init__(self, settings_manager: "SettingsManager"):
+        settings = settings_manager.settings
+        self.cache = InMemoryCache(
+            max_size=settings.SESSION_CACHE_MAX_SIZE,
+            expiration_time=settings.SESSION_CACHE_EXPIRATION,
+            on_evict=self._on_evict,
+            max_bytes=settings.SESSION_CACHE_MAX_BYTES or None,
+            sweep_interval=settings.CACHE_SWEEP_INTERVAL,
+        )
+        fallback = None
+        if settings.SESSION_CACHE_ON_DISK:
+            fallback = DiskCache(
+                Path(CACHE_DIR) / "sessions",
+                max_size_bytes=settings.SESSION_CACHE_DISK_MAX_SIZE,
+                expiration_time=settings.SESSION_CACHE_EXPIRATION,
+                secret_key=settings_manager.auth_settings.SECRET_KEY,
+            )
+        self.shared_cache: Optional[Union[DiskCache, RedisCache]] = create_shared_cache(
+            settings_manager, "sessions", fallback
+        )
+        self._single_flight = SingleFlight()
+        # Guards the counters and the keys of each user. It is taken from the
+        # eviction callback, with the cache lock held, so it must never be
+        # held while using the cache
+        self._stats_lock = threading.Lock()
+        self._user_keys: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def generate_session_id(data_graph: Dict[str, Any]) -> str:
+        return compute_dict_hash(data_graph)
+
+    @staticmethod
+    def build_key(session_id: str, user_id: Optional[Any] = None) -> str:
+        return f"{user_id or ANONYMOUS_USER}:{session_id}"
+
+    def load_session(
+        self,
+        data_graph: Dict[str, Any],
+        session_id: Optional[str] = None,
+        user_id: Optional[Any] = None,
+    ) -> Tuple[Any, Dict[str, Any], str]:
+        """
+        Returns the langchain object, the artifacts and the session id of the
+        flow, building it if the user has no session for it.
+
+        If session_id is given and the user has that session, it is returned
+        as is, otherwise the session id is the hash of data_graph.
+        """
+        if session_id:
+            key = self.build_key(session_id, user_id)
+            result = self.cache.get(key)
+            if result is not None:
+                logger.debug(f"Loaded LangChain object from session {session_id}")
+                self._count("hits")
+                return (*result, session_id)
+            result = self._load_from_shared_cache(key, user_id)
+            if result is not None:
+                return (*result, session_id)
+
+        session_id = self.generate_session_id(data_graph)
+        key = self.build_key(session_id, user_id)
+        result, is_leader = self._single_flight.run(
+            key,
+            lambda: self._load_or_build(key, user_id, data_graph),
+            self.cache.get,
+            lambda key, result: self._store(key, user_id, result),
+        )
+        if not is_leader:
+            self._count("hits")
+        return (*result, session_id)
+
+    def _load_or_build(
+        self, key: str, user_id: Optional[Any], data_graph: Dict[str, Any]
+    ) -> BuildResult:
+        result = self._load_from_shared_cache(key, user_id, store=False)
+        if result is None:
+            self._count("misses")
+            result = self._build(data_graph)
+            if self.shared_cache is not None:
+                self.shared_cache.set(key, result)
+        return result
+
+    def _store(self, key: str, user_id: Optional[Any], result: BuildResult) -> None:
+        with self._stats_lock:
+            partition = str(user_id or ANONYMOUS_USER)
+            self._user_keys.setdefault(partition, set()).add(key)
+        self.cache.set(key, result)
+
+    def _load_from_shared_cache(
+        self, key: str, user_id: Optional[Any], store: bool = True
+    ) -> Optional[BuildResult]:
+        if self.shared_cache is None:
+            return None
+        result = self.shared_cache.get(key)
+        if result is None:
+            return None
+        logger.debug(f"Loaded LangChain object of session {key} from the shared cache")
+        self._count("shared_hits")
+        if store:
+            self._store(key, user_id, result)
+        return result
+
+    def _build(self, data_graph: Dict[str, Any]) -> BuildResult:
+        from langflow.interface.run import build_sorted_vertices
+
+        return build_sorted_vertices(data_graph)
+
+    def clear(self, user_id: Optional[Any] = None) -> None:
+        """Removes the sessions of the user, or every session if no user is given."""
+        if user_id is None:
+            self.cache.clear()
+            with self._stats_lock:
+                self._user_keys.clear()
+            if self.shared_cache is not None:
+                self.shared_cache.clear()
+            return
+        with self._stats_lock:
+            keys = self._user_keys.pop(str(user_id), set())
+        for key in keys:
+            self.cache.delete(key)
+        if self.shared_cache is not None:
+            prefix = self.build_key("", user_id)
+            for key in self.shared_cache.keys():
+                if key.startswith(prefix):
+                    self.shared_cache.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        bytes_used = self.cache.stats()["bytes"]
+        with self._stats_lock:
+            return {
+                "bytes": bytes_used,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "sessions": sum(len(keys) for keys in self._user_keys.values()),
+            }
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _on_evict(self, key: str, value: Any) -> None:
+        user_id = key.split(":", 1)[0]
+        with self._stats_lock:
+            self.evictions += 1
+            keys = self._user_keys.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[user_id]
+
+    def teardown(self):
+        # Shared sessions are kept for the other workers and the next start
+        self.cache.clear()
+        self.cache.close()
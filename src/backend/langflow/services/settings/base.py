@@ -40,6 +40,76 @@ class Settings(BaseSettings):
     DATABASE_URL: Optional[str] = None
     CACHE: Optional[str] = None
     REMOVE_API_KEYS: bool = False
+    # Maximum number of vertices of the same dependency level
+    # that are built concurrently
+    MAX_BUILD_WORKERS: int = 4
+    # Store compiled execution plans in the cache directory
+    # so they survive restarts
+    PLAN_CACHE_ON_DISK: bool = False
+    # Maximum number of inputs of a batch request processed at the same time
+    BATCH_MAX_CONCURRENCY: int = 8
+    # Size of the thread pool running flows that can't be called
+    # asynchronously, and seconds after which a /process request fails
+    PROCESS_MAX_WORKERS: int = 16
+    PROCESS_TIMEOUT: Optional[float] = 300
+    # Streamed tokens are sent together every this many milliseconds or
+    # once this many bytes are buffered, so a "stream" message can hold
+    # several tokens. Set both to 0 to send every token in its own message
+    STREAM_FLUSH_INTERVAL_MS: int = 50
+    STREAM_FLUSH_BYTES: int = 1024
+    # Tool outputs are streamed as intermediate steps in chunks of at most
+    # this many characters. Set to 0 to send each output as one message
+    TOOL_OUTPUT_CHUNK_SIZE: int = 4096
+    # Frames queued for each chat websocket, and what to do when a client
+    # doesn't keep up: "drop" stream frames, "merge" streamed tokens or
+    # "disconnect" the client
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256
+    WEBSOCKET_SLOW_CLIENT_POLICY: str = "merge"
+    # Chat messages kept in memory for each client, and messages sent to a
+    # client when it connects. Older ones are read from the history API
+    CHAT_HISTORY_MAX_MESSAGES: int = 200
+    CHAT_HISTORY_PAGE_SIZE: int = 50
+    # Chat histories kept in memory, and seconds after which the history of
+    # a client that isn't used is removed from memory
+    CHAT_HISTORY_MAX_CLIENTS: int = 1000
+    CHAT_HISTORY_CLIENT_TTL: int = 60 * 60
+    # Also store the chat history in the database, writing the new messages
+    # every this many seconds
+    CHAT_HISTORY_PERSIST: bool = False
+    CHAT_HISTORY_FLUSH_INTERVAL: float = 1.0
+    # Maximum number of built flows kept for /process sessions, across
+    # every user, and seconds after which an unused session expires
+    SESSION_CACHE_MAX_SIZE: int = 100
+    SESSION_CACHE_EXPIRATION: int = 60 * 60
+    # Approximate memory in bytes the built flows of the sessions can take
+    SESSION_CACHE_MAX_BYTES: Optional[int] = None
+    # Built vertices kept to rebuild flows incrementally, across every user,
+    # and approximate memory in bytes they can take
+    VERTEX_CACHE_MAX_SIZE: int = 1000
+    VERTEX_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Seconds between the removals of the expired items of the caches
+    CACHE_SWEEP_INTERVAL: int = 60
+    # Images and dataframes kept for each chat client, number of clients
+    # kept and seconds after a client disconnects when they are removed
+    ARTIFACT_CACHE_MAX_ITEMS: int = 50
+    ARTIFACT_CACHE_MAX_BYTES: int = 100 * 1024 * 1024
+    ARTIFACT_CACHE_MAX_CLIENTS: int = 1000
+    ARTIFACT_CACHE_CLIENT_TTL: int = 10 * 60
+    # Also store the built flows in the cache directory so they survive
+    # restarts, up to this many bytes. The files are signed with SECRET_KEY
+    # but hold the params of the components, API keys included, in clear
+    SESSION_CACHE_ON_DISK: bool = False
+    SESSION_CACHE_DISK_MAX_SIZE: int = 1024 * 1024 * 1024
+    # Redis database shared by every worker for the build status, the flow
+    # data and the built flows that can be serialized. Values are signed
+    # with SECRET_KEY, which must be the same on every server, but hold the
+    # params of the components, API keys included, in clear
+    REDIS_URL: Optional[str] = None
+    # Base URLs of every instance of the server and of this one. If set,
+    # requests for a flow are redirected to the instance the flow id is
+    # assigned to, for the objects that can't be shared
+    SESSION_ROUTING_NODES: List[str] = []
+    SESSION_ROUTING_NODE: Optional[str] = None
     COMPONENTS_PATH: List[str] = []
 
     LANGFUSE_SECRET_KEY: Optional[str] = None
@@ -97,18 +97,13 @@ def initialize_session_manager():
     """
     Initialize the session manager.
     """
-    from langflow.services.session import factory as session_manager_factory  # type: ignore
-    from langflow.services.cache import factory as cache_factory
+    from langflow.services.session import factory as session_manager_factory
 
     initialize_settings_manager()
 
-    service_manager.register_factory(
-        cache_factory.CacheManagerFactory(), dependencies=[ServiceType.SETTINGS_MANAGER]
-    )
-
     service_manager.register_factory(
         session_manager_factory.SessionManagerFactory(),
-        dependencies=[ServiceType.CACHE_MANAGER],
+        dependencies=[ServiceType.SETTINGS_MANAGER],
     )
 
 
@@ -121,6 +116,7 @@ def initialize_services():
     from langflow.services.chat import factory as chat_factory
     from langflow.services.settings import factory as settings_factory
     from langflow.services.auth import factory as auth_factory
+    from langflow.services.session import factory as session_manager_factory
 
     service_manager.register_factory(settings_factory.SettingsManagerFactory())
     service_manager.register_factory(
@@ -130,8 +126,15 @@ def initialize_services():
         database_factory.DatabaseManagerFactory(),
         dependencies=[ServiceType.SETTINGS_MANAGER],
     )
-    service_manager.register_factory(cache_factory.CacheManagerFactory())
+    service_manager.register_factory(
+        cache_factory.CacheManagerFactory(),
+        dependencies=[ServiceType.SETTINGS_MANAGER],
+    )
     service_manager.register_factory(chat_factory.ChatManagerFactory())
+    service_manager.register_factory(
+        session_manager_factory.SessionManagerFactory(),
+        dependencies=[ServiceType.SETTINGS_MANAGER],
+    )
 
     # Test cache connection
     service_manager.get(ServiceType.CACHE_MANAGER)
@@ -1,5 +1,6 @@
 from contextlib import contextmanager
 import json
+import os
 from pathlib import Path
 from typing import AsyncGenerator, TYPE_CHECKING
 
@@ -40,6 +41,19 @@ def get_text():
     """
 
 
+def pytest_collection_modifyitems(config, items):
+    # Timing benchmarks are flaky on shared machines, so they only run when
+    # LANGFLOW_RUN_BENCHMARKS is set
+    if os.environ.get("LANGFLOW_RUN_BENCHMARKS"):
+        return
+    skip_benchmark = pytest.mark.skip(
+        reason="set LANGFLOW_RUN_BENCHMARKS=1 to run the timing benchmarks"
+    )
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
 @pytest.fixture()
 async def async_client() -> AsyncGenerator:
     from langflow.main import create_app
@@ -45,7 +45,8 @@ def langchain_objects_are_equal(obj1, obj2):
 # Test build_langchain_object_with_caching
 def test_build_langchain_object_with_caching(basic_data_graph):
     build_langchain_object_with_caching.clear_cache()
-    graph = build_langchain_object_with_caching(basic_data_graph)
+    with pytest.deprecated_call():
+        graph = build_langchain_object_with_caching(basic_data_graph)
     assert graph is not None
 
 
@@ -71,3 +72,630 @@ def test_cache_size_limit(basic_data_graph):
         build_langchain_object_with_caching(modified_data_graph_new_id)
 
     assert len(build_langchain_object_with_caching.cache) == 10
+
+
+def test_memoize_dict_coalesces_concurrent_calls(basic_data_graph, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from langflow.services.cache import utils
+    from langflow.services.cache.utils import memoize_dict
+
+    calls = []
+    arrivals = []
+    all_arrived = threading.Event()
+    compute_dict_hash = utils.compute_dict_hash
+
+    def counting_hash(data_graph):
+        arrivals.append(data_graph)
+        if len(arrivals) == 8:
+            all_arrived.set()
+        return compute_dict_hash(data_graph)
+
+    monkeypatch.setattr(utils, "compute_dict_hash", counting_hash)
+
+    @memoize_dict(maxsize=10)
+    def slow_build(data_graph):
+        calls.append(data_graph)
+        # Every call reaches the cache before the build finishes
+        all_arrived.wait(5)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(slow_build, basic_data_graph) for _ in range(8)]
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_memoize_dict_does_not_cache_errors(basic_data_graph):
+    from langflow.services.cache.utils import memoize_dict
+
+    calls = []
+
+    @memoize_dict(maxsize=10)
+    def failing_build(data_graph):
+        calls.append(data_graph)
+        raise ValueError("Build failed")
+
+    # Failed builds aren't cached, so the next call tries again. Sharing the
+    # error with concurrent calls is tested with SingleFlight
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            failing_build(basic_data_graph)
+    assert len(calls) == 2
+
+
+def test_single_flight_releases_followers_when_the_leader_fails():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from langflow.services.cache.utils import SingleFlight
+
+    single_flight = SingleFlight()
+    callers = 4
+    lookups = []
+    all_joined = threading.Event()
+
+    def lookup(key):
+        # Called with the lock held, right before joining the flight
+        lookups.append(key)
+        if len(lookups) == callers:
+            all_joined.set()
+        return None
+
+    def failing_load():
+        all_joined.wait(5)
+        raise ValueError("Load failed")
+
+    def store(key, value):
+        raise AssertionError("Nothing to store")
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [
+            executor.submit(single_flight.run, "key", failing_load, lookup, store)
+            for _ in range(callers)
+        ]
+        errors = [future.exception(timeout=5) for future in futures]
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert single_flight._in_flight == {}
+
+    def failing_store(key, value):
+        raise RuntimeError("Store failed")
+
+    with pytest.raises(RuntimeError):
+        single_flight.run("key", lambda: 1, lambda key: None, failing_store)
+    assert single_flight._in_flight == {}
+    # Later calls start a new flight
+    assert single_flight.run(
+        "key", lambda: 2, lambda key: None, lambda *args: None
+    ) == (
+        2,
+        True,
+    )
+
+
+def make_session_manager(
+    monkeypatch,
+    max_size=10,
+    expiration=60,
+    cache_dir=None,
+    disk_max_size=None,
+    max_bytes=None,
+):
+    from types import SimpleNamespace
+
+    from langflow.services.session import manager
+    from langflow.services.session.manager import SessionManager
+
+    if cache_dir is not None:
+        monkeypatch.setattr(manager, "CACHE_DIR", str(cache_dir))
+    settings = SimpleNamespace(
+        SESSION_CACHE_MAX_SIZE=max_size,
+        SESSION_CACHE_EXPIRATION=expiration,
+        SESSION_CACHE_ON_DISK=cache_dir is not None,
+        SESSION_CACHE_DISK_MAX_SIZE=disk_max_size,
+        REDIS_URL=None,
+        SESSION_CACHE_MAX_BYTES=max_bytes,
+        CACHE_SWEEP_INTERVAL=None,
+    )
+    auth_settings = SimpleNamespace(SECRET_KEY="secret")
+    session_manager = SessionManager(
+        SimpleNamespace(settings=settings, auth_settings=auth_settings)
+    )
+    builds = []
+
+    def build(data_graph):
+        builds.append(data_graph)
+        return object(), {}
+
+    monkeypatch.setattr(session_manager, "_build", build)
+    return session_manager, builds
+
+
+def test_session_manager_partitions_sessions_by_user(monkeypatch, basic_data_graph):
+    session_manager, builds = make_session_manager(monkeypatch)
+
+    object1, _, session_id1 = session_manager.load_session(basic_data_graph, None, "a")
+    object2, _, session_id2 = session_manager.load_session(
+        basic_data_graph, session_id1, "a"
+    )
+    object3, _, session_id3 = session_manager.load_session(
+        basic_data_graph, session_id1, "b"
+    )
+
+    assert session_id1 == session_id2 == session_id3
+    assert object1 is object2
+    # Users don't share sessions
+    assert object3 is not object1
+    assert len(builds) == 2
+
+    session_manager.clear("a")
+    assert (
+        session_manager.load_session(basic_data_graph, session_id1, "b")[0] is object3
+    )
+    assert (
+        session_manager.load_session(basic_data_graph, session_id1, "a")[0]
+        is not object1
+    )
+    stats = session_manager.stats()
+    assert stats.pop("bytes") > 0
+    assert stats == {
+        "hits": 2,
+        "shared_hits": 0,
+        "misses": 3,
+        "evictions": 0,
+        "sessions": 2,
+    }
+
+
+def test_session_manager_evicts_least_recently_used(monkeypatch, basic_data_graph):
+    session_manager, builds = make_session_manager(monkeypatch, max_size=2)
+    graphs = [{**basic_data_graph, "name": f"flow {i}"} for i in range(3)]
+
+    session_ids = [session_manager.load_session(graph)[2] for graph in graphs[:2]]
+    # Use the first flow so the second one is the least recently used
+    session_manager.load_session(graphs[0], session_ids[0])
+    session_manager.load_session(graphs[2])
+    session_manager.load_session(graphs[0], session_ids[0])
+    session_manager.load_session(graphs[1], session_ids[1])
+
+    assert builds == [graphs[0], graphs[1], graphs[2], graphs[1]]
+    stats = session_manager.stats()
+    assert stats["evictions"] == 2
+    assert stats["sessions"] == 2
+
+
+def test_session_manager_expires_sessions(monkeypatch, basic_data_graph):
+    session_manager, builds = make_session_manager(monkeypatch, expiration=0)
+
+    session_id = session_manager.load_session(basic_data_graph)[2]
+    session_manager.load_session(basic_data_graph, session_id)
+
+    assert len(builds) == 2
+    assert session_manager.stats()["evictions"] >= 1
+
+
+def test_session_manager_coalesces_concurrent_loads(monkeypatch, basic_data_graph):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    session_manager, builds = make_session_manager(monkeypatch)
+    lookups = []
+    all_joined = threading.Event()
+    cache_get = session_manager.cache.get
+
+    def counting_get(key):
+        # Called with the single flight lock held, right before joining it
+        lookups.append(key)
+        if len(lookups) == 8:
+            all_joined.set()
+        return cache_get(key)
+
+    def slow_build(data_graph):
+        builds.append(data_graph)
+        all_joined.wait(5)
+        return object(), {}
+
+    monkeypatch.setattr(session_manager.cache, "get", counting_get)
+    monkeypatch.setattr(session_manager, "_build", slow_build)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(session_manager.load_session, basic_data_graph)
+            for _ in range(8)
+        ]
+        results = [future.result() for future in futures]
+
+    assert len(builds) == 1
+    assert len({id(langchain_object) for langchain_object, _, _ in results}) == 1
+    assert len({session_id for _, _, session_id in results}) == 1
+
+
+def test_compute_dict_hash_is_canonical(basic_data_graph):
+    import copy
+    import hashlib
+
+    from langflow.services.cache.utils import compute_dict_hash, filter_json
+
+    original = copy.deepcopy(basic_data_graph)
+    fingerprint = compute_dict_hash(basic_data_graph)
+
+    # The flow isn't modified
+    assert basic_data_graph == original
+    # It is the hash of the compact JSON with sorted keys of the filtered flow
+    canonical = orjson.dumps(filter_json(original), option=orjson.OPT_SORT_KEYS)
+    assert fingerprint == hashlib.sha256(canonical).hexdigest()
+
+    # Moving things around in the UI doesn't change it
+    moved = copy.deepcopy(original)
+    moved["viewport"] = {"x": 10, "y": 20, "zoom": 2}
+    for node in moved["nodes"]:
+        node["position"] = {"x": 0, "y": 0}
+        node["selected"] = True
+    assert compute_dict_hash(moved) == fingerprint
+
+    changed = copy.deepcopy(original)
+    changed["nodes"][0]["data"]["id"] = "changed"
+    assert compute_dict_hash(changed) != fingerprint
+
+
+@pytest.mark.benchmark
+def test_compute_dict_hash_benchmark(basic_data_graph):
+    """Benchmark: fingerprinting a 2 MB flow.
+
+    It is compared with what compute_dict_hash used to do: copy the nodes and
+    hash the indented JSON.
+    """
+    import hashlib
+    import time
+
+    from langflow.services.cache.utils import compute_dict_hash, filter_json
+
+    nodes = basic_data_graph["nodes"]
+    large_data_graph = {**basic_data_graph, "nodes": []}
+    while len(orjson.dumps(large_data_graph)) < 2 * 1024 * 1024:
+        index = len(large_data_graph["nodes"])
+        for node in nodes:
+            large_data_graph["nodes"].append({**node, "id": f"{node['id']}-{index}"})
+
+    def indented_hash(data_graph):
+        graph_json = orjson_dumps(filter_json(data_graph), sort_keys=True)
+        return hashlib.sha256(graph_json.encode("utf-8")).hexdigest()
+
+    def best_time(func):
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            func(large_data_graph)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    indented = best_time(indented_hash)
+    canonical = best_time(compute_dict_hash)
+    assert canonical < indented, f"{canonical:.4f}s vs {indented:.4f}s"
+
+
+def test_session_manager_loads_sessions_from_disk(
+    monkeypatch, tmp_path, basic_data_graph
+):
+    session_manager, builds = make_session_manager(monkeypatch, cache_dir=tmp_path)
+    monkeypatch.setattr(
+        session_manager, "_build", lambda data_graph: ({"built": True}, {"a": 1})
+    )
+    session_id = session_manager.load_session(basic_data_graph, None, "user")[2]
+
+    # A new manager, e.g. after a restart, finds the session on disk
+    restarted, builds = make_session_manager(monkeypatch, cache_dir=tmp_path)
+    assert restarted.load_session(basic_data_graph, session_id, "user") == (
+        {"built": True},
+        {"a": 1},
+        session_id,
+    )
+    assert restarted.load_session(basic_data_graph, None, "user")[2] == session_id
+    assert builds == []
+    assert restarted.stats()["shared_hits"] == 1
+    assert restarted.stats()["hits"] == 1
+
+    restarted.clear("user")
+    restarted, builds = make_session_manager(monkeypatch, cache_dir=tmp_path)
+    restarted.load_session(basic_data_graph, session_id, "user")
+    assert len(builds) == 1
+
+
+def test_session_manager_rebuilds_objects_that_cannot_be_stored(
+    monkeypatch, tmp_path, basic_data_graph
+):
+    session_manager, _ = make_session_manager(monkeypatch, cache_dir=tmp_path)
+    # Generators can't be serialized
+    generator = (item for item in [])
+    monkeypatch.setattr(session_manager, "_build", lambda data_graph: (generator, {}))
+    assert session_manager.load_session(basic_data_graph)[0] is generator
+
+    restarted, builds = make_session_manager(monkeypatch, cache_dir=tmp_path)
+    restarted.load_session(basic_data_graph)
+    assert len(builds) == 1
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    import time
+
+    from langflow.services.cache.disk import DiskCache
+
+    cache = DiskCache(tmp_path, max_size_bytes=2500, secret_key="secret")
+    cache.set("a", b"a" * 1000)
+    time.sleep(0.01)
+    cache.set("b", b"b" * 1000)
+    time.sleep(0.01)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == b"a" * 1000
+    time.sleep(0.01)
+    cache.set("c", b"c" * 1000)
+
+    assert sorted(cache.keys()) == ["a", "c"]
+    assert cache.get("b") is None
+    assert cache.set("generator", (item for item in [])) is False
+    assert "generator" not in cache
+
+
+def test_disk_cache_discards_unsigned_files(tmp_path):
+    import dill
+
+    from langflow.services.cache.disk import DiskCache
+
+    cache = DiskCache(tmp_path, secret_key="secret")
+    cache.set("a", {"value": 1})
+    assert cache.get("a") == {"value": 1}
+    # Written with another key
+    DiskCache(tmp_path, secret_key="other").set("b", {"value": 2})
+    assert cache.get("b") is None
+    # Written by anyone else
+    cache._path("c").write_bytes(dill.dumps({"value": 3}))
+    assert cache.get("c") is None
+    assert sorted(cache.keys()) == ["a"]
+
+
+class FakeRedis:
+    """Implements the subset of redis.Redis used by RedisCache."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            if isinstance(key, bytes):
+                key = key.decode()
+            self.data.pop(key, None)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def scan_iter(self, match="*"):
+        from fnmatch import fnmatch
+
+        return [key.encode() for key in self.data if fnmatch(key, match)]
+
+
+def test_redis_cache():
+    import dill
+
+    from langflow.services.cache.redis_cache import RedisCache
+
+    client = FakeRedis()
+    cache = RedisCache(client, prefix="langflow:test:", secret_key="secret")
+    other = RedisCache(client, prefix="langflow:other:", secret_key="secret")
+    cache.set("a", {"status": "started"})
+    other.set("a", 1)
+
+    assert cache.get("a") == {"status": "started"}
+    assert "a" in cache
+    assert cache.keys() == ["a"]
+    assert cache.set("generator", (item for item in [])) is False
+
+    cache.clear()
+    assert cache.get("a") is None
+    assert other.get("a") == 1
+
+    # Values written with another key, or by anyone else, aren't unpickled
+    RedisCache(client, prefix="langflow:test:", secret_key="other").set("b", 2)
+    client.set("langflow:test:c", dill.dumps(3))
+    assert cache.get("b") is None
+    assert cache.get("c") is None
+    assert cache.keys() == []
+
+
+def test_session_manager_shares_sessions_through_redis(monkeypatch, basic_data_graph):
+    from langflow.services.cache.redis_cache import RedisCache
+
+    client = FakeRedis()
+    workers = []
+    for _ in range(2):
+        session_manager, builds = make_session_manager(monkeypatch)
+        session_manager.shared_cache = RedisCache(
+            client, prefix="langflow:sessions:", secret_key="secret"
+        )
+        monkeypatch.setattr(
+            session_manager, "_build", lambda data_graph: ({"built": True}, {})
+        )
+        workers.append(session_manager)
+
+    session_id = workers[0].load_session(basic_data_graph, None, "user")[2]
+    # The other worker loads the session built by the first one
+    assert workers[1].load_session(basic_data_graph, session_id, "user") == (
+        {"built": True},
+        {},
+        session_id,
+    )
+    assert workers[1].stats()["shared_hits"] == 1
+    assert workers[1].stats()["misses"] == 0
+
+
+def test_consistent_hash_ring_only_moves_keys_of_new_nodes():
+    from langflow.api.routing import ConsistentHashRing
+
+    nodes = ["http://a:7860", "http://b:7860", "http://c:7860"]
+    ring = ConsistentHashRing(nodes)
+    keys = [f"flow-{i}" for i in range(1000)]
+    assignment = {key: ring.get_node(key) for key in keys}
+    assert set(assignment.values()) == set(nodes)
+    assert assignment == {key: ConsistentHashRing(nodes).get_node(key) for key in keys}
+
+    bigger = ConsistentHashRing(nodes + ["http://d:7860"])
+    moved = [key for key in keys if bigger.get_node(key) != assignment[key]]
+    assert all(bigger.get_node(key) == "http://d:7860" for key in moved)
+    assert len(moved) < len(keys) / 2
+
+
+def test_session_routing_redirects_to_the_owner(client, monkeypatch):
+    from types import SimpleNamespace
+
+    from fastapi import WebSocketDisconnect
+    from langflow.api.routing import WS_REDIRECT_CODE, ConsistentHashRing
+    from langflow.services import getters
+
+    nodes = ["http://a:7860", "http://b:7860"]
+    settings = SimpleNamespace(
+        SESSION_ROUTING_NODES=nodes, SESSION_ROUTING_NODE="http://a:7860"
+    )
+    monkeypatch.setattr(
+        getters, "get_settings_manager", lambda: SimpleNamespace(settings=settings)
+    )
+    ring = ConsistentHashRing(nodes)
+    flow_id = next(
+        f"flow-{i}" for i in range(100) if ring.get_node(f"flow-{i}") == nodes[1]
+    )
+
+    response = client.get(f"/api/v1/build/{flow_id}/status?a=1", follow_redirects=False)
+    assert response.status_code == 307
+    assert (
+        response.headers["location"]
+        == f"http://b:7860/api/v1/build/{flow_id}/status?a=1"
+    )
+    assert client.get("/health").status_code == 200
+
+    token = "x" * 500
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect(
+            f"/api/v1/chat/{flow_id}?token={token}"
+        ) as websocket:
+            websocket.receive_json()
+    assert exc_info.value.code == WS_REDIRECT_CODE
+    reason = exc_info.value.reason
+    # Only the base URL of the owner, without the token of the client
+    assert reason == "http://b:7860"
+    assert len(reason.encode()) <= 123
+
+
+def test_in_memory_cache_evicts_by_bytes():
+    from langflow.services.cache.flow import InMemoryCache
+
+    evicted = []
+    cache = InMemoryCache(
+        max_bytes=25_000, on_evict=lambda key, value: evicted.append(key)
+    )
+    cache.set("a", b"a" * 10_000)
+    cache.set("b", {"data": [b"b" * 10_000]})
+    assert cache.get("a") is not None
+    # "b" is the least recently used and makes room for "c"
+    cache.set("c", b"c" * 10_000)
+    assert evicted == ["b"]
+    assert "b" not in cache
+    # Items larger than the whole cache aren't stored
+    cache.set("d", b"d" * 30_000)
+    assert "d" not in cache
+    assert evicted == ["b", "d"]
+
+    stats = cache.stats()
+    assert stats["items"] == 2
+    assert 20_000 < stats["bytes"] <= 25_000
+    assert stats["evictions"] == 2
+    assert stats["hits"] == 1
+    cache.delete("a")
+    cache.delete("c")
+    assert cache.stats()["bytes"] == 0
+
+
+def test_in_memory_cache_sweeps_expired_items():
+    import threading
+
+    from langflow.services.cache.flow import InMemoryCache
+
+    cache = InMemoryCache(expiration_time=60)
+    cache.set("a", 1)
+    assert "a" in cache
+    # Items expire as soon as they are set
+    cache.expiration_time = 0
+    # Expired items are neither contained nor counted once swept
+    assert "a" not in cache
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.sweep() == 2
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 3
+
+    removed = threading.Event()
+    swept = InMemoryCache(
+        expiration_time=0,
+        sweep_interval=0.05,
+        on_evict=lambda key, value: removed.set(),
+    )
+    swept.set("a", 1)
+    # Removed by the background sweeper, without being read
+    assert removed.wait(5)
+    assert len(swept) == 0
+    swept.close()
+
+
+def test_in_memory_cache_sizes_values_without_the_lock(monkeypatch):
+    import threading
+
+    from langflow.services.cache import flow
+    from langflow.services.cache.flow import InMemoryCache
+
+    cache = InMemoryCache()
+    cache.set("other", "value")
+    sizing = threading.Event()
+    release = threading.Event()
+    released = []
+    approximate_size = flow.approximate_size
+
+    def slow_size(value):
+        sizing.set()
+        # Only released once another thread read the cache
+        released.append(release.wait(5))
+        return approximate_size(value)
+
+    monkeypatch.setattr(flow, "approximate_size", slow_size)
+    writer = threading.Thread(target=cache.set, args=("large", "value"))
+    writer.start()
+    assert sizing.wait(5)
+    assert cache.get("other") == "value"
+    release.set()
+    writer.join()
+
+    assert released == [True]
+    assert cache.get("large") == "value"
+
+
+def test_in_memory_cache_get_or_set():
+    from langflow.services.cache.flow import InMemoryCache
+
+    cache = InMemoryCache()
+    calls = []
+
+    def factory():
+        # The lock isn't held, so the factory can use the cache
+        calls.append(cache.get("other"))
+        return "value"
+
+    assert cache.get_or_set("a", factory) == "value"
+    assert cache.get_or_set("a", factory) == "value"
+    assert calls == [None]
+    assert cache.stats()["hits"] == 1
@@ -61,6 +61,8 @@ def test_cache_manager_add_pandas(cache_manager):
         assert cached_df["extension"] == "csv"
         read_df = pd.read_csv(StringIO(cached_df["obj"]), index_col=0)
         pd.testing.assert_frame_equal(df, read_df)
+        # Encoded to CSV once, when first requested
+        assert cache_manager.get_object("test_df").encode() is cached_df["obj"]
 
 
 def test_cache_manager_add_image(cache_manager):
@@ -80,3 +82,87 @@ def test_cache_manager_get_last(cache_manager):
         cache_manager.add("baz", "qux", "string")
         last_item = cache_manager.get_last()
         assert last_item == {"obj": "qux", "type": "string", "extension": "str"}
+
+
+def test_cache_manager_encodes_objects_once(cache_manager, monkeypatch):
+    from langflow.interface import utils
+
+    calls = []
+
+    def pil_to_base64(image):
+        calls.append(image)
+        return "encoded"
+
+    monkeypatch.setattr(utils, "pil_to_base64", pil_to_base64)
+    img = Image.new("RGB", (10, 10), color="red")
+    with cache_manager.set_client_id("client1"):
+        cache_manager.add_image("test_image", img)
+        cached = cache_manager.get_object()
+        assert cached.encode() == "encoded"
+        assert cached.encode() == "encoded"
+        assert cached.data_type == "image"
+    assert calls == [img]
+
+
+def test_cache_manager_client_quotas():
+    cache_manager = CacheManager(max_items=2, max_bytes=None, max_clients=2)
+    with cache_manager.set_client_id("client1"):
+        for name in ["a", "b", "c"]:
+            cache_manager.add(name, name, "string")
+        # The least recently added object is evicted
+        assert list(cache_manager.current_cache) == ["b", "c"]
+        assert cache_manager.get_last()["obj"] == "c"
+        # current_cache is a copy the cache doesn't see changes to
+        cache_manager.current_cache.clear()
+        assert list(cache_manager.current_cache) == ["b", "c"]
+
+    with cache_manager.set_client_id("client2"):
+        cache_manager.add("a", "a", "string")
+    with cache_manager.set_client_id("client3"):
+        cache_manager.add("a", "a", "string")
+    # client1 is the least recently used client
+    with cache_manager.set_client_id("client1"):
+        assert len(cache_manager.current_cache) == 0
+
+    cache_manager = CacheManager(max_items=None, max_bytes=5000)
+    with cache_manager.set_client_id("client1"):
+        cache_manager.add("a", b"a" * 3000, "bytes")
+        cache_manager.add("b", b"b" * 3000, "bytes")
+        assert list(cache_manager.current_cache) == ["b"]
+
+
+def test_cache_manager_removes_released_clients():
+    import time
+
+    cache_manager = CacheManager(client_ttl=0.05)
+    for client_id in ["client1", "client2"]:
+        with cache_manager.set_client_id(client_id):
+            cache_manager.add("a", "a", "string")
+        cache_manager.release_client(client_id)
+
+    # Using a client again cancels its removal
+    with cache_manager.set_client_id("client2"):
+        pass
+    time.sleep(0.06)
+    with cache_manager.set_client_id("client1"):
+        assert len(cache_manager.current_cache) == 0
+    with cache_manager.set_client_id("client2"):
+        assert cache_manager.get("a")["obj"] == "a"
+
+
+def test_cache_manager_client_id_is_per_context(cache_manager):
+    import asyncio
+
+    async def session(client_id):
+        with cache_manager.set_client_id(client_id):
+            # Let the other session set its client id
+            await asyncio.sleep(0.01)
+            cache_manager.add("name", client_id, "string")
+            await asyncio.sleep(0.01)
+            return cache_manager.current_client_id, cache_manager.get("name")["obj"]
+
+    async def main():
+        return await asyncio.gather(session("client1"), session("client2"))
+
+    assert asyncio.run(main()) == [("client1", "client1"), ("client2", "client2")]
+    assert cache_manager.current_client_id is None
@@ -107,7 +107,7 @@ def created_api_key(active_user):
 
 def test_process_flow_invalid_api_key(client, flow, monkeypatch):
     # Mock de process_graph_cached
-    def mock_process_graph_cached(*args, **kwargs):
+    async def mock_process_graph_cached(*args, **kwargs):
         return {}, "session_id_mock"
 
     settings_manager = get_settings_manager()
@@ -132,7 +132,7 @@ def test_process_flow_invalid_api_key(client, flow, monkeypatch):
 
 
 def test_process_flow_invalid_id(client, monkeypatch, created_api_key):
-    def mock_process_graph_cached(*args, **kwargs):
+    async def mock_process_graph_cached(*args, **kwargs):
         return {}, "session_id_mock"
 
     from langflow.api.v1 import endpoints
@@ -165,7 +165,7 @@ def test_process_flow_without_autologin(client, flow, monkeypatch, created_api_k
     settings_manager = get_settings_manager()
     settings_manager.auth_settings.AUTO_LOGIN = False
 
-    def mock_process_graph_cached(*args, **kwargs):
+    async def mock_process_graph_cached(*args, **kwargs):
         return {}, "session_id_mock"
 
     monkeypatch.setattr(endpoints, "process_graph_cached", mock_process_graph_cached)
@@ -198,7 +198,7 @@ def test_process_flow_fails_autologin_off(client, flow, monkeypatch):
     settings_manager = get_settings_manager()
     settings_manager.auth_settings.AUTO_LOGIN = False
 
-    def mock_process_graph_cached(*args, **kwargs):
+    async def mock_process_graph_cached(*args, **kwargs):
         return {}, "session_id_mock"
 
     monkeypatch.setattr(endpoints, "process_graph_cached", mock_process_graph_cached)
@@ -345,3 +345,110 @@ def test_various_prompts(client, prompt, expected_input_variables):
     response = client.post("api/v1/validate/prompt", json=PROMPT_REQUEST)
     assert response.status_code == 200
     assert response.json()["input_variables"] == expected_input_variables
+
+
+def test_process_flow_batch(client, flow, monkeypatch, created_api_key):
+    from langflow.api.v1 import endpoints
+
+    async def mock_process_graph_batch(graph_data, inputs, *args, **kwargs):
+        return [
+            {"result": {"echo": item["key"]}, "error": None} for item in inputs
+        ], "session_id_mock"
+
+    monkeypatch.setattr(endpoints, "process_graph_batch", mock_process_graph_batch)
+
+    headers = {"api-key": created_api_key.api_key}
+    post_data = {"inputs": [{"key": "a"}, {"key": "b"}]}
+    response = client.post(
+        f"api/v1/process/{flow.id}/batch", headers=headers, json=post_data
+    )
+
+    assert response.status_code == 200, response.json()
+    assert response.json() == {
+        "results": [
+            {"result": {"echo": "a"}, "error": None},
+            {"result": {"echo": "b"}, "error": None},
+        ],
+        "session_id": "session_id_mock",
+    }
+
+
+def test_process_flow_requests_overlap(client, flow, monkeypatch, created_api_key):
+    """Load test: concurrent /process calls to a slow flow run in parallel."""
+    import threading
+
+    from langchain.chains.base import Chain
+    from langflow.processing import process
+
+    requests = 4
+    # Each call only returns once all the requests are being processed
+    barrier = threading.Barrier(requests, timeout=5)
+
+    class SlowChain(Chain):
+        @property
+        def input_keys(self):
+            return ["input"]
+
+        @property
+        def output_keys(self):
+            return ["output"]
+
+        def _call(self, inputs, run_manager=None):
+            barrier.wait()
+            return {"output": inputs["input"]}
+
+    monkeypatch.setattr(
+        process,
+        "load_langchain_object",
+        lambda data_graph, session_id, user_id=None: (
+            SlowChain(),
+            {},
+            "session_id_mock",
+        ),
+    )
+    headers = {"api-key": created_api_key.api_key}
+    responses = []
+
+    def post(index):
+        post_data = {"inputs": {"input": str(index)}}
+        responses.append(
+            client.post(f"api/v1/process/{flow.id}", headers=headers, json=post_data)
+        )
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert sorted(response.json()["result"]["output"] for response in responses) == [
+        str(i) for i in range(requests)
+    ]
+    assert not barrier.broken
+
+
+def test_process_flow_stream(client, flow, monkeypatch, created_api_key):
+    from langflow.api.v1 import endpoints
+    from langflow.api.v1.schemas import StreamData
+
+    async def mock_process_graph_stream(*args, **kwargs):
+        yield StreamData(event="token", data={"token": "Hello"})
+        yield StreamData(
+            event="result",
+            data={"result": {"text": "Hello"}, "session_id": "session_id_mock"},
+        )
+
+    monkeypatch.setattr(endpoints, "process_graph_stream", mock_process_graph_stream)
+
+    headers = {"api-key": created_api_key.api_key}
+    post_data = {"inputs": {"key": "value"}, "stream": True}
+    response = client.post(f"api/v1/process/{flow.id}", headers=headers, json=post_data)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'event: token\ndata: {"token":"Hello"}\n\n'
+        "event: result\n"
+        'data: {"result":{"text":"Hello"},"session_id":"session_id_mock"}\n\n'
+    )
@@ -1,9 +1,10 @@
 import os
 from pathlib import Path
-from typing import Type, Union
+from typing import List, Tuple, Type, Union
 from langflow.graph.edge.base import Edge
 from langflow.graph.vertex.base import Vertex
 
+import orjson
 import pytest
 from langchain.chains.base import Chain
 from langchain.llms.fake import FakeListLLM
@@ -318,3 +319,564 @@ def test_get_result_and_thought(basic_graph):
     # Get the result and thought
     result = get_result_and_thought(langchain_object, message)
     assert isinstance(result, dict)
+
+
+def get_synthetic_graph_data(edges: List[Tuple[int, int]], number_of_nodes: int):
+    """Build raw graph data with nodes that only carry a generic input.
+
+    The node type is not registered anywhere, so these graphs can be
+    constructed and sorted but not built.
+    """
+    nodes = [
+        {
+            "id": f"Synthetic-{i}",
+            "data": {
+                "type": "Synthetic",
+                "node": {
+                    "base_classes": ["Synthetic"],
+                    "template": {
+                        "_type": "Synthetic",
+                        "inputs": {
+                            "type": "Synthetic",
+                            "required": False,
+                            "list": True,
+                            "show": True,
+                        },
+                    },
+                },
+            },
+        }
+        for i in range(number_of_nodes)
+    ]
+    raw_edges = [
+        {
+            "source": f"Synthetic-{source}",
+            "target": f"Synthetic-{target}",
+            "sourceHandle": f"Synthetic|Synthetic-{source}|Synthetic",
+            "targetHandle": f"Synthetic|inputs|Synthetic-{target}",
+        }
+        for source, target in edges
+    ]
+    return {"nodes": nodes, "edges": raw_edges}
+
+
+def get_layered_graph_data(number_of_nodes: int, width: int = 10):
+    """Graph where every node points to the node `width` positions ahead
+    and to its right-hand neighbour in the same layer."""
+    edges = []
+    for i in range(number_of_nodes):
+        if i + width < number_of_nodes:
+            edges.append((i, i + width))
+        if (i + 1) % width and i + 1 < number_of_nodes:
+            edges.append((i, i + 1))
+    return get_synthetic_graph_data(edges, number_of_nodes)
+
+
+def test_graph_indexes(basic_graph):
+    for node in basic_graph.nodes:
+        assert basic_graph.get_node(node.id) is node
+        expected_sources = [
+            edge.source for edge in basic_graph.edges if edge.target == node
+        ]
+        assert basic_graph.get_nodes_with_target(node) == expected_sources
+        expected_targets = [
+            edge.target for edge in basic_graph.edges if edge.source == node
+        ]
+        assert basic_graph.get_successors(node) == expected_targets
+    assert basic_graph.get_node("not-a-node") is None
+
+
+def test_add_edge_is_idempotent(basic_graph):
+    node = basic_graph.nodes[0]
+    number_of_edges = len(node.edges)
+    for edge in list(node.edges):
+        node.add_edge(edge)
+    assert len(node.edges) == number_of_edges
+
+
+@pytest.mark.benchmark
+def test_graph_construction_scales_linearly():
+    """Benchmark: building the graph should be O(V + E).
+
+    Quadrupling the size of the graph would make an O(V * E) construction
+    roughly 16 times slower, so we allow a generous margin above 4x.
+    """
+    import time
+
+    def best_construction_time(number_of_nodes):
+        data = get_layered_graph_data(number_of_nodes)
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            Graph.from_payload(data)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    # Warm up the lazy loaded type dicts
+    best_construction_time(10)
+    small = best_construction_time(500)
+    large = best_construction_time(2000)
+    assert large / small < 8, f"500 nodes: {small:.4f}s, 2000 nodes: {large:.4f}s"
+
+
+def test_sort_vertices_by_level(basic_graph):
+    levels = basic_graph.sort_vertices_by_level()
+    assert sum(len(level) for level in levels) == len(basic_graph.nodes)
+    vertex_levels = {
+        vertex.id: index for index, level in enumerate(levels) for vertex in level
+    }
+    for edge in basic_graph.edges:
+        assert vertex_levels[edge.source.id] < vertex_levels[edge.target.id]
+    # The root is the only vertex nothing depends on
+    assert levels[-1] == [get_root_node(basic_graph)]
+
+
+def test_build_vertices_by_level_runs_branches_concurrently():
+    import threading
+
+    from langflow.graph.graph.scheduler import build_vertices_by_level
+
+    # Four independent branches joining on a single vertex
+    data = get_synthetic_graph_data([(0, 4), (1, 4), (2, 4), (3, 4)], 5)
+    graph = Graph.from_payload(data)
+    # The branches only get past the barrier if the four build at once
+    barrier = threading.Barrier(4, timeout=5)
+
+    for vertex in graph.nodes:
+        if vertex.id != "Synthetic-4":
+            vertex.build = lambda *args, **kwargs: barrier.wait()
+        else:
+            vertex.build = lambda *args, **kwargs: None
+
+    results = list(build_vertices_by_level(graph, max_workers=4))
+
+    assert [vertex.id for vertex, _ in results][-1] == "Synthetic-4"
+    assert all(error is None for _, error in results)
+    assert not barrier.broken
+
+
+def test_build_vertices_by_level_builds_shared_dependencies_once(monkeypatch):
+    import threading
+    import time
+
+    from langflow.graph.graph.scheduler import build_vertices_by_level
+
+    # Like the llm of a toolkit, Synthetic-2 is a param of both siblings
+    # without an edge, so the three vertices are in the same level
+    data = get_synthetic_graph_data([(0, 3), (1, 3), (2, 3)], 4)
+    graph = Graph.from_payload(data)
+    shared = graph.get_node("Synthetic-2")
+    for vertex_id in ["Synthetic-0", "Synthetic-1"]:
+        graph.get_node(vertex_id).params["llm"] = shared
+
+    barrier = threading.Barrier(3, timeout=5)
+    instantiated = []
+    waiting = {"Synthetic-0", "Synthetic-1", "Synthetic-2"}
+
+    def build_params(self):
+        # The three vertices of the first level reach the shared one at once
+        if self.id in waiting:
+            waiting.discard(self.id)
+            barrier.wait()
+        original_build_params(self)
+
+    def instantiate(self, user_id=None):
+        instantiated.append(self.id)
+        if self is shared:
+            # Leaves the other builds time to reach it
+            time.sleep(0.05)
+        self._built_object = f"object-{self.id}"
+
+    original_build_params = Vertex._build_each_node_in_params_dict
+    monkeypatch.setattr(Vertex, "_build_each_node_in_params_dict", build_params)
+    monkeypatch.setattr(Vertex, "_get_and_instantiate_class", instantiate)
+
+    results = list(build_vertices_by_level(graph, max_workers=3))
+
+    assert all(error is None for _, error in results)
+    assert sorted(instantiated) == [f"Synthetic-{i}" for i in range(4)]
+    assert graph.get_node("Synthetic-0").params["llm"] == "object-Synthetic-2"
+
+
+def test_build_vertices_by_level_reports_errors_in_order():
+    from langflow.graph.graph.scheduler import (
+        build_graph_vertices,
+        build_vertices_by_level,
+    )
+
+    data = get_synthetic_graph_data([(0, 4), (1, 4), (2, 4), (3, 4)], 5)
+    graph = Graph.from_payload(data)
+    failing = {"Synthetic-1", "Synthetic-3"}
+
+    def make_build(vertex_id):
+        def build(*args, **kwargs):
+            if vertex_id in failing:
+                raise ValueError(f"{vertex_id} failed")
+
+        return build
+
+    for vertex in graph.nodes:
+        vertex.build = make_build(vertex.id)
+
+    errors = [
+        str(error)
+        for _, error in build_vertices_by_level(graph, max_workers=4)
+        if error is not None
+    ]
+    assert errors == ["Synthetic-1 failed", "Synthetic-3 failed"]
+
+    with pytest.raises(ValueError, match="Synthetic-1 failed"):
+        build_graph_vertices(graph, max_workers=4)
+
+
+CHANGED_FIELD = {
+    "type": "str",
+    "required": False,
+    "list": False,
+    "show": True,
+    "value": "changed",
+}
+
+
+def test_content_hashes_follow_dependencies():
+    data = get_synthetic_graph_data([(0, 1), (1, 2), (3, 2)], 4)
+    hashes = Graph.from_payload(data).compute_content_hashes()
+    assert hashes == Graph.from_payload(data).compute_content_hashes()
+
+    data["nodes"][0]["data"]["node"]["template"]["prompt"] = dict(CHANGED_FIELD)
+    changed = Graph.from_payload(data).compute_content_hashes()
+    for vertex_id in ["Synthetic-0", "Synthetic-1", "Synthetic-2"]:
+        assert changed[vertex_id] != hashes[vertex_id]
+    assert changed["Synthetic-3"] == hashes["Synthetic-3"]
+
+    # Vertex ids aren't part of the hashes, so other flows can reuse them
+    renamed = orjson.loads(orjson.dumps(data).replace(b"Synthetic-", b"Other-"))
+    renamed_hashes = Graph.from_payload(renamed).compute_content_hashes()
+    assert sorted(renamed_hashes.values()) == sorted(changed.values())
+
+
+def test_content_hashes_track_files_and_skip_unhashable_params(tmp_path):
+    file_path = tmp_path / "data.txt"
+    file_path.write_text("first")
+    data = get_synthetic_graph_data([(0, 1), (1, 2), (3, 2)], 4)
+    data["nodes"][0]["data"]["node"]["template"]["file"] = {
+        "type": "file",
+        "required": False,
+        "list": False,
+        "show": True,
+        "value": "data.txt",
+        "file_path": str(file_path),
+    }
+    hashes = Graph.from_payload(data).compute_content_hashes()
+
+    # Same path, different content
+    file_path.write_text("second version")
+    changed = Graph.from_payload(data).compute_content_hashes()
+    for vertex_id in ["Synthetic-0", "Synthetic-1", "Synthetic-2"]:
+        assert changed[vertex_id] != hashes[vertex_id]
+    assert changed["Synthetic-3"] == hashes["Synthetic-3"]
+
+    # Params that can't be canonicalized make the vertex and the vertices
+    # depending on it unhashable
+    graph = Graph.from_payload(data)
+    graph.get_node("Synthetic-1").params["client"] = object()
+    unhashable = graph.compute_content_hashes()
+    assert unhashable["Synthetic-0"] == changed["Synthetic-0"]
+    assert unhashable["Synthetic-1"] is None
+    assert unhashable["Synthetic-2"] is None
+    assert unhashable["Synthetic-3"] == changed["Synthetic-3"]
+
+
+def test_incremental_build_reuses_unchanged_vertices(monkeypatch):
+    import asyncio
+
+    from langflow.graph.graph.scheduler import abuild_vertices_by_level
+    from langflow.services.cache.flow import InMemoryCache
+
+    built_ids = []
+
+    def counting_build(self, *args, **kwargs):
+        built_ids.append(self.id)
+        self._built_object = f"object-{self.id}"
+        self._built = True
+        return self._built_object
+
+    monkeypatch.setattr(Vertex, "build", counting_build)
+    cache = InMemoryCache()
+
+    async def build(data):
+        graph = Graph.from_payload(data)
+        return [
+            (vertex.id, error)
+            async for vertex, error in abuild_vertices_by_level(
+                graph, cache=cache, cache_namespace="flow"
+            )
+        ]
+
+    data = get_synthetic_graph_data([(0, 1), (1, 2), (3, 2)], 4)
+    asyncio.run(build(data))
+    assert sorted(built_ids) == [f"Synthetic-{i}" for i in range(4)]
+
+    built_ids.clear()
+    results = asyncio.run(build(data))
+    assert built_ids == []
+    assert all(error is None for _, error in results)
+
+    data["nodes"][1]["data"]["node"]["template"]["prompt"] = dict(CHANGED_FIELD)
+    asyncio.run(build(data))
+    assert sorted(built_ids) == ["Synthetic-1", "Synthetic-2"]
+
+
+def test_topological_sort_handles_deep_graphs():
+    import sys
+
+    number_of_nodes = sys.getrecursionlimit() * 2
+    edges = [(i, i + 1) for i in range(number_of_nodes - 1)]
+    graph = Graph.from_payload(get_synthetic_graph_data(edges, number_of_nodes))
+    sorted_vertices = graph.topological_sort()
+    assert [vertex.id for vertex in sorted_vertices] == [
+        f"Synthetic-{i}" for i in range(number_of_nodes)
+    ]
+    assert len(graph.sort_vertices_by_level()) == number_of_nodes
+
+
+def test_topological_sort_reports_cycle():
+    data = get_synthetic_graph_data([(3, 0), (0, 1), (1, 2), (2, 0)], 4)
+    graph = Graph.from_payload(data)
+    with pytest.raises(ValueError, match="Graph contains a cycle") as exc_info:
+        graph.topological_sort()
+    cycle = str(exc_info.value).split(": ")[-1].split(" -> ")
+    assert cycle[0] == cycle[-1]
+    assert sorted(cycle[:-1]) == ["Synthetic-0", "Synthetic-1", "Synthetic-2"]
+    # Every step of the reported cycle is an edge of the graph
+    graph_edges = {(edge.source.id, edge.target.id) for edge in graph.edges}
+    assert all(step in graph_edges for step in zip(cycle, cycle[1:]))
+
+
+@pytest.mark.benchmark
+def test_topological_sort_scales_linearly():
+    """Benchmark: sorting synthetic graphs of up to 10k vertices is O(V + E)."""
+    import time
+
+    def best_sort_time(graph):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            # The public method memoizes the levels
+            graph._compute_levels()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    small = best_sort_time(Graph.from_payload(get_layered_graph_data(2500)))
+    large = best_sort_time(Graph.from_payload(get_layered_graph_data(10000)))
+    assert large / small < 8, f"2.5k vertices: {small:.4f}s, 10k vertices: {large:.4f}s"
+
+
+def assert_same_graph(graph: Graph, other: Graph):
+    assert [node.id for node in graph.nodes] == [node.id for node in other.nodes]
+    assert [type(node) for node in graph.nodes] == [type(node) for node in other.nodes]
+    assert set(graph.edges) == set(other.edges)
+    assert [
+        [node.id for node in level] for level in graph.sort_vertices_by_level()
+    ] == [[node.id for node in level] for level in other.sort_vertices_by_level()]
+    for node in graph.nodes:
+        other_node = other.get_node(node.id)
+        assert other_node.vertex_type == node.vertex_type
+        assert other_node.base_type == node.base_type
+        assert other_node.params.keys() == node.params.keys()
+        for key, value in node.params.items():
+            if isinstance(value, Vertex):
+                # References point to the vertices of their own graph
+                assert other_node.params[key] is other.get_node(value.id)
+            else:
+                assert other_node.params[key] == value
+
+
+def test_execution_plan_round_trip(basic_graph_data):
+    from langflow.graph.graph.plan import ExecutionPlan
+
+    graph = Graph.from_payload(basic_graph_data)
+    plan = ExecutionPlan.from_graph(graph)
+    assert ExecutionPlan.from_json(plan.to_json()) == plan
+    assert_same_graph(graph, Graph.from_plan(plan))
+    assert_same_graph(graph, Graph.from_plan(ExecutionPlan.from_json(plan.to_json())))
+
+
+def test_graphs_from_the_same_plan_are_independent(basic_graph_data):
+    import copy
+
+    from langflow.graph.graph.plan import ExecutionPlan
+
+    plan = ExecutionPlan.from_graph(Graph.from_payload(basic_graph_data))
+    graph = Graph.from_plan(plan)
+    other = Graph.from_plan(plan)
+    for node in graph.nodes:
+        assert other.get_node(node.id) is not node
+        assert other.get_node(node.id).params is not node.params
+
+    # Changing the data of one graph changes neither the plan nor the next
+    # graph created from it
+    snapshot = copy.deepcopy(plan)
+    for node in graph.nodes:
+        node.data["node"]["template"]["_type"] = "Changed"
+        node.data["node"]["template"]["added"] = {"value": "added"}
+    graph._edges[0]["sourceHandle"] = "changed"
+    assert plan == snapshot
+    next_graph = Graph.from_plan(plan)
+    for node in next_graph.nodes:
+        assert node.data["node"]["template"]["_type"] != "Changed"
+        assert "added" not in node.data["node"]["template"]
+    assert next_graph._edges[0]["sourceHandle"] != "changed"
+
+
+def test_build_graph_with_plan_reuses_plan(basic_graph_data, monkeypatch):
+    from langflow.graph.graph import plan as plan_module
+
+    plan_module.plan_cache.clear()
+    compiled = []
+    from_graph = plan_module.ExecutionPlan.from_graph.__func__
+
+    def counting_from_graph(cls, graph):
+        compiled.append(graph)
+        return from_graph(cls, graph)
+
+    monkeypatch.setattr(
+        plan_module.ExecutionPlan, "from_graph", classmethod(counting_from_graph)
+    )
+    graph = plan_module.build_graph_with_plan(basic_graph_data)
+    other = plan_module.build_graph_with_plan(basic_graph_data)
+    assert len(compiled) == 1
+    assert_same_graph(graph, other)
+
+
+def test_base_type_map_matches_all_types_dict():
+    from langflow.interface.listing import lazy_load_dict
+
+    for node_types in lazy_load_dict.ALL_TYPES_DICT.values():
+        for node_type in node_types:
+            expected = next(
+                _base_type
+                for _base_type, _node_types in lazy_load_dict.ALL_TYPES_DICT.items()
+                if node_type in _node_types
+            )
+            assert lazy_load_dict.BASE_TYPE_MAP[node_type] == expected
+
+
+def test_match_types():
+    from langflow.graph.edge.base import match_types
+
+    assert match_types(("Chain", "LLMChain"), ("LLMChain", "BaseMemory")) == (
+        True,
+        "LLMChain",
+    )
+    # A substring match is valid but doesn't give a matched type
+    assert match_types(("Chain",), ("LLMChain",)) == (True, None)
+    assert match_types(("BaseLLM",), ("Tool",)) == (False, None)
+    match_types.cache_clear()
+    for _ in range(3):
+        match_types(("BaseLLM",), ("BaseLanguageModel", "BaseLLM"))
+    assert match_types.cache_info().hits == 2
+
+
+def test_llm_vertices_share_pooled_instances(basic_graph_data):
+    import copy
+    import gc
+
+    from langflow.graph.vertex.pool import InstancePool, instance_pool
+
+    instance_pool.clear()
+    graph = Graph.from_payload(copy.deepcopy(basic_graph_data))
+    other = Graph.from_payload(copy.deepcopy(basic_graph_data))
+    llm_vertex = get_node_by_type(graph, LLMVertex)
+    key = InstancePool.make_key(llm_vertex.vertex_type, llm_vertex.params)
+    llm = llm_vertex.build()
+    other_llm = get_node_by_type(other, LLMVertex).build()
+    # Each vertex gets its own copy sharing the client of the pooled one
+    assert other_llm is not llm
+    assert other_llm.client is llm.client
+    other_llm.streaming = not llm.streaming
+    assert llm.streaming is not other_llm.streaming
+
+    llm_node = next(
+        node
+        for node in basic_graph_data["data"]["nodes"]
+        if node["id"] == llm_vertex.id
+    )
+    llm_node["data"]["node"]["template"]["temperature"]["value"] = 0.1
+    changed = Graph.from_payload(basic_graph_data)
+    assert get_node_by_type(changed, LLMVertex).build() is not llm
+
+    assert instance_pool.refs(key) == 2
+    del other
+    gc.collect()
+    assert instance_pool.refs(key) == 1
+
+    # Instances are not shared between users
+    user_graph = Graph.from_payload(copy.deepcopy(basic_graph_data))
+    user_vertex = get_node_by_type(user_graph, LLMVertex)
+    user_key = InstancePool.make_key(
+        user_vertex.vertex_type, user_vertex.params, user_id="user"
+    )
+    user_vertex.build(user_id="user")
+    assert instance_pool.refs(key) == 1
+    assert instance_pool.refs(user_key) == 1
+
+
+def test_instance_pool_eviction():
+    from langflow.graph.vertex.pool import InstancePool
+
+    pool = InstancePool(max_size=2, expiration_time=60)
+    keys = [InstancePool.make_key("Fake", {"value": i}) for i in range(3)]
+    for key in keys:
+        pool.acquire(key, object)
+    # Referenced instances are kept even above max_size
+    assert len(pool) == 3
+    for key in keys:
+        pool.release(key)
+    # The least recently used one goes first
+    assert keys[0] not in pool
+    assert keys[1] in pool and keys[2] in pool
+
+    pool.expiration_time = 0
+    pool.acquire(keys[2], object)
+    pool.release(keys[1])
+    assert keys[1] not in pool
+    assert keys[2] in pool
+
+
+def test_instance_pool_key_requires_plain_params():
+    from langflow.graph.vertex.pool import InstancePool
+
+    assert InstancePool.make_key("Fake", {"a": 1, "b": 2}) == InstancePool.make_key(
+        "Fake", {"b": 2, "a": 1}
+    )
+    assert InstancePool.make_key("Fake", {"llm": object()}) is None
+
+
+def test_build_vertices_by_level_only_builds_target_ancestors():
+    from langflow.graph.graph.scheduler import build_vertices_by_level
+
+    # 0 -> 1 -> 3 and a side branch 2 -> 4 that doesn't lead to 3
+    data = get_synthetic_graph_data([(0, 1), (1, 3), (2, 4)], 5)
+    graph = Graph.from_payload(data)
+    assert graph.get_ancestors("Synthetic-3") == {"Synthetic-0", "Synthetic-1"}
+    assert graph.get_ancestors("Synthetic-0") == set()
+
+    built_ids = []
+    for vertex in graph.nodes:
+        vertex.build = lambda *args, vertex=vertex, **kwargs: built_ids.append(
+            vertex.id
+        )
+
+    results = list(build_vertices_by_level(graph, target_id="Synthetic-3"))
+    assert [vertex.id for vertex, _ in results] == [
+        "Synthetic-0",
+        "Synthetic-1",
+        "Synthetic-3",
+    ]
+    assert sorted(built_ids) == ["Synthetic-0", "Synthetic-1", "Synthetic-3"]
+    # The full sort is still available afterwards
+    assert len(graph.topological_sort()) == 5
+
+    with pytest.raises(ValueError, match="Vertex missing not found"):
+        graph.sort_vertices_by_level("missing")
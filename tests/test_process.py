@@ -1,5 +1,13 @@
-from langflow.interface.run import build_sorted_vertices_with_caching
+import asyncio
+import time
+from typing import List
+
+import pytest
+from langchain.chains import LLMChain
+from langchain.chains.base import Chain
+from langchain.llms.base import LLM
 from langflow.processing.process import load_langchain_object, process_tweaks
+from langflow.services.getters import get_session_manager
 
 
 def test_no_tweaks():
@@ -218,7 +226,7 @@ def test_load_langchain_object_with_no_cached_session(client, basic_graph_data):
         basic_graph_data, "non_existent_session"
     )
     # Clear the cache
-    build_sorted_vertices_with_caching.clear_cache()
+    get_session_manager().clear()
     # Use the new session_id to get the langchain_object again
     langchain_object2, artifacts2, session_id2 = load_langchain_object(
         basic_graph_data, session_id1
@@ -246,3 +254,269 @@ def test_load_langchain_object_without_session_id(client, basic_graph_data):
         langchain_object2
     )  # Since no session_id was provided, the hash will be based on the graph_data
     assert artifacts1 == artifacts2
+
+
+class EchoChain(Chain):
+    """Echoes its input, failing on "fail"."""
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["input"]
+
+    @property
+    def output_keys(self) -> List[str]:
+        return ["output"]
+
+    def _call(self, inputs, run_manager=None):
+        if inputs["input"] == "fail":
+            raise RuntimeError("Failed on purpose")
+        return {"output": inputs["input"].upper()}
+
+
+class SlowEchoChain(EchoChain):
+    def _call(self, inputs, run_manager=None):
+        time.sleep(0.3)
+        return super()._call(inputs)
+
+
+class AsyncEchoChain(EchoChain):
+    async def _acall(self, inputs, run_manager=None):
+        # Earlier inputs finish later, so the results must be reordered
+        await asyncio.sleep(0.01 * (10 - len(inputs["input"])))
+        return self._call(inputs)
+
+
+@pytest.mark.parametrize("chain_class", [EchoChain, AsyncEchoChain])
+def test_process_graph_batch(monkeypatch, chain_class):
+    from langflow.processing import process
+
+    loads = []
+
+    def mock_load_langchain_object(data_graph, session_id, user_id=None):
+        loads.append(session_id)
+        return chain_class(), {}, "session_id_mock"
+
+    monkeypatch.setattr(process, "load_langchain_object", mock_load_langchain_object)
+    inputs_list = [{"input": "a"}, {"input": "fail"}, {"input": "abc"}]
+
+    results, session_id = asyncio.run(
+        process.process_graph_batch({}, inputs_list, max_concurrency=2)
+    )
+
+    assert session_id == "session_id_mock"
+    assert len(loads) == 1
+    assert results[0] == {"result": {"output": "A"}, "error": None}
+    assert results[1]["result"] is None
+    assert "Failed on purpose" in results[1]["error"]
+    assert results[2] == {"result": {"output": "ABC"}, "error": None}
+
+
+class MemoryEchoChain(AsyncEchoChain):
+    """Echoes its input, tracking how many calls run at the same time."""
+
+    active: int = 0
+    max_active: int = 0
+
+    async def _acall(self, inputs, run_manager=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            return await super()._acall(inputs)
+        finally:
+            self.active -= 1
+
+
+def test_process_graph_batch_serializes_chains_with_memory(monkeypatch):
+    from langchain.memory import ConversationBufferMemory
+    from langflow.processing import process
+
+    chain = MemoryEchoChain(
+        memory=ConversationBufferMemory(input_key="input", output_key="output")
+    )
+    monkeypatch.setattr(
+        process,
+        "load_langchain_object",
+        lambda data_graph, session_id, user_id=None: (chain, {}, "session_id_mock"),
+    )
+    inputs_list = [{"input": "a"}, {"input": "bb"}, {"input": "ccc"}]
+
+    results, _ = asyncio.run(
+        process.process_graph_batch({}, inputs_list, max_concurrency=3)
+    )
+
+    assert [result["result"]["output"] for result in results] == ["A", "BB", "CCC"]
+    assert chain.max_active == 1
+    # Each turn of the conversation is stored before the next one starts
+    assert [message.content for message in chain.memory.chat_memory.messages] == [
+        "a",
+        "A",
+        "bb",
+        "BB",
+        "ccc",
+        "CCC",
+    ]
+
+
+def test_supports_acall():
+    from langflow.processing.process import supports_acall
+
+    assert supports_acall(AsyncEchoChain())
+    assert not supports_acall(EchoChain())
+    assert not supports_acall(object())
+
+
+@pytest.mark.parametrize("use_acall", [False, True])
+def test_process_graph_cached_runs_requests_concurrently(monkeypatch, use_acall):
+    import threading
+
+    from langflow.processing import process
+
+    requests = 4
+    # Each call only returns once all the requests are being processed
+    barrier = threading.Barrier(requests, timeout=5)
+    started = []
+    # Created in the event loop running the requests
+    all_started = {}
+
+    class BarrierEchoChain(EchoChain):
+        def _call(self, inputs, run_manager=None):
+            barrier.wait()
+            return super()._call(inputs)
+
+    class AsyncBarrierEchoChain(EchoChain):
+        async def _acall(self, inputs, run_manager=None):
+            started.append(inputs["input"])
+            if len(started) == requests:
+                all_started["event"].set()
+            await asyncio.wait_for(all_started["event"].wait(), 5)
+            return self._call(inputs)
+
+    chain_class = AsyncBarrierEchoChain if use_acall else BarrierEchoChain
+    monkeypatch.setattr(
+        process,
+        "load_langchain_object",
+        lambda data_graph, session_id, user_id=None: (
+            chain_class(),
+            {},
+            "session_id_mock",
+        ),
+    )
+
+    async def process_many():
+        all_started["event"] = asyncio.Event()
+        return await asyncio.gather(
+            *(
+                process.process_graph_cached({}, {"input": f"input {i}"})
+                for i in range(requests)
+            )
+        )
+
+    results = asyncio.run(process_many())
+
+    assert [result for result, _ in results] == [
+        {"output": f"INPUT {i}"} for i in range(requests)
+    ]
+    assert not barrier.broken
+
+
+def test_process_graph_cached_timeout(monkeypatch):
+    from langflow.processing import process
+
+    monkeypatch.setattr(
+        process,
+        "load_langchain_object",
+        lambda data_graph, session_id, user_id=None: (
+            SlowEchoChain(),
+            {},
+            "session_id_mock",
+        ),
+    )
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(process.process_graph_cached({}, {"input": "a"}, timeout=0.05))
+
+
+class FakeStreamingLLM(LLM):
+    """Streams each word of its answer as a token."""
+
+    answer: str = "streamed answer"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        for word in self.answer.split():
+            if run_manager:
+                run_manager.on_llm_new_token(word)
+        return self.answer
+
+
+class AsyncFakeStreamingLLM(FakeStreamingLLM):
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        for word in self.answer.split():
+            if run_manager:
+                await run_manager.on_llm_new_token(word)
+        return self.answer
+
+
+class SyncLLMChain(LLMChain):
+    # Without async support the chain runs on a worker thread
+    _acall = Chain._acall
+
+
+@pytest.mark.parametrize(
+    "chain_class, llm_class",
+    [(SyncLLMChain, FakeStreamingLLM), (LLMChain, AsyncFakeStreamingLLM)],
+)
+def test_process_graph_stream(monkeypatch, chain_class, llm_class):
+    from langchain.prompts import PromptTemplate
+    from langflow.api.v1 import callback
+    from langflow.processing import process
+    from langflow.processing.base import process_graph_stream
+
+    chain = chain_class(llm=llm_class(), prompt=PromptTemplate.from_template("{input}"))
+    monkeypatch.setattr(
+        process,
+        "load_langchain_object",
+        lambda data_graph, session_id, user_id=None: (chain, {}, "session_id_mock"),
+    )
+    # One event per token, without coalescing
+    monkeypatch.setattr(callback, "get_stream_flush_limits", lambda: (0, 0))
+
+    async def collect():
+        return [event async for event in process_graph_stream({}, {"input": "hi"})]
+
+    events = asyncio.run(collect())
+
+    assert [(event.event, event.data) for event in events] == [
+        ("token", {"token": "streamed"}),
+        ("token", {"token": "answer"}),
+        (
+            "result",
+            {"result": {"text": "streamed answer"}, "session_id": "session_id_mock"},
+        ),
+    ]
+    assert str(events[0]) == 'event: token\ndata: {"token":"streamed"}\n\n'
+
+
+def test_process_graph_stream_reports_errors(monkeypatch):
+    from langflow.processing import process
+    from langflow.processing.base import process_graph_stream
+
+    monkeypatch.setattr(
+        process,
+        "load_langchain_object",
+        lambda data_graph, session_id, user_id=None: (
+            EchoChain(),
+            {},
+            "session_id_mock",
+        ),
+    )
+
+    async def collect():
+        return [event async for event in process_graph_stream({}, {"input": "fail"})]
+
+    events = asyncio.run(collect())
+    assert len(events) == 1
+    assert events[0].event == "error"
+    assert "Failed on purpose" in events[0].data["error"]
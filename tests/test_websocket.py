@@ -4,6 +4,7 @@ from fastapi.testclient import TestClient
 # from langflow.services.chat.manager import ChatManager
 
 import pytest
+import uuid
 
 
 def test_init_build(client, active_user, logged_in_headers):
@@ -50,3 +51,765 @@ def test_websocket_endpoint_after_build(client, basic_graph_data):
         with client.websocket_connect("api/v1/chat/websocket_test") as websocket:
             websocket.send_json({"input": "test"})
             websocket.receive_json()
+
+
+def test_stream_build_does_not_block_other_requests(
+    client: TestClient, logged_in_headers, monkeypatch
+):
+    import threading
+
+    from langflow.graph.vertex.base import Vertex
+
+    started = threading.Event()
+    release = threading.Event()
+    released = []
+
+    def slow_build(self, *args, **kwargs):
+        started.set()
+        # Only released once the other request was answered
+        released.append(release.wait(5))
+        self._built = True
+        return "built"
+
+    monkeypatch.setattr(Vertex, "build", slow_build)
+    graph_data = {
+        "nodes": [
+            {
+                "id": "Slow-1",
+                "data": {
+                    "type": "Slow",
+                    "node": {"base_classes": ["Slow"], "template": {"_type": "Slow"}},
+                },
+            }
+        ],
+        "edges": [],
+    }
+    response = client.post(
+        "api/v1/build/init/slow_build", json=graph_data, headers=logged_in_headers
+    )
+    assert response.status_code == 201
+
+    build_response = {}
+
+    def stream_build():
+        build_response["response"] = client.get("api/v1/build/stream/slow_build")
+
+    build_thread = threading.Thread(target=stream_build)
+    build_thread.start()
+    assert started.wait(5)
+    health = client.get("health")
+    release.set()
+    build_thread.join()
+
+    assert health.status_code == 200
+    # The build was still running when the other request was answered
+    assert released[0]
+    assert build_response["response"].status_code == 200
+    assert '"valid":true' in build_response["response"].text
+
+
+def test_stream_build_only_builds_target_vertex_ancestors(
+    client: TestClient, logged_in_headers, monkeypatch
+):
+    from langflow.graph.vertex.base import Vertex
+
+    built_ids = []
+
+    def fake_build(self, *args, **kwargs):
+        built_ids.append(self.id)
+        self._built = True
+        return "built"
+
+    monkeypatch.setattr(Vertex, "build", fake_build)
+
+    def node(node_id):
+        return {
+            "id": node_id,
+            "data": {
+                "type": "Fake",
+                "node": {
+                    "base_classes": ["Fake"],
+                    "template": {
+                        "_type": "Fake",
+                        "input": {
+                            "type": "Fake",
+                            "required": False,
+                            "list": False,
+                            "show": True,
+                        },
+                    },
+                },
+            },
+        }
+
+    def edge(source, target):
+        return {
+            "source": source,
+            "target": target,
+            "sourceHandle": f"Fake|{source}|Fake",
+            "targetHandle": f"Fake|input|{target}",
+        }
+
+    graph_data = {
+        "nodes": [
+            node("Fake-1"),
+            node("Fake-2"),
+            node("Fake-3"),
+            node("Side-1"),
+            node("Side-2"),
+        ],
+        "edges": [
+            edge("Fake-1", "Fake-2"),
+            edge("Fake-2", "Fake-3"),
+            edge("Side-1", "Side-2"),
+        ],
+    }
+    response = client.post(
+        "api/v1/build/init/partial_build", json=graph_data, headers=logged_in_headers
+    )
+    assert response.status_code == 201
+
+    response = client.get("api/v1/build/stream/partial_build?vertex_id=Fake-2")
+    assert response.status_code == 200
+    assert '"valid":true' in response.text
+    assert sorted(built_ids) == ["Fake-1", "Fake-2"]
+    # Testing a component doesn't mark the flow as built
+    status_response = client.get("api/v1/build/partial_build/status")
+    assert status_response.json()["built"] is False
+
+
+def test_stream_build_reuses_vertices_of_other_flows(
+    client: TestClient, logged_in_headers, monkeypatch
+):
+    import json
+
+    from langflow.graph.vertex.base import Vertex
+
+    built_ids = []
+
+    def fake_build(self, *args, **kwargs):
+        if self._built:
+            return self._built_object
+        built_ids.append(self.id)
+        self._built_object = f"object-{self.id}"
+        self._built = True
+        return self._built_object
+
+    monkeypatch.setattr(Vertex, "build", fake_build)
+
+    def flow(prefix, value):
+        def node(node_id):
+            template = {
+                "_type": "Fake",
+                "input": {
+                    "type": "Fake",
+                    "required": False,
+                    "list": False,
+                    "show": True,
+                },
+                "text": {
+                    "type": "str",
+                    "required": False,
+                    "list": False,
+                    "show": True,
+                },
+            }
+            if node_id == f"{prefix}-2":
+                template["text"]["value"] = value
+            return {
+                "id": node_id,
+                "data": {
+                    "type": "Fake",
+                    "node": {"base_classes": ["Fake"], "template": template},
+                },
+            }
+
+        return {
+            "nodes": [node(f"{prefix}-1"), node(f"{prefix}-2")],
+            "edges": [
+                {
+                    "source": f"{prefix}-1",
+                    "target": f"{prefix}-2",
+                    "sourceHandle": f"Fake|{prefix}-1|Fake",
+                    "targetHandle": f"Fake|input|{prefix}-2",
+                }
+            ],
+        }
+
+    def build(flow_id, graph_data):
+        response = client.post(
+            f"api/v1/build/init/{flow_id}", json=graph_data, headers=logged_in_headers
+        )
+        assert response.status_code == 201
+        response = client.get(f"api/v1/build/stream/{flow_id}")
+        messages = [
+            json.loads(line[len("data: ") :])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        return {
+            message["id"]: message["reused"] for message in messages if "id" in message
+        }
+
+    assert build("first_flow", flow("First", "a")) == {
+        "First-1": False,
+        "First-2": False,
+    }
+    # Same upstream vertex with a different id, and a different last vertex
+    assert build("second_flow", flow("Second", "b")) == {
+        "Second-1": True,
+        "Second-2": False,
+    }
+    assert built_ids == ["First-1", "First-2", "Second-2"]
+
+
+class FrameRecorder:
+    def __init__(self):
+        self.frames = []
+
+    async def send_json(self, data):
+        self.frames.append(data)
+
+
+def test_streaming_handler_coalesces_tokens():
+    import asyncio
+
+    from langchain.schema import AgentAction
+
+    from langflow.api.v1.callback import AsyncStreamingLLMCallbackHandler
+
+    async def stream():
+        websocket = FrameRecorder()
+        handler = AsyncStreamingLLMCallbackHandler(
+            websocket, flush_interval=0.02, flush_bytes=8
+        )
+        await handler.on_llm_new_token("ab")
+        await handler.on_llm_new_token("cd")
+        assert websocket.frames == []
+        # Buffered tokens are sent before any other message
+        await handler.on_agent_action(AgentAction("tool", "input", "log"))
+        await handler.on_llm_new_token("efgh")
+        await handler.on_llm_new_token("ijkl")
+        await handler.on_llm_new_token("mn")
+        await asyncio.sleep(0.05)
+        await handler.on_llm_new_token("op")
+        await handler.on_llm_end(None)
+        return [
+            (frame["message"], frame["intermediate_steps"])
+            for frame in websocket.frames
+        ]
+
+    assert asyncio.run(stream()) == [
+        ("abcd", ""),
+        ("", "Thought: log"),
+        ("efghijkl", ""),
+        ("mn", ""),
+        ("op", ""),
+    ]
+
+
+def test_streaming_handler_coalesces_many_tokens():
+    import asyncio
+
+    from langflow.api.v1.callback import AsyncStreamingLLMCallbackHandler
+
+    tokens = [f"tok{i % 10} " for i in range(20_000)]
+
+    def run(flush_interval, flush_bytes):
+        async def stream():
+            websocket = FrameRecorder()
+            handler = AsyncStreamingLLMCallbackHandler(
+                websocket, flush_interval=flush_interval, flush_bytes=flush_bytes
+            )
+            for token in tokens:
+                await handler.on_llm_new_token(token)
+            await handler.on_llm_end(None)
+            return websocket.frames
+
+        frames = asyncio.run(stream())
+        assert "".join(frame["message"] for frame in frames) == "".join(tokens)
+        return len(frames)
+
+    assert run(0, 0) == len(tokens)
+    assert run(0.05, 1024) * 100 < len(tokens)
+
+
+@pytest.mark.benchmark
+def test_streaming_handler_coalescing_benchmark():
+    """Benchmark: streaming 20k tokens one frame per token vs coalesced.
+
+    Coalescing must send fewer frames and stream the tokens with less CPU.
+    """
+    import asyncio
+    import time
+
+    from langflow.api.v1.callback import AsyncStreamingLLMCallbackHandler
+
+    tokens = [f"tok{i % 10} " for i in range(20_000)]
+
+    def run(flush_interval, flush_bytes):
+        async def stream():
+            websocket = FrameRecorder()
+            handler = AsyncStreamingLLMCallbackHandler(
+                websocket, flush_interval=flush_interval, flush_bytes=flush_bytes
+            )
+            for token in tokens:
+                await handler.on_llm_new_token(token)
+            await handler.on_llm_end(None)
+            return websocket.frames
+
+        start = time.process_time()
+        frames = asyncio.run(stream())
+        elapsed = max(time.process_time() - start, 1e-9)
+        assert "".join(frame["message"] for frame in frames) == "".join(tokens)
+        return len(frames), len(tokens) / elapsed
+
+    per_token_frames, per_token_rate = run(0, 0)
+    coalesced_frames, coalesced_rate = run(0.05, 1024)
+    assert per_token_frames == len(tokens)
+    assert coalesced_frames * 100 < per_token_frames
+    assert coalesced_rate > per_token_rate, (
+        f"{coalesced_rate:,.0f} tokens/s of CPU coalesced, "
+        f"{per_token_rate:,.0f} tokens/s one frame per token"
+    )
+
+
+def test_chunk_text():
+    from langflow.api.v1.callback import chunk_text
+
+    text = "one two three four"
+    assert list(chunk_text(text, 8)) == ["one two ", "three ", "four"]
+    assert list(chunk_text(text, 0)) == [text]
+    # Words longer than a chunk are cut
+    assert list(chunk_text("abcdefghij", 4)) == ["abcd", "efgh", "ij"]
+    assert list(chunk_text("", 4)) == [""]
+
+
+def test_tool_output_is_streamed_in_chunks():
+    import asyncio
+    import json
+
+    from langflow.api.v1.callback import AsyncStreamingLLMCallbackHandler
+
+    class TextFrameRecorder:
+        def __init__(self):
+            self.frames = []
+
+        async def send_text(self, data):
+            self.frames.append(json.loads(data))
+
+    output = " ".join(f"word{i}" for i in range(5000))
+
+    async def stream():
+        websocket = TextFrameRecorder()
+        handler = AsyncStreamingLLMCallbackHandler(websocket, chunk_size=4096)
+        await handler.on_tool_end(output, observation_prefix="Observation: ")
+        return websocket.frames
+
+    frames = asyncio.run(stream())
+    assert len(frames) == 11
+    assert all(len(frame["intermediate_steps"]) <= 4096 for frame in frames)
+    assert "".join(frame["intermediate_steps"] for frame in frames) == (
+        f"Observation: {output}"
+    )
+    assert [frame["chunk"] for frame in frames] == list(range(11))
+    assert [frame.get("last_chunk", False) for frame in frames] == [False] * 10 + [True]
+    assert {frame["type"] for frame in frames} == {"stream"}
+
+
+class SlowWebSocket:
+    """Records the frames sent, blocking until the test lets them through."""
+
+    def __init__(self):
+        self.frames = []
+        self.unblocked = None
+        self.closed_with = None
+
+    async def send_text(self, data):
+        import json
+
+        await self.unblocked.wait()
+        self.frames.append(json.loads(data))
+
+    async def close(self, code, reason):
+        self.closed_with = code
+
+
+def run_slow_client(policy, frames):
+    import asyncio
+
+    from langflow.services.chat.sender import ConnectionSender
+
+    async def run():
+        websocket = SlowWebSocket()
+        websocket.unblocked = asyncio.Event()
+        sender = ConnectionSender(websocket, max_size=3, policy=policy)
+        for frame in frames:
+            await sender.send_json(frame)
+        stats = sender.stats()
+        websocket.unblocked.set()
+        await sender.drain(timeout=1)
+        await asyncio.sleep(0)
+        sender.close()
+        return websocket, stats
+
+    return asyncio.run(run())
+
+
+def token(message):
+    return {"message": message, "type": "stream", "intermediate_steps": ""}
+
+
+def test_connection_sender_merges_tokens_of_slow_clients():
+    start = {"message": None, "type": "start", "intermediate_steps": ""}
+    end = {"message": "abcde", "type": "end", "intermediate_steps": ""}
+    frames = [start] + [token(char) for char in "abcde"] + [end]
+    websocket, stats = run_slow_client("merge", frames)
+
+    assert websocket.frames == [start, token("a"), token("bcde"), end]
+    assert stats["merged"] == 3
+    assert stats["depth"] == 4
+    assert stats["max_depth"] == 4
+
+
+def test_connection_sender_drops_stream_frames_of_slow_clients():
+    start = {"message": None, "type": "start", "intermediate_steps": ""}
+    end = {"message": "abcde", "type": "end", "intermediate_steps": ""}
+    frames = [start] + [token(char) for char in "abcde"] + [end]
+    websocket, stats = run_slow_client("drop", frames)
+
+    # Only stream frames are dropped
+    assert websocket.frames == [start, token("a"), token("b"), end]
+    assert stats["dropped"] == 3
+
+
+def test_connection_sender_disconnects_slow_clients():
+    from fastapi import status
+
+    frames = [token(char) for char in "abcde"]
+    websocket, stats = run_slow_client("disconnect", frames)
+
+    assert websocket.frames == []
+    assert websocket.closed_with == status.WS_1013_TRY_AGAIN_LATER
+    assert stats["dropped"] == 5
+
+
+def test_chat_history_updates_go_through_the_sender(client):
+    import asyncio
+    import threading
+
+    from langflow.api.v1.schemas import ChatResponse
+    from langflow.services.getters import get_chat_manager
+
+    chat_manager = get_chat_manager()
+    response = ChatResponse(message="answer", type="end", intermediate_steps="")
+
+    def update_from_thread():
+        with chat_manager.cache_manager.set_client_id("updates"):
+            chat_manager.chat_history.add_message("updates", response)
+            chat_manager.on_chat_history_update()
+
+    async def run():
+        websocket = SlowWebSocket()
+        websocket.unblocked = asyncio.Event()
+        websocket.unblocked.set()
+        await chat_manager.connect("updates", websocket)
+        thread = threading.Thread(target=update_from_thread)
+        thread.start()
+        await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        sender = chat_manager.senders["updates"]
+        await sender.drain(timeout=1)
+        stats = chat_manager.connection_stats()
+        chat_manager.disconnect("updates")
+        return websocket, stats
+
+    websocket, stats = asyncio.run(run())
+
+    assert websocket.frames == [response.dict()]
+    assert stats["updates"]["sent"] == 1
+    assert stats["updates"]["depth"] == 0
+    assert stats["updates"]["dropped"] == 0
+
+
+def test_chat_manager_cache_stats(client):
+    from langflow.services.getters import get_chat_manager
+
+    chat_manager = get_chat_manager()
+    before = chat_manager.cache_stats()
+    chat_manager.set_cache("stats", {"built": True})
+    assert chat_manager.in_memory_cache.get("stats") == {"built": True}
+    assert chat_manager.in_memory_cache.get("missing") is None
+    stats = chat_manager.cache_stats()
+    chat_manager.in_memory_cache.delete("stats")
+
+    objects = stats["langchain_objects"]
+    assert objects["items"] == before["langchain_objects"]["items"] + 1
+    assert objects["hits"] == before["langchain_objects"]["hits"] + 1
+    assert objects["misses"] == before["langchain_objects"]["misses"] + 1
+    assert objects["bytes"] > before["langchain_objects"]["bytes"]
+    assert set(stats["vertices"]) >= {"items", "bytes", "hits", "misses", "evictions"}
+
+
+def test_serialized_envelopes_match_chat_responses():
+    import orjson
+
+    from langflow.api.v1.schemas import ChatResponse, FileResponse, StreamData
+    from langflow.api.v1.serialization import (
+        START_FRAME,
+        end_frame,
+        loads,
+        sse_event,
+    )
+
+    start = ChatResponse(message=None, type="start", intermediate_steps="")
+    assert orjson.loads(START_FRAME) == start.dict()
+    files = [FileResponse(message=None, data="a,b", data_type="csv")]
+    end = ChatResponse(
+        message="answer", intermediate_steps="steps", type="end", files=files
+    )
+    assert orjson.loads(end_frame("answer", "steps", files)) == end.dict()
+
+    assert loads('{"inputs": {"text": "hi"}}') == {"inputs": {"text": "hi"}}
+    # Payloads encoded twice are still accepted
+    assert loads('"{\\"clear_history\\": true}"') == {"clear_history": True}
+
+    assert sse_event("token", {"token": "a"}) == 'event: token\ndata: {"token":"a"}\n\n'
+    assert str(StreamData(event="token", data={"token": "a"})) == sse_event(
+        "token", {"token": "a"}
+    )
+
+
+def test_serialization_round_trips():
+    import json
+    from pathlib import Path
+
+    from langflow.api.v1.schemas import ChatMessage, ChatResponse
+    from langflow.api.v1.serialization import STREAM_ENVELOPE, dumps, loads
+
+    for token in ["token ", "héllo 👋", '"quoted"\n', ""]:
+        stream = ChatResponse(message=token, type="stream", intermediate_steps="")
+        assert loads(dumps({**STREAM_ENVELOPE, "message": token})) == stream.dict()
+        # Same content as Starlette's send_json of the dict
+        assert loads(dumps(stream)) == json.loads(json.dumps(stream.dict()))
+
+    message = ChatMessage(message={"text": "hi", "nested": [1, 2.5, None]})
+    assert loads(dumps(message)) == message.dict()
+    # Objects JSON can't encode are sent as their string
+    assert loads(dumps({"path": Path("a/b")})) == {"path": str(Path("a/b"))}
+
+    for payload in [{"inputs": {"text": "hi"}}, {"clear_history": True}, [1, "a"]]:
+        text = json.dumps(payload)
+        assert loads(text) == payload
+        # Clients that encode their payloads twice
+        assert loads(json.dumps(text)) == payload
+    assert loads('"just text"') == "just text"
+
+
+@pytest.mark.benchmark
+def test_serialization_benchmark():
+    """Benchmark: messages per second per core, encoding and decoding frames.
+
+    It is compared with what was done before: pydantic's dict() and the
+    standard json module of Starlette's send_json, and decoding the frames
+    with receive_json() and then orjson.loads again.
+    """
+    import json
+    import time
+
+    import orjson
+
+    from langflow.api.v1.schemas import ChatResponse
+    from langflow.api.v1.serialization import STREAM_ENVELOPE, dumps, loads
+
+    tokens = [f"token{i} " for i in range(20_000)]
+    payloads = [json.dumps({"inputs": {"text": token}}) for token in tokens]
+
+    def rate(func, items):
+        start = time.process_time()
+        for item in items:
+            func(item)
+        return len(items) / max(time.process_time() - start, 1e-9)
+
+    def old_encode(token):
+        resp = ChatResponse(message=token, type="stream", intermediate_steps="")
+        return json.dumps(resp.dict(), separators=(",", ":"), ensure_ascii=False)
+
+    def new_encode(token):
+        return dumps({**STREAM_ENVELOPE, "message": token})
+
+    def old_decode(text):
+        payload = json.loads(text)
+        try:
+            return orjson.loads(payload)
+        except Exception:
+            return payload
+
+    assert orjson.loads(old_encode("a")) == orjson.loads(new_encode("a"))
+    assert old_decode(payloads[0]) == loads(payloads[0])
+
+    old_encode_rate = rate(old_encode, tokens)
+    new_encode_rate = rate(new_encode, tokens)
+    assert (
+        new_encode_rate > old_encode_rate
+    ), f"encode: {old_encode_rate:,.0f} -> {new_encode_rate:,.0f} msg/s"
+    old_decode_rate = rate(old_decode, payloads)
+    new_decode_rate = rate(loads, payloads)
+    assert (
+        new_decode_rate > old_decode_rate
+    ), f"decode: {old_decode_rate:,.0f} -> {new_decode_rate:,.0f} msg/s"
+
+
+def make_history_store(tmp_path):
+    from sqlmodel import SQLModel, create_engine
+
+    from langflow.services.chat.history import ChatHistoryStore
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    SQLModel.metadata.create_all(engine)
+    # Only flushed explicitly or by the reads
+    return ChatHistoryStore(lambda: engine, flush_interval=60)
+
+
+def test_chat_history_keeps_the_last_messages():
+    from langflow.api.v1.schemas import ChatMessage, ChatResponse, FileResponse
+    from langflow.services.chat.history import ChatHistory
+
+    history = ChatHistory(max_messages=4)
+    start = history.add_message("client", ChatMessage(message="hi"))
+    for index in range(3):
+        history.add_message(
+            "client",
+            ChatResponse(message=str(index), type="stream", intermediate_steps=""),
+        )
+    file_position = history.add_message(
+        "client", FileResponse(message=None, data="data", data_type="image")
+    )
+    history.add_message(
+        "client", ChatResponse(message="done", type="end", intermediate_steps="")
+    )
+
+    assert len(history.get_history("client", filter_messages=False)) == 4
+    assert [msg.type for msg in history.get_history("client")] == [
+        "human",
+        "file",
+        "end",
+    ]
+    assert [msg.data for msg in history.get_files("client", since=start)] == ["data"]
+    assert history.get_files("client", since=file_position + 1) == []
+
+    messages, next_before = history.get_page("client", limit=2)
+    assert [msg["type"] for msg in messages] == ["file", "end"]
+    assert next_before == messages[0]["position"]
+    messages, next_before = history.get_page("client", limit=2, before=next_before)
+    assert [msg["message"] for msg in messages] == ["hi"]
+    assert next_before is None
+
+    history.empty_history("client")
+    assert history.get_history("client") == []
+    assert history.get_page("client", limit=10) == ([], None)
+
+
+def test_chat_history_pages_through_persisted_messages(tmp_path):
+    from langflow.api.v1.schemas import ChatMessage, ChatResponse
+    from langflow.services.chat.history import ChatHistory
+
+    store = make_history_store(tmp_path)
+    history = ChatHistory(max_messages=3, store=store)
+    for index in range(10):
+        history.add_message("client", ChatMessage(message=str(index)))
+        history.add_message(
+            "client",
+            ChatResponse(message="token", type="stream", intermediate_steps=""),
+        )
+    # Nothing is written until the pending messages are flushed
+    assert store.written == 0
+
+    pages = []
+    before = None
+    while True:
+        messages, before = history.get_page("client", limit=4, before=before)
+        pages.append([msg["message"] for msg in messages])
+        if before is None:
+            break
+    assert pages == [["6", "7", "8", "9"], ["2", "3", "4", "5"], ["0", "1"]]
+    assert store.written == 20
+
+    # A new process reads the history and continues its positions
+    restarted = ChatHistory(max_messages=3, store=store)
+    messages, _ = restarted.get_page("client", limit=2)
+    assert [msg["message"] for msg in messages] == ["8", "9"]
+    messages, _ = restarted.get_page("client", limit=3, filter_messages=False)
+    assert [msg["type"] for msg in messages] == ["stream", "human", "stream"]
+    position = restarted.add_message("client", ChatMessage(message="10"))
+    assert position > messages[-1]["position"]
+
+    restarted.empty_history("client")
+    restarted.close()
+    assert ChatHistory(store=store).get_page("client", limit=10) == ([], None)
+
+
+def test_chat_history_keeps_a_bounded_number_of_clients():
+    from langflow.api.v1.schemas import ChatMessage
+    from langflow.services.chat.history import ChatHistory
+
+    history = ChatHistory(max_clients=2)
+    # Reading the history of an unknown client doesn't keep anything
+    assert history.get_page("unknown", limit=10) == ([], None)
+    assert history.get_history("unknown") == []
+    assert len(history._clients) == 0
+
+    for client_id in ("a", "b"):
+        history.add_message(client_id, ChatMessage(message=client_id))
+    history.get_history("a")
+    history.add_message("c", ChatMessage(message="c"))
+    # "b" is the least recently used
+    assert list(history._clients) == ["a", "c"]
+    assert history.get_history("b") == []
+
+    history.client_ttl = 0
+    assert history.get_history("a") == []
+    assert len(history._clients) == 0
+
+
+def test_chat_history_endpoint(client, flow, logged_in_headers):
+    from langflow.api.v1.schemas import ChatMessage, ChatResponse
+    from langflow.services.getters import get_chat_manager
+
+    flow_id = str(flow.id)
+    chat_history = get_chat_manager().chat_history
+    for index in range(5):
+        chat_history.add_message(flow_id, ChatMessage(message=str(index)))
+        chat_history.add_message(
+            flow_id,
+            ChatResponse(message="token", type="stream", intermediate_steps=""),
+        )
+
+    response = client.get(
+        f"api/v1/chat/{flow_id}/history?limit=3", headers=logged_in_headers
+    )
+    assert response.status_code == 200
+    page = response.json()
+    assert [msg["message"] for msg in page["messages"]] == ["2", "3", "4"]
+
+    response = client.get(
+        f"api/v1/chat/{flow_id}/history?limit=3&before={page['next_before']}",
+        headers=logged_in_headers,
+    )
+    assert [msg["message"] for msg in response.json()["messages"]] == ["0", "1"]
+    assert response.json()["next_before"] is None
+
+    response = client.get(
+        f"api/v1/chat/{flow_id}/history?limit=2&include_stream=true",
+        headers=logged_in_headers,
+    )
+    assert [msg["type"] for msg in response.json()["messages"]] == ["human", "stream"]
+
+    response = client.get(f"api/v1/chat/{flow_id}/history")
+    assert response.status_code == 401
+
+    # Only the owner of a flow can read its history
+    for other_id in (uuid.uuid4(), "not_a_flow_id"):
+        response = client.get(
+            f"api/v1/chat/{other_id}/history", headers=logged_in_headers
+        )
+        assert response.status_code == 404